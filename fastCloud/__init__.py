@@ -1,12 +1,43 @@
-from fastCloud.core.cloud_storage_factory import create_fast_cloud
-from fastCloud.core import FastCloud, ReplicateUploadAPI, AzureBlobStorage, S3Storage, SocaityUploadAPI, CloudStorage
+from fastCloud.core.lazy_imports import lazy_imports
+from fastCloud.core.cloud_storage_factory import create_fast_cloud, evict_fast_cloud, close_fast_clouds, aclose_fast_clouds
+from fastCloud.core import FastCloud, CloudStorage, ConcurrencyScheduler, UploadSource, SasUploader, DownloadStream, AsyncDownloadStream, \
+    DownloadCache, CachedCloud, RetryPolicy, DeadlineExceeded, Instrumentation, OperationEvent, PrometheusInstrumentation, \
+    OpenTelemetryInstrumentation
+
+# providers and their SDKs are imported on first access, e.g. `from fastCloud import S3Storage` imports boto3 only
+__getattr__, __dir__ = lazy_imports(__name__, globals(), {
+    "ReplicateUploadAPI": "fastCloud.core.api_providers.replicate",
+    "SocaityUploadAPI": "fastCloud.core.api_providers.socaity",
+    "UploadUrlPool": "fastCloud.core.api_providers.upload_url_pool",
+    "AzureBlobStorage": "fastCloud.core.storage_providers.azure_storage",
+    "S3Storage": "fastCloud.core.storage_providers.s3_storage",
+    "S3TransferPolicy": "fastCloud.core.storage_providers.s3_transfer_policy",
+})
 
 __all__ = [
     "create_fast_cloud",
+    "evict_fast_cloud",
+    "close_fast_clouds",
+    "aclose_fast_clouds",
     "FastCloud",
     "ReplicateUploadAPI",
     "AzureBlobStorage",
     "S3Storage",
     "SocaityUploadAPI",
-    "CloudStorage"
+    "UploadUrlPool",
+    "CloudStorage",
+    "ConcurrencyScheduler",
+    "UploadSource",
+    "SasUploader",
+    "S3TransferPolicy",
+    "DownloadStream",
+    "AsyncDownloadStream",
+    "DownloadCache",
+    "CachedCloud",
+    "RetryPolicy",
+    "DeadlineExceeded",
+    "Instrumentation",
+    "OperationEvent",
+    "PrometheusInstrumentation",
+    "OpenTelemetryInstrumentation"
 ]
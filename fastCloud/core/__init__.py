@@ -1,8 +1,27 @@
+from .lazy_imports import lazy_imports
+from .scheduler import ConcurrencyScheduler
+from .retry import RetryPolicy, DeadlineExceeded
+from .instrumentation import Instrumentation, OperationEvent, PrometheusInstrumentation, OpenTelemetryInstrumentation
+from .streaming import UploadSource, DownloadStream, AsyncDownloadStream
+from .sas_upload import SasUploader
 from .i_fast_cloud import FastCloud
-from .api_providers import BaseUploadAPI, ReplicateUploadAPI, SocaityUploadAPI
-from .storage_providers.azure_storage import AzureBlobStorage
-from .storage_providers.s3_storage import S3Storage
+from .download_cache import DownloadCache, CachedCloud
 from .storage_providers.i_cloud_storage import CloudStorage
-from .cloud_storage_factory import create_fast_cloud
+from .cloud_storage_factory import create_fast_cloud, evict_fast_cloud, close_fast_clouds, aclose_fast_clouds
 
-__all__ = ["FastCloud", "BaseUploadAPI", "ReplicateUploadAPI", "SocaityUploadAPI", "AzureBlobStorage", "S3Storage", "create_fast_cloud", "CloudStorage"]
+# providers and their SDKs are imported on first access
+__getattr__, __dir__ = lazy_imports(__name__, globals(), {
+    "BaseUploadAPI": ".api_providers.i_upload_api",
+    "ReplicateUploadAPI": ".api_providers.replicate",
+    "SocaityUploadAPI": ".api_providers.socaity",
+    "UploadUrlPool": ".api_providers.upload_url_pool",
+    "AzureBlobStorage": ".storage_providers.azure_storage",
+    "S3Storage": ".storage_providers.s3_storage",
+    "S3TransferPolicy": ".storage_providers.s3_transfer_policy",
+})
+
+__all__ = ["FastCloud", "BaseUploadAPI", "ReplicateUploadAPI", "SocaityUploadAPI", "UploadUrlPool", "AzureBlobStorage", "S3Storage", "create_fast_cloud", "CloudStorage",
+           "evict_fast_cloud", "close_fast_clouds", "aclose_fast_clouds",
+           "ConcurrencyScheduler", "UploadSource", "SasUploader", "S3TransferPolicy",
+           "DownloadStream", "AsyncDownloadStream", "DownloadCache", "CachedCloud", "RetryPolicy", "DeadlineExceeded",
+           "Instrumentation", "OperationEvent", "PrometheusInstrumentation", "OpenTelemetryInstrumentation"]
@@ -1,41 +1,174 @@
-from typing import Generator, AsyncGenerator
+import asyncio
+import logging
+import threading
+import weakref
+from importlib.util import find_spec
+from typing import Generator, AsyncGenerator, Optional
 from contextlib import asynccontextmanager, contextmanager
 
 try:
-    from httpx import AsyncClient, Client
+    from httpx import AsyncClient, Client, Limits, Timeout
 except ImportError:
     pass
 
 
 class HTTPClientManager:
-    """Manages HTTP client lifecycle for both sync and async operations.
+    """Manages long-lived, pooled HTTP clients for both sync and async operations.
 
-    This class provides context managers for both synchronous and asynchronous
-    HTTP clients, ensuring proper resource cleanup.
+    A single ``httpx.Client`` is shared by all synchronous calls and one ``httpx.AsyncClient`` is kept per
+    event loop, so connections (DNS, TCP and TLS handshakes) are reused across batches instead of being
+    re-established for every upload. Async clients are bound to the loop they were created on, because their
+    connection pools cannot be shared between loops.
+
+    Args:
+        max_connections (int): Maximum number of concurrent connections per client.
+        max_keepalive_connections (int): Maximum number of idle connections kept in the pool.
+        keepalive_expiry (float): Seconds an idle connection is kept open before it is closed.
+        http2 (bool): Enable HTTP/2 multiplexing. Requires ``httpx[http2]``; falls back to HTTP/1.1 otherwise.
+        timeout (float): Default request timeout in seconds.
+        **client_kwargs: Additional keyword arguments passed to ``httpx.Client`` / ``httpx.AsyncClient``.
     """
 
+    def __init__(
+            self,
+            max_connections: Optional[int] = 100,
+            max_keepalive_connections: Optional[int] = 20,
+            keepalive_expiry: Optional[float] = 30.0,
+            http2: bool = False,
+            timeout: Optional[float] = 60.0,
+            **client_kwargs
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.client_kwargs = client_kwargs
+
+        self.http2 = http2
+        if http2 and find_spec("h2") is None:
+            logging.getLogger(__name__).warning(
+                "HTTP/2 requested but the 'h2' package is not installed (pip install httpx[http2]). "
+                "Falling back to HTTP/1.1."
+            )
+            self.http2 = False
+
+        self._client = None
+        # id(loop) -> (weakref(loop), AsyncClient). Keyed by id so the client (which may reference the loop)
+        # does not keep the loop alive through the dictionary.
+        self._async_clients = {}
+        self._lock = threading.Lock()
+
+    def _build_client_kwargs(self) -> dict:
+        """Keyword arguments shared by the sync and async client constructors."""
+        kwargs = {
+            "limits": Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            "timeout": Timeout(self.timeout),
+            "http2": self.http2,
+        }
+        kwargs.update(self.client_kwargs)
+        return kwargs
+
+    @property
+    def client(self) -> Client:
+        """The shared synchronous client. Created on first access."""
+        if self._client is None or self._client.is_closed:
+            with self._lock:
+                if self._client is None or self._client.is_closed:
+                    self._client = Client(**self._build_client_kwargs())
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncClient:
+        """The asynchronous client bound to the running event loop. Created on first access per loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._prune_async_clients()
+            entry = self._async_clients.get(id(loop))
+            if entry is not None and entry[0]() is loop and not entry[1].is_closed:
+                return entry[1]
+
+            client = AsyncClient(**self._build_client_kwargs())
+            self._async_clients[id(loop)] = (weakref.ref(loop), client)
+            return client
+
+    def _prune_async_clients(self):
+        """Forget clients whose event loop was garbage collected or closed."""
+        for key, (loop_ref, _) in list(self._async_clients.items()):
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                del self._async_clients[key]
+
     @contextmanager
     def get_client(self) -> Generator[Client, None, None]:
-        """Get a synchronous HTTP client within a context manager.
+        """Get the shared synchronous HTTP client within a context manager.
+
+        The client is not closed on exit; call :meth:`close` to release its connections.
 
         Returns:
             ContextManager[Client]: A context-managed httpx.Client instance.
         """
-        client = Client()
-        try:
-            yield client
-        finally:
-            client.close()
+        yield self.client
 
     @asynccontextmanager
     async def get_async_client(self) -> AsyncGenerator[AsyncClient, None]:
-        """Get an asynchronous HTTP client within a context manager.
+        """Get the asynchronous HTTP client of the running event loop within a context manager.
+
+        The client is not closed on exit; call :meth:`aclose` to release its connections.
 
         Returns:
             AsyncContextManager[AsyncClient]: A context-managed httpx.AsyncClient instance.
         """
-        client = AsyncClient()
+        yield self.async_client
+
+    def close(self):
+        """Close the synchronous client and all async clients, each on its own event loop."""
+        with self._lock:
+            client, self._client = self._client, None
+            async_clients, self._async_clients = self._async_clients, {}
+
+        if client is not None:
+            client.close()
+        self._close_async_clients(async_clients.values())
+
+    async def aclose(self):
+        """Close the async client of the running event loop, the synchronous client and all other async clients.
+
+        Clients of other event loops are closed as in :meth:`close`.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client, self._client = self._client, None
+            async_clients, self._async_clients = self._async_clients, {}
+
+        entry = async_clients.pop(id(loop), None)
+        if entry is not None and entry[0]() is loop:
+            await entry[1].aclose()
+        if client is not None:
+            client.close()
+        self._close_async_clients(async_clients.values())
+
+    @staticmethod
+    def _close_async_clients(async_clients):
+        """Close async clients on their own event loops.
+
+        Clients of closed loops are dropped; their connections died with the loop. A client whose loop is stopped
+        can only be closed outside a running loop, otherwise it is dropped and its connections are released when
+        it is garbage collected.
+        """
         try:
-            yield client
-        finally:
-            await client.aclose()
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        for loop_ref, async_client in async_clients:
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(async_client.aclose(), loop)
+            elif running is None:
+                loop.run_until_complete(async_client.aclose())
@@ -1,3 +1,12 @@
-from .i_upload_api import BaseUploadAPI
-from .replicate import ReplicateUploadAPI
-from .socaity import SocaityUploadAPI
\ No newline at end of file
+from fastCloud.core.lazy_imports import lazy_imports
+# imported eagerly: the submodule has the same name and would otherwise shadow the class once it is imported
+from .HTTPClientManager import HTTPClientManager
+
+__getattr__, __dir__ = lazy_imports(__name__, globals(), {
+    "BaseUploadAPI": ".i_upload_api",
+    "ReplicateUploadAPI": ".replicate",
+    "SocaityUploadAPI": ".socaity",
+    "UploadUrlPool": ".upload_url_pool",
+})
+
+__all__ = ["HTTPClientManager", "BaseUploadAPI", "ReplicateUploadAPI", "SocaityUploadAPI", "UploadUrlPool"]
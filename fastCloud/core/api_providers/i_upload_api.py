@@ -1,13 +1,18 @@
+import io
+import os
 from abc import ABC, abstractmethod
 from typing import Union, Optional, List
-import asyncio
+from urllib.parse import urlparse
 
 from fastCloud.core.i_fast_cloud import FastCloud
 from fastCloud.core.api_providers.HTTPClientManager import HTTPClientManager
-from media_toolkit import MediaFile, media_from_any
+from fastCloud.core.streaming import UploadSource, DownloadStream, AsyncDownloadStream, DEFAULT_CHUNK_SIZE
+from fastCloud.core.instrumentation import instrumented, mark_phase
+from fastCloud.core.mmap_file import download_target, media_file_from_mmap, media_file_from_buffer
+from media_toolkit import MediaFile
 
 try:
-    from httpx import Response
+    from httpx import Response, AsyncClient
 except Exception:
     pass
 
@@ -15,15 +20,30 @@ except Exception:
 class BaseUploadAPI(FastCloud, ABC):
     """Base class for upload API implementations using Template Method pattern.
 
+    The HTTP clients are pooled and kept alive between calls. Release them with ``close()`` / ``aclose()`` or by
+    using the API object as a (async) context manager.
+
     Args:
         upload_endpoint (str): The endpoint URL for uploads.
         api_key (str): Authentication API key.
+        http_client (HTTPClientManager): Configured client manager (connection limits, keep-alive, HTTP/2).
+            If None, a manager with default settings is created.
+        **kwargs: Concurrency settings passed to FastCloud (max_concurrency, max_concurrency_per_host, scheduler).
     """
 
-    def __init__(self, api_key: str, upload_endpoint: str = None, *args, **kwargs):
+    def __init__(self, api_key: str, upload_endpoint: str = None, http_client: HTTPClientManager = None, *args, **kwargs):
+        super().__init__(**kwargs)
         self.upload_endpoint = upload_endpoint
         self.api_key = api_key
-        self.http_client = HTTPClientManager()
+        self.http_client = http_client if http_client is not None else HTTPClientManager()
+
+    def close(self) -> None:
+        """Close the pooled HTTP clients."""
+        self.http_client.close()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP clients, awaiting the one of the running event loop."""
+        await self.http_client.aclose()
 
     def get_auth_headers(self) -> dict:
         """Get authentication headers.
@@ -48,72 +68,205 @@ class BaseUploadAPI(FastCloud, ABC):
         """
         pass
 
+    @instrumented("download")
     def download(self, url: str, save_path: Optional[str] = None, *args, **kwargs) -> Union[MediaFile, str]:
         """Download a file from the given URL.
 
         Args:
             url (str): URL to download from.
             save_path (Optional[str]): Path to save the file to.
+            mmap (bool): Stream the file into save_path (or a temporary file) and return a memory-mapped
+                MediaFile instead of a copy in memory.
 
         Returns:
             Union[MediaFile, str]: MediaFile object or save path if specified.
         """
-        file = media_from_any(url, headers=self.get_auth_headers())
-        if save_path is None:
-            return file
+        if kwargs.get("mmap") or save_path is not None:
+            # save_path is only replaced once the whole file arrived
+            with download_target(save_path, kwargs.get("temp_dir")) as path:
+                with self.iter_download(url) as stream, open(path, "wb") as f:
+                    content_type = stream.content_type
+                    for chunk in stream:
+                        f.write(chunk)
+            if not kwargs.get("mmap"):
+                return save_path
+            return media_file_from_mmap(save_path or path, save_path is None, content_type)
+
+        buffer = io.BytesIO()
+        with self.iter_download(url) as stream:
+            content_type = stream.content_type
+            for chunk in stream:
+                buffer.write(chunk)
+        buffer.seek(0)
+        mark_phase("parse")
+        return media_file_from_buffer(buffer, content_type, os.path.basename(urlparse(url).path), typed=True)
+
+    @instrumented("iter_download")
+    def iter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> DownloadStream:
+        """Stream a file from the given URL in chunks over the pooled client.
+
+        Args:
+            url (str): URL to download from.
+            chunk_size (int): Size of the yielded chunks in bytes.
+            if_none_match (str): ETag for a conditional request; an unchanged file gives a not_modified stream.
+            if_modified_since (str): HTTP date for a conditional request if no ETag is known.
+
+        Returns:
+            DownloadStream: Exposes content_length and content_type; iterate it to receive the chunks.
+        """
+        client = self.http_client.client
+        request = client.build_request("GET", url, headers=self._download_headers(kwargs))
+        response = self.retry_policy.call(client.send, request, stream=True)
+        if response.status_code == 304:
+            response.close()
+            return DownloadStream([], not_modified=True, **self._stream_metadata(response))
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return DownloadStream(
+            response.iter_bytes(chunk_size),
+            chunk_size=chunk_size,
+            on_close=response.close,
+            **self._stream_metadata(response)
+        )
+
+    @instrumented("iter_download")
+    async def aiter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> AsyncDownloadStream:
+        """Stream a file from the given URL in chunks over the pooled async client.
+
+        Args:
+            url (str): URL to download from.
+            chunk_size (int): Size of the yielded chunks in bytes.
+
+        Returns:
+            AsyncDownloadStream: Exposes content_length and content_type; use 'async for' to receive the chunks.
+        """
+        client = self.http_client.async_client
+        request = client.build_request("GET", url, headers=self._download_headers(kwargs))
+        response = await self.retry_policy.acall(client.send, request, stream=True)
+        if response.status_code == 304:
+            await response.aclose()
+            return AsyncDownloadStream([], not_modified=True, **self._stream_metadata(response))
+        try:
+            response.raise_for_status()
+        except Exception:
+            await response.aclose()
+            raise
+        return AsyncDownloadStream(
+            response.aiter_bytes(chunk_size),
+            chunk_size=chunk_size,
+            on_close=response.aclose,
+            **self._stream_metadata(response)
+        )
+
+    def _download_headers(self, kwargs: dict) -> dict:
+        """Auth headers plus the conditional request headers (if_none_match / if_modified_since kwargs)."""
+        headers = self.get_auth_headers()
+        if kwargs.get("if_none_match"):
+            headers["If-None-Match"] = kwargs["if_none_match"]
+        elif kwargs.get("if_modified_since"):
+            headers["If-Modified-Since"] = kwargs["if_modified_since"]
+        return headers
 
-        file.save(save_path)
-        return save_path
+    @staticmethod
+    def _stream_metadata(response: Response) -> dict:
+        """Content length / type and validators from the response headers."""
+        content_length = None
+        # the announced length is the encoded size; httpx yields the decoded body
+        if "content-length" in response.headers and not response.headers.get("content-encoding"):
+            content_length = int(response.headers["content-length"])
+        return {
+            "content_length": content_length,
+            "content_type": response.headers.get("content-type"),
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+        }
 
-    def _upload_files(self, files: Union[MediaFile, List[MediaFile]], *args, **kwargs) -> Union[str, List[str]]:
+    def _upload_files(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], *args, **kwargs
+    ) -> Union[str, List[str]]:
         """
-        Upload a list of files to the cloud.
+        Upload a list of files to the cloud. The multipart body is streamed from each file's source.
         :param files: The file or list of file to upload.
+        :param max_workers: (kwarg) Upload the files in this many threads sharing the pooled client.
+            Defaults to self.max_workers.
         :return: The URL(s) of the uploaded file(s).
         """
-        if not isinstance(files, (MediaFile, list)):
-            raise ValueError("files must be a MediaFile or list of MediaFile")
+        if not isinstance(files, (MediaFile, UploadSource, list)):
+            raise ValueError("files must be a MediaFile, UploadSource or list of those")
 
         if not isinstance(files, list):
             files = [files]
 
         with self.http_client.get_client() as client:
-            # Handle single file
-            uploaded_files = []
-            for file in files:
-                response = client.post(
-                    url=self.upload_endpoint,
-                    files={"content": file.to_httpx_send_able_tuple()},
-                    headers=self.get_auth_headers(),
-                    timeout=60
-                )
-                processed_response = self._process_upload_response(response)
-                uploaded_files.append(processed_response)
+            def post_source(source: UploadSource) -> Response:
+                source.rewind()
+                with source.open() as stream:
+                    return client.post(
+                        url=self.upload_endpoint,
+                        files={"content": (source.file_name or "file", stream, source.content_type)},
+                        headers=self.get_auth_headers(),
+                        timeout=60
+                    )
+
+            def post_file(file) -> str:
+                source = UploadSource.from_any(file)
+                # one-shot streams are consumed by the first attempt and cannot be retried
+                attempts = None if source.replayable else 1
+                response = self.retry_policy.call(post_source, source, attempts=attempts)
+                return self._process_upload_response(response)
+
+            uploaded_files = self._map(post_file, files, kwargs.get("max_workers"))
 
         return uploaded_files if len(uploaded_files) > 1 else uploaded_files[0]
 
-    async def _upload_files_async(self, files: Union[MediaFile, List[MediaFile]], *args, **kwargs) -> Union[str, List[str]]:
+    async def _upload_files_async(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], *args, **kwargs
+    ) -> Union[str, List[str]]:
         """
-        Upload a list of files to the cloud asynchronously.
+        Upload a list of files to the cloud asynchronously. The multipart body is streamed from each file's source.
         :param files: The list of files to upload.
         :return: The URL of the uploaded file.
         """
-        if not isinstance(files, (MediaFile, list)):
-            raise ValueError("files must be a MediaFile or list of MediaFile")
+        if not isinstance(files, (MediaFile, UploadSource, list)):
+            raise ValueError("files must be a MediaFile, UploadSource or list of those")
 
         if not isinstance(files, list):
             files = [files]
 
         async with self.http_client.get_async_client() as client:
-            async_requests = [
-                client.post(
+            async_requests = [self._post_file_async(client, UploadSource.from_any(file)) for file in files]
+            responses = await self.scheduler.gather(async_requests, host=self.scheduler.host_of(self.upload_endpoint))
+
+        mark_phase("parse")
+        uploaded_files = [self._process_upload_response(response) for response in responses]
+        return uploaded_files if len(uploaded_files) > 1 else uploaded_files[0]
+
+    async def _post_file_async(self, client: AsyncClient, source: UploadSource) -> Response:
+        """Post a single file as multipart form to the upload endpoint.
+
+        Args:
+            client (AsyncClient): The HTTP client to use.
+            source (UploadSource): The file to upload.
+
+        Returns:
+            Response: The raw response of the upload endpoint.
+        """
+        if source.is_async_iterator:
+            # multipart bodies need a readable object; buffer async streams in a spooled temp file
+            source = await source.spool_async()
+
+        async def post() -> Response:
+            source.rewind()
+            with source.open() as stream:
+                return await client.post(
                     url=self.upload_endpoint,
-                    files={"content": file.to_httpx_send_able_tuple()},
+                    files={"content": (source.file_name or "file", stream, source.content_type)},
                     headers=self.get_auth_headers(),
                     timeout=60
-                ) for file in files
-            ]
-            responses = await asyncio.gather(*async_requests)
+                )
 
-        uploaded_files = [self._process_upload_response(response) for response in responses]
-        return uploaded_files if len(uploaded_files) > 1 else uploaded_files[0]
+        # one-shot streams are consumed by the first attempt and cannot be retried
+        return await self.retry_policy.acall(post, attempts=None if source.replayable else 1)
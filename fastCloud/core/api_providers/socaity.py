@@ -1,13 +1,18 @@
 import asyncio
-from typing import Union, List
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, List, Optional
 
 from fastCloud.core.api_providers.i_upload_api import BaseUploadAPI
+from fastCloud.core.api_providers.upload_url_pool import UploadUrlPool
+from fastCloud.core.streaming import UploadSource
+from fastCloud.core.sas_upload import SasUploader
 from media_toolkit import MediaFile
 from media_toolkit.utils.dependency_requirements import requires
 import os
 
 try:
-    from httpx import Response, AsyncClient
+    from httpx import Response, AsyncClient, Client
 except ImportError:
     pass
 
@@ -18,38 +23,56 @@ class SocaityUploadAPI(BaseUploadAPI):
 
     Args:
         api_key (str): Socaity API key.
+        sas_uploader (SasUploader): Block size, block concurrency and single upload threshold of the uploads to the
+            temporary URLs. Existing blobs are never overwritten.
+        urls_per_request (int): Batches are uploaded in chunks of this many files, one URL request per chunk.
+        url_pool (Union[UploadUrlPool, bool]): Keep pre-issued upload URLs per file extension, so uploads skip the URL
+            request. True uses an UploadUrlPool with default settings. A pool belongs to one upload API.
     """
 
-    def __init__(self, api_key: str, upload_endpoint="https://api.socaity.ai/v1/sdk/files", *args, **kwargs):
+    def __init__(
+            self, api_key: str, upload_endpoint="https://api.socaity.ai/v1/sdk/files", *args,
+            sas_uploader: SasUploader = None, urls_per_request: int = 100,
+            url_pool: Union[UploadUrlPool, bool] = None, **kwargs
+    ):
         if not api_key:
             api_key = os.getenv("SOCAITY_API_KEY", None)
         super().__init__(api_key=api_key, upload_endpoint=upload_endpoint, *args, **kwargs)
-
-    async def _upload_to_temporary_url(self, client: AsyncClient, sas_url: str, file: MediaFile) -> None:
-        """Upload a file to a temporary URL.
+        self.sas_uploader = sas_uploader if sas_uploader is not None else SasUploader(if_none_match=True)
+        self.urls_per_request = urls_per_request
+        self.url_pool = UploadUrlPool() if url_pool is True else (url_pool or None)
+        if self.url_pool is not None:
+            self.url_pool.fetch = self._fetch_pooled_urls
+
+    def close(self) -> None:
+        """Stop refilling the URL pool and close the pooled HTTP clients."""
+        if self.url_pool is not None:
+            self.url_pool.close()
+        super().close()
+
+    async def aclose(self) -> None:
+        """Stop refilling the URL pool and close the pooled HTTP clients, awaiting the one of the running event loop."""
+        if self.url_pool is not None:
+            self.url_pool.close()
+        await super().aclose()
+
+    async def _upload_to_temporary_url(
+            self, client: AsyncClient, sas_url: str, file: Union[MediaFile, UploadSource]
+    ) -> None:
+        """Stream a file to a temporary URL. Large files and streams of unknown size are uploaded as concurrent blocks.
 
         Args:
             client (AsyncClient): The HTTP client to use.
             sas_url (str): The temporary upload URL.
-            file (MediaFile): The file to upload.
+            file (Union[MediaFile, UploadSource]): The file to upload.
 
         Raises:
             Exception: If the upload fails.
         """
-        headers = {
-            "x-ms-blob-type": "BlockBlob",
-            "x-ms-if-none-match": "*"
-        }
-
-        response = await client.put(
-            sas_url,
-            content=file.to_bytes(),
-            headers=headers
+        await self.sas_uploader.upload_async(
+            client, sas_url, UploadSource.from_any(file), retry_policy=self.retry_policy, scheduler=self.scheduler
         )
 
-        if response.status_code != 201:
-            raise Exception(f"Failed to upload to temporary URL {sas_url}. Response: {response.text}")
-
     def _process_upload_response(self, response: Response) -> List[str]:
         """Process Socaity-specific response format.
 
@@ -67,44 +90,159 @@ class SocaityUploadAPI(BaseUploadAPI):
 
         return response.json()
 
-    async def _upload_async(self, file: Union[MediaFile, List[MediaFile]], *args, **kwargs) \
-            -> Union[str, list[str]]:
-        """Upload one ore more files using Socaity's two-step upload process.
-        Args:
-            file: The file or files to upload.
+    def _upload_url_request(self, extensions: List[Optional[str]]) -> dict:
+        """Body of the request for one temporary upload URL per file extension."""
+        exts = [ext for ext in extensions if ext is not None]
+        return {"n_files": len(extensions), "file_extensions": exts if len(exts) > 0 else None}
+
+    def _checked_upload_urls(self, response: Response, n_files: int) -> List[str]:
+        sas_urls = self._process_upload_response(response)
+        if not isinstance(sas_urls, list):
+            sas_urls = [sas_urls]
+        if len(sas_urls) != n_files:
+            raise Exception(f"Requested {n_files} temporary upload URLs but got {len(sas_urls)}")
+        return sas_urls
+
+    def _request_upload_urls(self, client: Client, extensions: List[Optional[str]]) -> List[str]:
+        """Get one temporary upload URL per file extension with a single request."""
+        response = self.retry_policy.call(
+            client.post, url=self.upload_endpoint, json=self._upload_url_request(extensions), headers=self.get_auth_headers()
+        )
+        return self._checked_upload_urls(response, len(extensions))
+
+    async def _request_upload_urls_async(self, client: AsyncClient, extensions: List[Optional[str]]) -> List[str]:
+        """Async variant of _request_upload_urls."""
+        response = await self.scheduler.run(
+            self.retry_policy.acall(
+                client.post, url=self.upload_endpoint, json=self._upload_url_request(extensions), headers=self.get_auth_headers()
+            ),
+            host=self.scheduler.host_of(self.upload_endpoint)
+        )
+        return self._checked_upload_urls(response, len(extensions))
 
-        Returns:
-            str: The URL of the uploaded file. If multiple files are uploaded, a list of URLs is returned.
-        """
+    def _fetch_pooled_urls(self, extension: Optional[str], n: int) -> List[str]:
+        """Refill function of the URL pool. Runs in the pool's background thread with the shared sync client."""
+        return self._request_upload_urls(self.http_client.client, [extension] * n)
 
-        if not isinstance(file, list):
-            file = [file]
+    def _take_pooled_urls(self, sources: List[UploadSource]) -> List[Optional[str]]:
+        """A pooled upload URL per source, or None where the pool has none (or no pool is configured)."""
+        if self.url_pool is None:
+            return [None] * len(sources)
+        return [self.url_pool.take(source.extension) for source in sources]
 
-        n_files = len(file)
-        exts = [f.extension for f in file if isinstance(f, MediaFile)]
-        exts = [ext for ext in exts if ext is not None]
-        if len(exts) == 0:
-            exts = None
+    @staticmethod
+    def _merge_urls(pooled_urls: List[Optional[str]], requested_urls: List[str]) -> List[str]:
+        """Fill the gaps of pooled_urls with the requested URLs, keeping the order of the files."""
+        requested_urls = iter(requested_urls)
+        return [url if url is not None else next(requested_urls) for url in pooled_urls]
 
-        async with self.http_client.get_async_client() as client:
-            # Get temporary upload URL
-            temp_url_response = await client.post(
-                url=self.upload_endpoint,
-                json={"n_files": n_files, "file_extensions": exts},
-                headers=self.get_auth_headers()
-            )
+    def _upload_files(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], *args, **kwargs
+    ) -> Union[str, List[str]]:
+        """Upload files with Socaity's two-step process: request temporary upload URLs, then PUT every file directly.
 
-            sas_urls = self._process_upload_response(temp_url_response)
-            if not isinstance(sas_urls, list):
-                sas_urls = [sas_urls]
+        Files get a URL from the url_pool if one is configured. The URLs of the other files are requested in chunks
+        of urls_per_request. The request of the next chunk runs while the files of the current chunk are uploaded,
+        so the file content never passes through the API server.
 
-            uploads = []
-            for i, sas_url in enumerate(sas_urls):
-                uploads.append(self._upload_to_temporary_url(client, sas_url, file[i]))
+        Args:
+            files: The file or files to upload.
+            max_workers (int): (kwarg) Upload the files of a chunk in this many threads sharing the pooled client.
+                Defaults to self.max_workers.
 
-            await asyncio.gather(*uploads)
+        Returns:
+            str: The URL of the uploaded file. If multiple files are uploaded, a list of URLs is returned.
+        """
+        if not isinstance(files, list):
+            files = [files]
+        sources = [UploadSource.from_any(f) for f in files]
+        pooled_urls = self._take_pooled_urls(sources)
+        pooled = [(sas_url, source) for sas_url, source in zip(pooled_urls, sources) if sas_url is not None]
+        missing = [source for sas_url, source in zip(pooled_urls, sources) if sas_url is None]
+        chunks = [missing[i:i + self.urls_per_request] for i in range(0, len(missing), self.urls_per_request)]
+
+        def put(item) -> None:
+            sas_url, source = item
+            self.sas_uploader.upload(client, sas_url, source, retry_policy=self.retry_policy)
+
+        def request_urls(chunk: List[UploadSource]) -> List[str]:
+            return self._request_upload_urls(client, [source.extension for source in chunk])
+
+        requested_urls = []
+        with self.http_client.get_client() as client, ThreadPoolExecutor(max_workers=1) as url_requests:
+            next_urls = None
+            if pooled:
+                # the first URL request runs while the files with pooled URLs are uploaded
+                if chunks:
+                    next_urls = url_requests.submit(contextvars.copy_context().run, request_urls, chunks[0])
+                self._map(put, pooled, kwargs.get("max_workers"))
+            for index, chunk in enumerate(chunks):
+                chunk_urls = next_urls.result() if next_urls is not None else request_urls(chunk)
+                next_urls = None
+                if index + 1 < len(chunks):
+                    next_urls = url_requests.submit(contextvars.copy_context().run, request_urls, chunks[index + 1])
+                self._map(put, list(zip(chunk_urls, chunk)), kwargs.get("max_workers"))
+                requested_urls.extend(chunk_urls)
+
+        sas_urls = self._merge_urls(pooled_urls, requested_urls)
+        return sas_urls if len(sas_urls) > 1 else sas_urls[0]
+
+    async def _upload_files_async(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], *args, **kwargs
+    ) -> Union[str, List[str]]:
+        """Async variant of _upload_files.
+
+        Files with a URL from the url_pool start uploading at once. The others start as soon as the URLs of their
+        chunk arrive and run concurrently, bounded by the scheduler. The next chunk of URLs is requested while at
+        most one chunk of uploads is still pending, so URLs are not requested (and don't expire) far ahead of their use.
 
-            if len(sas_urls) == 1:
-                return sas_urls[0]
+        Args:
+            files: The file or files to upload.
 
-            return sas_urls
+        Returns:
+            str: The URL of the uploaded file. If multiple files are uploaded, a list of URLs is returned.
+        """
+        if not isinstance(files, list):
+            files = [files]
+        sources = [UploadSource.from_any(f) for f in files]
+        pooled_urls = self._take_pooled_urls(sources)
+        missing = [source for sas_url, source in zip(pooled_urls, sources) if sas_url is None]
+
+        requested_urls = []
+        pending = set()
+
+        async def drain(limit: int):
+            nonlocal pending
+            while len(pending) > limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # retrieve every exception, not only the raised one
+                errors = [task.exception() for task in done]
+                error = next((e for e in errors if e is not None), None)
+                if error is not None:
+                    raise error
+
+        async with self.http_client.get_async_client() as client:
+            def start_upload(sas_url: str, source: UploadSource):
+                upload = self._upload_to_temporary_url(client, sas_url, source)
+                pending.add(asyncio.ensure_future(self.scheduler.run(upload, host=self.scheduler.host_of(sas_url))))
+
+            try:
+                for sas_url, source in zip(pooled_urls, sources):
+                    if sas_url is not None:
+                        start_upload(sas_url, source)
+                for start in range(0, len(missing), self.urls_per_request):
+                    chunk = missing[start:start + self.urls_per_request]
+                    chunk_urls = await self._request_upload_urls_async(client, [source.extension for source in chunk])
+                    requested_urls.extend(chunk_urls)
+                    for sas_url, source in zip(chunk_urls, chunk):
+                        start_upload(sas_url, source)
+                    await drain(self.urls_per_request)
+                await drain(0)
+            except BaseException:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                raise
+
+        sas_urls = self._merge_urls(pooled_urls, requested_urls)
+        return sas_urls if len(sas_urls) > 1 else sas_urls[0]
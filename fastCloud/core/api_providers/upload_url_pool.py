@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Deque, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+class UploadUrlPool:
+    """Pool of pre-issued temporary upload URLs per file extension, refilled in the background.
+
+    Uploads take a URL from the pool and start their PUT right away instead of first waiting for the URL request.
+    When fewer than refill_watermark URLs of an extension are left, a background thread requests enough URLs to fill
+    the pool up to size again. The first upload of an extension (or an upload finding the pool empty) falls back to
+    requesting its URL directly and triggers the refill.
+
+    URLs expire: the expiry is read from the SAS token (``se`` parameter) or, if the URL has none, assumed to be
+    url_lifetime after the URL was issued. URLs which expire within expiry_margin are discarded and never handed out.
+    Every URL is handed out at most once.
+
+    close() drops the pooled URLs and stops the background thread. Like the providers' clients, the pool reopens on
+    its next use: take() or prefetch() after close() start refilling again with a new thread.
+
+    Args:
+        size (int): Number of URLs kept per extension.
+        refill_watermark (int): Refill an extension when fewer than this many URLs are left.
+        expiry_margin (float): Seconds a URL must still be valid when it is taken, i.e. time for the upload.
+        url_lifetime (float): Assumed validity in seconds of URLs without an ``se`` parameter.
+        fetch (Callable[[Optional[str], int], List[str]]): Requests n URLs for an extension. Set by the upload API
+            the pool is passed to.
+    """
+
+    def __init__(
+            self,
+            size: int = 16,
+            refill_watermark: int = 4,
+            expiry_margin: float = 120,
+            url_lifetime: float = 600,
+            fetch: Callable[[Optional[str], int], List[str]] = None
+    ):
+        if refill_watermark > size:
+            raise ValueError("refill_watermark must not be larger than size")
+        self.size = size
+        self.refill_watermark = refill_watermark
+        self.expiry_margin = expiry_margin
+        self.url_lifetime = url_lifetime
+        self.fetch = fetch
+
+        # extension -> deque of (expires_at, url), oldest first
+        self._urls: Dict[Optional[str], Deque[Tuple[float, str]]] = {}
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        # incremented by close(); refills submitted before don't touch the reopened pool
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.refill_errors = 0
+
+    def _expires_at(self, url: str, issued_at: float) -> float:
+        """Expiry of a URL as unix time, from its SAS ``se`` parameter if present."""
+        signed_expiry = parse_qs(urlsplit(url).query).get("se")
+        if signed_expiry:
+            try:
+                expiry = datetime.fromisoformat(signed_expiry[0].replace("Z", "+00:00"))
+                if expiry.tzinfo is None:
+                    expiry = expiry.replace(tzinfo=timezone.utc)
+                return expiry.timestamp()
+            except ValueError:
+                pass
+        return issued_at + self.url_lifetime
+
+    def add(self, extension: Optional[str], urls: Iterable[str], issued_at: float = None) -> None:
+        """Add freshly issued URLs of an extension to the pool."""
+        self._add(extension, urls, issued_at)
+
+    def _add(self, extension: Optional[str], urls: Iterable[str], issued_at: float = None, generation: int = None) -> None:
+        """Add URLs unless the pool was closed after generation (a refill started before close)."""
+        issued_at = issued_at if issued_at is not None else time.time()
+        entries = [(self._expires_at(url, issued_at), url) for url in urls]
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._urls.setdefault(extension, deque()).extend(entries)
+
+    def _discard_expired(self, extension: Optional[str], now: float) -> Deque[Tuple[float, str]]:
+        """Drop the URLs of an extension which expire within expiry_margin. Must hold the lock."""
+        urls = self._urls.setdefault(extension, deque())
+        valid = deque(entry for entry in urls if entry[0] - self.expiry_margin > now)
+        self.expired += len(urls) - len(valid)
+        self._urls[extension] = valid
+        return valid
+
+    def take(self, extension: Optional[str]) -> Optional[str]:
+        """Take a URL for a file with this extension. Never blocks: returns None if no valid URL is pooled.
+
+        Triggers a background refill when the pool of the extension drops below refill_watermark.
+        """
+        with self._lock:
+            urls = self._discard_expired(extension, time.time())
+            url = urls.popleft()[1] if urls else None
+            if url is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            refill = len(urls) < self.refill_watermark and extension not in self._refilling
+            if refill:
+                self._refilling.add(extension)
+
+        if refill:
+            self._start_refill(extension)
+        return url
+
+    def prefetch(self, extensions: Iterable[Optional[str]]) -> None:
+        """Fill the pools of the given extensions in the background, e.g. at startup."""
+        for extension in extensions:
+            with self._lock:
+                if extension in self._refilling:
+                    continue
+                self._refilling.add(extension)
+            self._start_refill(extension)
+
+    def _start_refill(self, extension: Optional[str]) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fastcloud-upload-url-pool")
+            executor, generation = self._executor, self._generation
+        executor.submit(self._refill, extension, generation)
+
+    def _refill(self, extension: Optional[str], generation: int) -> None:
+        """Top up the pool of an extension to size. Runs in the background thread."""
+        try:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                missing = self.size - len(self._discard_expired(extension, time.time()))
+            if missing > 0 and self.fetch is not None:
+                issued_at = time.time()
+                self._add(extension, self.fetch(extension, missing), issued_at, generation)
+        except Exception as e:
+            with self._lock:
+                self.refill_errors += 1
+            logger.warning("Refilling the upload URL pool for extension %r failed: %s", extension, e)
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._refilling.discard(extension)
+
+    def available(self, extension: Optional[str]) -> int:
+        """Number of pooled URLs of an extension which are still valid."""
+        with self._lock:
+            return len(self._discard_expired(extension, time.time()))
+
+    def stats(self) -> dict:
+        """Hit / miss counters, discarded expired URLs and failed refills."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "refill_errors": self.refill_errors,
+                "available": {extension: len(urls) for extension, urls in self._urls.items()},
+            }
+
+    def close(self) -> None:
+        """Stop the background refills and drop all pooled URLs. The pool reopens on its next use."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._urls.clear()
+            # cancelled refills never reach their finally block
+            self._refilling.clear()
+            self._generation += 1
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
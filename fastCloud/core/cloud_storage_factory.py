@@ -1,7 +1,98 @@
-from typing import Union
-from fastCloud.core import (
-    CloudStorage, FastCloud, AzureBlobStorage, S3Storage, BaseUploadAPI, ReplicateUploadAPI, SocaityUploadAPI
-)
+import os
+import threading
+from typing import Union, TYPE_CHECKING, Optional, Dict, Tuple, List
+from urllib.parse import urlsplit, urlunsplit
+from fastCloud.core.i_fast_cloud import FastCloud
+from fastCloud.core.storage_providers.i_cloud_storage import CloudStorage
+
+if TYPE_CHECKING:
+    from fastCloud.core.api_providers.i_upload_api import BaseUploadAPI
+
+# normalised configuration -> shared provider instance, see create_fast_cloud(shared=True)
+_instances: Dict[Tuple, FastCloud] = {}
+_instances_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """
+    A forked child must not share sockets, locks or event loop bound clients with its parent.
+    The inherited instances are dropped, not closed: closing them would shut down connections the parent still uses.
+    """
+    global _instances_lock
+    _instances.clear()
+    _instances_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _normalize(value: Optional[str]) -> Optional[str]:
+    value = value.strip() if value else None
+    return value or None
+
+
+def _normalize_url(url: Optional[str]) -> Optional[str]:
+    """Scheme and host are case-insensitive and a trailing slash does not change the endpoint."""
+    url = _normalize(url)
+    if url is None:
+        return None
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, parts.fragment))
+
+
+def _normalize_connection_string(connection_string: Optional[str]) -> Optional[str]:
+    """The order of the Key=Value pairs and empty pairs don't matter."""
+    connection_string = _normalize(connection_string)
+    if connection_string is None:
+        return None
+    return ";".join(sorted(part.strip() for part in connection_string.split(";") if part.strip()))
+
+
+def _config_key(
+        azure_sas_access_token: str, azure_connection_string: str,
+        s3_endpoint_url: str, s3_access_key_id: str, s3_access_key_secret: str,
+        api_upload_endpoint: str, api_upload_api_key: str
+) -> Optional[Tuple]:
+    """Normalised configuration of the provider create_fast_cloud selects, or None if nothing is configured."""
+    azure_sas_access_token = _normalize(azure_sas_access_token)
+    azure_connection_string = _normalize_connection_string(azure_connection_string)
+    if azure_sas_access_token or azure_connection_string:
+        return "azure", azure_sas_access_token.lstrip("?") if azure_sas_access_token else None, azure_connection_string
+
+    s3_endpoint_url = _normalize_url(s3_endpoint_url)
+    s3_access_key_id = _normalize(s3_access_key_id)
+    s3_access_key_secret = _normalize(s3_access_key_secret)
+    if s3_endpoint_url or s3_access_key_id or s3_access_key_secret:
+        return "s3", s3_endpoint_url, s3_access_key_id, s3_access_key_secret
+
+    api_upload_endpoint = _normalize_url(api_upload_endpoint)
+    if api_upload_endpoint:
+        if "socaity" in api_upload_endpoint:
+            return "socaity", api_upload_endpoint, _normalize(api_upload_api_key)
+        if "replicate" in api_upload_endpoint:
+            return "replicate", api_upload_endpoint, _normalize(api_upload_api_key)
+
+    return None
+
+
+def _build(key: Tuple) -> FastCloud:
+    """
+    Create the provider instance for a normalised configuration.
+    Only the SDK of the selected provider is imported.
+    """
+    provider, *config = key
+    if provider == "azure":
+        from fastCloud.core.storage_providers.azure_storage import AzureBlobStorage
+        return AzureBlobStorage(sas_access_token=config[0], connection_string=config[1])
+    if provider == "s3":
+        from fastCloud.core.storage_providers.s3_storage import S3Storage
+        return S3Storage(*config)
+    if provider == "socaity":
+        from fastCloud.core.api_providers.socaity import SocaityUploadAPI
+        return SocaityUploadAPI(api_key=config[1], upload_endpoint=config[0])
+    from fastCloud.core.api_providers.replicate import ReplicateUploadAPI
+    return ReplicateUploadAPI(api_key=config[1], upload_endpoint=config[0])
 
 
 def create_fast_cloud(
@@ -14,21 +105,66 @@ def create_fast_cloud(
         s3_access_key_secret: str = None,
         # for api_providers
         api_upload_endpoint: str = None,
-        api_upload_api_key: str = None
-) -> Union[FastCloud, CloudStorage, BaseUploadAPI, None]:
+        api_upload_api_key: str = None,
+        shared: bool = False
+) -> Union[FastCloud, CloudStorage, "BaseUploadAPI", None]:
     """
     Creates a cloud storage instance based on the configuration. If no configuration is given, None is returned.
+    Only the SDK of the selected provider is imported.
+    :param shared: Return the process-wide instance of this configuration instead of a new one, so its clients,
+        connection pools and credentials are reused across callers. Repeated calls cost a dictionary lookup. Its
+        state (scheduler, retry policy, instrumentation, dedup index, URL pool) is shared as well, and closing it
+        affects every holder; providers reopen their clients on the next call. Release it with evict_fast_cloud /
+        close_fast_clouds. After os.fork the child starts with an empty registry.
     """
-    if azure_sas_access_token or azure_connection_string:
-        return AzureBlobStorage(sas_access_token=azure_sas_access_token, connection_string=azure_connection_string)
+    key = _config_key(
+        azure_sas_access_token, azure_connection_string,
+        s3_endpoint_url, s3_access_key_id, s3_access_key_secret,
+        api_upload_endpoint, api_upload_api_key
+    )
+    if key is None:
+        return None
+    if not shared:
+        return _build(key)
 
-    if s3_endpoint_url or s3_access_key_id or s3_access_key_secret:
-        return S3Storage(s3_endpoint_url, s3_access_key_id, s3_access_key_secret)
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+    with _instances_lock:
+        instance = _instances.get(key)
+        if instance is None:
+            instance = _instances[key] = _build(key)
+        return instance
+
+
+def _pop_instances(cloud: FastCloud = None) -> List[FastCloud]:
+    """Remove the given instance, or all instances if cloud is None, from the registry and return them."""
+    with _instances_lock:
+        keys = [key for key, instance in _instances.items() if cloud is None or instance is cloud]
+        return [_instances.pop(key) for key in keys]
+
+
+def evict_fast_cloud(cloud: FastCloud, close: bool = True) -> bool:
+    """
+    Removes a shared instance from the registry; the next create_fast_cloud call with its configuration builds a new one.
+    :param cloud: The instance returned by create_fast_cloud.
+    :param close: Also close its clients and connection pools. Set to False if other callers still hold it.
+    :return: True if the instance was registered.
+    """
+    evicted = _pop_instances(cloud)
+    if close:
+        for instance in evicted:
+            instance.close()
+    return len(evicted) > 0
+
+
+def close_fast_clouds() -> None:
+    """Closes all shared instances and empties the registry. Inside a running event loop prefer aclose_fast_clouds."""
+    for instance in _pop_instances():
+        instance.close()
 
-    if api_upload_endpoint:
-        if "socaity" in api_upload_endpoint:
-            return SocaityUploadAPI(api_key=api_upload_api_key, upload_endpoint=api_upload_endpoint)
-        if "replicate" in api_upload_endpoint:
-            return ReplicateUploadAPI(api_key=api_upload_api_key, upload_endpoint=api_upload_endpoint)
 
-    return None
\ No newline at end of file
+async def aclose_fast_clouds() -> None:
+    """Closes all shared instances, including their async clients of the running event loop, and empties the registry."""
+    for instance in _pop_instances():
+        await instance.aclose()
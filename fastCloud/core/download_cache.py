@@ -0,0 +1,343 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple, Union, List, Any
+from urllib.parse import urlparse
+
+from media_toolkit import MediaFile
+
+from fastCloud.core.i_fast_cloud import FastCloud
+from fastCloud.core.instrumentation import instrumented
+from fastCloud.core.mmap_file import media_file_from_mmap, remove_file
+from fastCloud.core.streaming import DEFAULT_CHUNK_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _FileLock:
+    """Exclusive inter-process lock on a lock file (flock on POSIX, msvcrt.locking on Windows)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+
+
+class DownloadCache:
+    """
+    On-disk cache for downloads, shared safely by several processes.
+
+    Objects are stored content-addressed by URL + validator (ETag, else Last-Modified). A cached URL is revalidated
+    with a conditional request (If-None-Match / If-Modified-Since); if the object is unchanged, the cached file is
+    used and nothing is transferred. The cache is bounded by total bytes and evicts least recently used objects.
+    A file lock per URL makes concurrent processes wait for one download instead of all fetching the same object.
+
+    Layout of cache_dir:
+        objects/<sha256(url, validator)>   the cached content
+        index/<sha256(url)>.json           validators and metadata of the URL's current object
+        locks/<sha256(url)>.lock           per-URL lock files, .lock guards eviction
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = 10 * 1024 ** 3, max_age: float = 0):
+        """
+        :param cache_dir: Directory of the cache. Defaults to <tempdir>/fastcloud-cache.
+        :param max_bytes: Upper bound for the total size of cached objects. Least recently used ones are evicted.
+        :param max_age: Seconds after a validation in which a cached object is used without revalidating it.
+            0 revalidates on every access.
+        """
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "fastcloud-cache")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self._objects_dir = os.path.join(self.cache_dir, "objects")
+        self._index_dir = os.path.join(self.cache_dir, "index")
+        self._locks_dir = os.path.join(self.cache_dir, "locks")
+        for directory in (self._objects_dir, self._index_dir, self._locks_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        # counters of this process
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+    @staticmethod
+    def _hash(*parts: str) -> str:
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def stats(self) -> dict:
+        """Hit / miss counters and the bytes served from the cache instead of the network (this process only)."""
+        with self._stats_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "bytes_saved": self.bytes_saved,
+                "bytes_downloaded": self.bytes_downloaded,
+            }
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _read_entry(self, url_key: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._index_dir, f"{url_key}.json"), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # the object may have been evicted by another process
+        if not os.path.exists(os.path.join(self._objects_dir, entry["object"])):
+            return None
+        return entry
+
+    def _write_entry(self, url_key: str, entry: dict):
+        """Index files are replaced atomically, so readers never see a partial entry."""
+        path = os.path.join(self._index_dir, f"{url_key}.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def fetch(self, cloud: FastCloud, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[str, Optional[str]]:
+        """
+        Return the path of the cached object for url, downloading it with cloud.iter_download if it is missing or
+        has changed.
+        :param cloud: The provider to download with.
+        :param url: The URL of the object.
+        :param chunk_size: Chunk size used to stream the object into the cache.
+        :return: (path of the cached file, content type)
+        """
+        url_key = self._hash(url)
+        with _FileLock(os.path.join(self._locks_dir, f"{url_key}.lock")):
+            entry = self._read_entry(url_key)
+            if entry is not None and self.max_age and time.time() - entry["validated_at"] < self.max_age:
+                hit = self._hit(entry)
+                if hit is not None:
+                    return hit
+                entry = None
+
+            conditional = {}
+            if entry is not None and entry.get("etag"):
+                conditional["if_none_match"] = entry["etag"]
+            elif entry is not None and entry.get("last_modified"):
+                conditional["if_modified_since"] = entry["last_modified"]
+
+            with cloud.iter_download(url, chunk_size, **conditional) as stream:
+                not_modified = stream.not_modified and entry is not None
+                if not_modified:
+                    hit = self._hit(entry)
+                    if hit is not None:
+                        entry["validated_at"] = time.time()
+                        self._write_entry(url_key, entry)
+                        self._count(revalidations=1)
+                        return hit
+                else:
+                    new_entry = self._store(url, stream)
+            if not_modified:
+                # unchanged, but evicted by another process after the lookup: download it again
+                with cloud.iter_download(url, chunk_size) as stream:
+                    new_entry = self._store(url, stream)
+
+            self._write_entry(url_key, new_entry)
+            if entry is not None and entry["object"] != new_entry["object"]:
+                remove_file(os.path.join(self._objects_dir, entry["object"]))
+
+        path = os.path.join(self._objects_dir, new_entry["object"])
+        self._count(misses=1, bytes_downloaded=new_entry["size"])
+        self.evict(keep=path)
+        return path, new_entry["content_type"]
+
+    def _hit(self, entry: dict) -> Optional[Tuple[str, Optional[str]]]:
+        """(path, content type) of a cached object, None if it was evicted by another process meanwhile."""
+        path = os.path.join(self._objects_dir, entry["object"])
+        # the mtime is the LRU clock
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self._count(hits=1, bytes_saved=entry["size"])
+        return path, entry.get("content_type")
+
+    def _store(self, url: str, stream) -> dict:
+        """Stream the response into a temp file and move it into place."""
+        object_name = self._hash(url, stream.etag or stream.last_modified or "")
+        path = os.path.join(self._objects_dir, object_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in stream:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            remove_file(tmp_path)
+            raise
+        return {
+            "url": url,
+            "object": object_name,
+            "etag": stream.etag,
+            "last_modified": stream.last_modified,
+            "content_type": stream.content_type,
+            "size": size,
+            "validated_at": time.time(),
+        }
+
+    def evict(self, keep: str = None):
+        """
+        Remove least recently used objects until the cache fits into max_bytes.
+        :param keep: Path of an object which must not be evicted (the one just downloaded).
+        """
+        with _FileLock(os.path.join(self._locks_dir, ".lock")):
+            objects = []
+            for entry in os.scandir(self._objects_dir):
+                if entry.name.endswith(".tmp") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                objects.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in objects)
+            for _, size, path in sorted(objects):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                remove_file(path)
+                total -= size
+
+    def invalidate(self, url: str):
+        """Drop the cached object of url."""
+        url_key = self._hash(url)
+        with _FileLock(os.path.join(self._locks_dir, f"{url_key}.lock")):
+            entry = self._read_entry(url_key)
+            remove_file(os.path.join(self._index_dir, f"{url_key}.json"))
+            if entry is not None:
+                remove_file(os.path.join(self._objects_dir, entry["object"]))
+
+    def clear(self):
+        """Remove all cached objects."""
+        with _FileLock(os.path.join(self._locks_dir, ".lock")):
+            for directory in (self._objects_dir, self._index_dir):
+                shutil.rmtree(directory, ignore_errors=True)
+                os.makedirs(directory, exist_ok=True)
+
+
+class CachedCloud(FastCloud):
+    """
+    Wraps any FastCloud provider with a DownloadCache. Downloads are served from the cache when the object is unchanged;
+    all other operations are passed through to the provider.
+
+    Usage:
+        cloud = CachedCloud(S3Storage(...), cache_dir="/var/cache/models", max_bytes=50 * 1024**3)
+        weights = cloud.download(url)   # memory-mapped cached file
+        cloud.cache.stats()             # {'hits': ..., 'misses': ..., 'bytes_saved': ...}
+    """
+
+    def __init__(self, cloud: FastCloud, cache: DownloadCache = None, **cache_kwargs):
+        """
+        :param cloud: The provider to wrap.
+        :param cache: A DownloadCache to use. Share one between providers to bound their total size.
+        :param cache_kwargs: Arguments for a new DownloadCache (cache_dir, max_bytes, max_age) if cache is None.
+        """
+        super().__init__(
+            scheduler=cloud.scheduler,
+            max_workers=getattr(cloud, "max_workers", None),
+            retry_policy=cloud.retry_policy,
+            instrumentation=getattr(cloud, "instrumentation", None)
+        )
+        self.cloud = cloud
+        self.cache = cache if cache is not None else DownloadCache(**cache_kwargs)
+
+    def __getattr__(self, name: str):
+        # provider specific attributes and methods
+        if name == "cloud":
+            raise AttributeError(name)
+        return getattr(self.cloud, name)
+
+    @instrumented("download")
+    def download(self, url: str, save_path: str = None, *args, **kwargs) -> Union[MediaFile, str]:
+        """
+        Download through the cache.
+        :param url: The URL of the file.
+        :param save_path: Copy the cached file to this path. If None a MediaFile memory-mapping the cached file is
+            returned, so a cache hit is a local file open.
+        """
+        for attempt in range(2):
+            try:
+                path, content_type = self.cache.fetch(self.cloud, url)
+                if save_path is not None:
+                    shutil.copyfile(path, save_path)
+                    return save_path
+                file_name = os.path.basename(urlparse(url).path)
+                return media_file_from_mmap(path, content_type=content_type, file_name=file_name)
+            except FileNotFoundError:
+                # evicted by another process right after the lookup
+                if attempt:
+                    raise
+
+    @instrumented("download")
+    async def download_async(self, url: str, save_path: str = None, *args, **kwargs) -> Union[MediaFile, str]:
+        """Async variant of download. Cache locking and revalidation run in a worker thread."""
+        return await asyncio.to_thread(self.download, url, save_path, *args, **kwargs)
+
+    def upload(self, file: Any, *args, **kwargs) -> Union[str, List[str], dict]:
+        return self.cloud.upload(file, *args, **kwargs)
+
+    async def upload_async(self, file: Any, *args, **kwargs) -> Union[str, List[str], dict]:
+        return await self.cloud.upload_async(file, *args, **kwargs)
+
+    def iter_download(self, url: str, *args, **kwargs):
+        return self.cloud.iter_download(url, *args, **kwargs)
+
+    async def aiter_download(self, url: str, *args, **kwargs):
+        return await self.cloud.aiter_download(url, *args, **kwargs)
+
+    def delete(self, url: Union[str, List[str]], *args, **kwargs) -> Union[bool, List[bool]]:
+        for u in [url] if isinstance(url, str) else url or []:
+            self.cache.invalidate(u)
+        return self.cloud.delete(url, *args, **kwargs)
+
+    async def delete_async(self, url: Union[str, List[str]], *args, **kwargs) -> Union[bool, List[bool]]:
+        for u in [url] if isinstance(url, str) else url or []:
+            self.cache.invalidate(u)
+        return await self.cloud.delete_async(url, *args, **kwargs)
+
+    def create_temporary_upload_link(self, *args, **kwargs) -> str:
+        return self.cloud.create_temporary_upload_link(*args, **kwargs)
+
+    def close(self) -> None:
+        self.cloud.close()
+
+    async def aclose(self) -> None:
+        await self.cloud.aclose()
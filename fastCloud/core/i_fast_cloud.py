@@ -1,65 +1,141 @@
-from typing import Union, List, Any
+from typing import Union, List, Any, Optional, Callable, Iterable
 from media_toolkit import IMediaContainer, IMediaFile, MediaFile, MediaDict, MediaList, media_from_any
 
+from fastCloud.core.instrumentation import (
+    Instrumentation, instrumented, upload_bucket, mark_phase, count_transfer, current_operation
+)
+from fastCloud.core.retry import RetryPolicy
+from fastCloud.core.scheduler import ConcurrencyScheduler
+from fastCloud.core.streaming import UploadSource, DownloadStream, AsyncDownloadStream, DEFAULT_CHUNK_SIZE
+from fastCloud.core.transfer import map_threaded
+
+
+class _LeafSlot:
+    """Placeholder for a leaf file in a flattened container tree; holds the index of its upload result."""
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        self.index = index
+
 
 class FastCloud:
     """
     This is the interface for cloud storage services. Implement this interface to add a new cloud storage provider.
     """
-    def _upload_files(self, files: Union[MediaFile, List[MediaFile]], *args, **kwargs) -> Union[str, List[str]]:
+    def __init__(
+            self,
+            max_concurrency: Optional[int] = 64,
+            max_concurrency_per_host: Optional[int] = None,
+            scheduler: ConcurrencyScheduler = None,
+            max_workers: Optional[int] = None,
+            retry_policy: RetryPolicy = None,
+            instrumentation: Instrumentation = None,
+            **kwargs
+    ):
+        """
+        :param max_concurrency: Maximum number of async operations in flight at once (None = unbounded).
+        :param max_concurrency_per_host: Maximum number of async operations in flight per host.
+        :param scheduler: A ConcurrencyScheduler to use instead of creating one. Share one scheduler between
+            several providers to give them a common budget. Overrides max_concurrency(_per_host).
+        :param max_workers: Number of threads the sync methods use for batches (uploads, download_many, deletes).
+            None or 1 processes batches one file at a time. Can be overridden per call with the max_workers kwarg.
+        :param retry_policy: Retries, backoff, deadline and hedging of all requests. Defaults to RetryPolicy().
+            Share one policy between providers to share its latency statistics.
+        :param instrumentation: Receives an OperationEvent (latency per phase, bytes, objects, retries, errors) for
+            every upload, download and delete. None disables instrumentation.
+        """
+        if scheduler is None:
+            scheduler = ConcurrencyScheduler(max_concurrency, max_concurrency_per_host)
+        self._scheduler = scheduler
+        self._retry_policy = retry_policy
+        self.max_workers = max_workers
+        self.instrumentation = instrumentation
+
+    @property
+    def scheduler(self) -> ConcurrencyScheduler:
+        """The scheduler bounding all async fan-outs of this provider."""
+        if getattr(self, "_scheduler", None) is None:
+            # subclasses which don't call FastCloud.__init__ still get default limits
+            self._scheduler = ConcurrencyScheduler()
+        return self._scheduler
+
+    @scheduler.setter
+    def scheduler(self, scheduler: ConcurrencyScheduler):
+        self._scheduler = scheduler
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """The retry policy of all requests of this provider."""
+        if getattr(self, "_retry_policy", None) is None:
+            self._retry_policy = RetryPolicy()
+        return self._retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, retry_policy: RetryPolicy):
+        self._retry_policy = retry_policy
+
+    def _map(self, func: Callable[[Any], Any], items: Iterable, max_workers: Optional[int] = None) -> list:
+        """
+        Run func for every item of a sync batch, in a thread pool if max_workers (or self.max_workers) > 1.
+        :return: The results in input order.
+        """
+        if max_workers is None:
+            max_workers = getattr(self, "max_workers", None)
+        return map_threaded(func, items, max_workers)
+
+    def _upload_files(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], *args, **kwargs
+    ) -> Union[str, List[str]]:
         """
         Upload a file or a list of files to the cloud.
+        Implementations should read the content through UploadSource.from_any(file) to stream it.
         :param files: The list of files to upload.
         :return: The URL(s) of the uploaded file(s).
         """
         raise NotImplementedError("Implement in subclass")
 
-    async def _upload_files_async(self, files: Union[MediaFile, List[MediaFile]], *args, **kwargs) -> Union[str, List[str]]:
+    async def _upload_files_async(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], *args, **kwargs
+    ) -> Union[str, List[str]]:
         """
         Upload a file or a list of files to the cloud asynchronously.
+        Implementations should read the content through UploadSource.from_any(file) to stream it.
         :param files: The list of files to upload.
         :return: The URL(s) of the uploaded file(s).
         """
         raise NotImplementedError("Implement in subclass")
 
+    @instrumented("upload", phase="prepare", bucket=upload_bucket)
     def upload(self, file: Union[IMediaContainer, MediaFile, Any], *args, **kwargs) -> Union[str, List[str], dict]:
         """
         Upload one or more file(s) to the cloud.
         :param file: The file(s) to upload. The input is parsed to MediaFile if it is not already.
+            File paths, open binary file objects and iterators of byte chunks are streamed in chunks instead.
         :return:
             In case of input was a single file: The URL of the uploaded file.
             In case of input was list/MediaList of files: A list of URLs of the uploaded files.
             In case of input was dict/MediaDict of files: A dict with {key: url} pairs.
         """
-        if isinstance(file, MediaDict):
-            uploads = {}
-            leaf_files = file.get_leaf_files()
-            if len(leaf_files) > 0:
-                uploaded_leafes = self._upload_files(list(leaf_files.values()), *args, **kwargs)
-                if isinstance(uploaded_leafes, str):
-                    uploaded_leafes = [uploaded_leafes]
-                uploads.update(dict(zip(leaf_files.keys(), uploaded_leafes)))
-
-            media_containers = file.get_media_containers()
-            if len(media_containers) > 0:
-                uploaded_nested = {key: self.upload(container, *args, **kwargs) for key, container in media_containers.items()}
-                uploads.update(uploaded_nested)
-            return uploads
-
-        elif isinstance(file, MediaList):
-            includes_containers = any([isinstance(f, IMediaContainer) for f in file])
-            if includes_containers:
-                # we upload sequentially
-                return [self.upload(f, *args, **kwargs) for f in file]
-            else:
-                return self._upload_files(file.get_processable_files().to_list(), *args, **kwargs)
-
+        if isinstance(file, (MediaDict, MediaList)):
+            # the whole container tree is uploaded as one batch and rebuilt into its shape afterwards
+            leaves = []
+            template = self._flatten_container(file, leaves)
+            urls = self._upload_files(self._begin_upload(leaves), *args, **kwargs) if leaves else []
+            mark_phase("parse")
+            return self._rebuild_container(template, [urls] if isinstance(urls, str) else urls)
         elif isinstance(file, MediaFile):
-            return self._upload_files(file, *args, **kwargs)
+            return self._upload_files(self._begin_upload(file), *args, **kwargs)
+
+        # paths, file handles and chunk iterators are streamed instead of being loaded into a MediaFile
+        if UploadSource.is_streamable(file):
+            return self._upload_files(self._begin_upload(UploadSource.from_any(file)), *args, **kwargs)
+        if isinstance(file, (list, tuple)) and len(file) > 0 and all(UploadSource.is_streamable(f) for f in file):
+            return self._upload_files(self._begin_upload([UploadSource.from_any(f) for f in file]), *args, **kwargs)
 
         file = media_from_any(file)
         return self.upload(file, *args, **kwargs)
 
+    @instrumented("upload", phase="prepare", bucket=upload_bucket)
     async def upload_async(
         self,
         file: Union[IMediaContainer, MediaFile, Any],
@@ -68,39 +144,77 @@ class FastCloud:
         """
         Upload one or more file(s) to the cloud.
         :param file: The file(s) to upload. The input is parsed to MediaFile if it is not already.
+            File paths, open binary file objects and iterators of byte chunks are streamed in chunks instead.
         :return:
             In case of input was a single file: The URL of the uploaded file.
             In case of input was list/MediaList of files: A list of URLs of the uploaded files.
             In case of input was dict/MediaDict of files: A dict with {key: url} pairs.
         """
-        if isinstance(file, MediaDict):
-            uploads = {}
-            leaf_files = file.get_leaf_files()
-            if len(leaf_files) > 0:
-                uploaded_leafes = await self._upload_files_async(list(leaf_files.values()), *args, **kwargs)
-                if isinstance(uploaded_leafes, str):
-                    uploaded_leafes = [uploaded_leafes]
-                uploads.update(dict(zip(leaf_files.keys(), uploaded_leafes)))
-
-            media_containers = file.get_media_containers()
-            if len(media_containers) > 0:
-                uploaded_nested = {key: await self.upload_async(container, *args, **kwargs) for key, container in media_containers.items()}
-                uploads.update(uploaded_nested)
-            return uploads
-
-        elif isinstance(file, MediaList):
-            includes_containers = any([isinstance(f, IMediaContainer) for f in file])
-            if includes_containers:
-                # we upload sequentially
-                return [await self.upload_async(f, *args, **kwargs) for f in file]
-            else:
-                return await self._upload_files_async(file.get_processable_files().to_list(), *args, **kwargs)
+        if isinstance(file, (MediaDict, MediaList)):
+            # the whole container tree is uploaded as one concurrent batch and rebuilt into its shape afterwards
+            leaves = []
+            template = self._flatten_container(file, leaves)
+            urls = await self._upload_files_async(self._begin_upload(leaves), *args, **kwargs) if leaves else []
+            mark_phase("parse")
+            return self._rebuild_container(template, [urls] if isinstance(urls, str) else urls)
         elif isinstance(file, MediaFile):
-            return await self._upload_files_async(file, *args, **kwargs)
+            return await self._upload_files_async(self._begin_upload(file), *args, **kwargs)
+
+        # paths, file handles and chunk iterators are streamed instead of being loaded into a MediaFile
+        if UploadSource.is_streamable(file):
+            return await self._upload_files_async(self._begin_upload(UploadSource.from_any(file)), *args, **kwargs)
+        if isinstance(file, (list, tuple)) and len(file) > 0 and all(UploadSource.is_streamable(f) for f in file):
+            sources = [UploadSource.from_any(f) for f in file]
+            return await self._upload_files_async(self._begin_upload(sources), *args, **kwargs)
 
         file = media_from_any(file)
         return await self.upload_async(file, *args, **kwargs)
 
+    @staticmethod
+    def _begin_upload(files: Union[MediaFile, UploadSource, list]) -> Union[MediaFile, UploadSource, list]:
+        """Report the batch to the running instrumented operation (if any) and enter its network phase."""
+        if current_operation() is not None:
+            batch = files if isinstance(files, list) else [files]
+            count_transfer(sum(UploadSource.from_any(f).size or 0 for f in batch), len(batch))
+            mark_phase("network")
+        return files
+
+    @staticmethod
+    def _flatten_container(container: Union[MediaDict, MediaList], leaves: list) -> Union[dict, list]:
+        """
+        Collect the files of a (nested) MediaDict / MediaList into leaves, so the whole tree is uploaded as one batch.
+        :param container: The container to flatten.
+        :param leaves: List the files are appended to.
+        :return: A template of dicts and lists in the shape of the container with a _LeafSlot per file.
+        """
+        def add_leaf(file) -> _LeafSlot:
+            if not isinstance(file, (MediaFile, UploadSource)):
+                file = UploadSource.from_any(file) if UploadSource.is_streamable(file) else media_from_any(file)
+            leaves.append(file)
+            return _LeafSlot(len(leaves) - 1)
+
+        if isinstance(container, MediaDict):
+            template = {key: add_leaf(f) for key, f in container.get_leaf_files().items()}
+            for key, nested in container.get_media_containers().items():
+                template[key] = FastCloud._flatten_container(nested, leaves)
+            return template
+
+        if not any(isinstance(f, IMediaContainer) for f in container):
+            return [add_leaf(f) for f in container.get_processable_files().to_list()]
+        return [
+            FastCloud._flatten_container(f, leaves) if isinstance(f, IMediaContainer) else add_leaf(f)
+            for f in container
+        ]
+
+    @staticmethod
+    def _rebuild_container(template: Union[dict, list, _LeafSlot], urls: List[str]) -> Union[dict, list, str]:
+        """Replace the _LeafSlots of a template from _flatten_container with the upload results."""
+        if isinstance(template, _LeafSlot):
+            return urls[template.index]
+        if isinstance(template, dict):
+            return {key: FastCloud._rebuild_container(value, urls) for key, value in template.items()}
+        return [FastCloud._rebuild_container(value, urls) for value in template]
+
     def download(self, url: str, *args, **kwargs) -> IMediaFile:
         """
         Downloads a file from the cloud storage and parses it to MediaFile
@@ -117,6 +231,58 @@ class FastCloud:
         """
         raise NotImplementedError("Implement in subclass")
 
+    @instrumented("download_many")
+    def download_many(
+            self, urls: List[str], save_paths: List[str] = None, *args, **kwargs
+    ) -> List[Union[IMediaFile, str]]:
+        """
+        Download several files. With max_workers > 1 (kwarg or provider setting) they are downloaded in parallel
+        threads sharing the provider's client.
+        :param urls: The URLs of the files.
+        :param save_paths: One save path per URL. If None the files are returned as MediaFiles.
+        :return: One result of download() per URL, in input order.
+        """
+        max_workers = kwargs.pop("max_workers", None)
+        save_paths = save_paths if save_paths is not None else [None] * len(urls)
+        if len(save_paths) != len(urls):
+            raise ValueError("save_paths must contain one path per URL")
+        return self._map(
+            lambda item: self.download(item[0], item[1], *args, **kwargs), list(zip(urls, save_paths)), max_workers
+        )
+
+    @instrumented("download_many")
+    async def download_many_async(
+            self, urls: List[str], save_paths: List[str] = None, *args, **kwargs
+    ) -> List[Union[IMediaFile, str]]:
+        """Async variant of download_many. The downloads run concurrently through the scheduler."""
+        save_paths = save_paths if save_paths is not None else [None] * len(urls)
+        if len(save_paths) != len(urls):
+            raise ValueError("save_paths must contain one path per URL")
+        return await self.scheduler.gather(
+            [self.download_async(url, save_path, *args, **kwargs) for url, save_path in zip(urls, save_paths)]
+        )
+
+    def iter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> DownloadStream:
+        """
+        Stream a file from the cloud storage in chunks instead of loading it into memory.
+        :param url: The URL of the file to download.
+        :param chunk_size: Size of the yielded chunks in bytes. Only the last chunk may be shorter.
+        :param if_none_match: (kwarg) ETag for a conditional download. If the file is unchanged, the returned
+            stream has not_modified=True and no content. if_modified_since (HTTP date) works alike.
+        :return: A DownloadStream exposing content_length, content_type and the etag / last_modified validators.
+            Iterate it to receive the chunks.
+        """
+        raise NotImplementedError("Implement in subclass")
+
+    async def aiter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> AsyncDownloadStream:
+        """
+        Stream a file from the cloud storage in chunks asynchronously.
+        :param url: The URL of the file to download.
+        :param chunk_size: Size of the yielded chunks in bytes. Only the last chunk may be shorter.
+        :return: An AsyncDownloadStream exposing content_length and content_type. Use 'async for' to receive the chunks.
+        """
+        raise NotImplementedError("Implement in subclass")
+
     def delete(self, url: str, *args, **kwargs) -> bool:
         """
         Deletes a file from the cloud storage.
@@ -131,3 +297,49 @@ class FastCloud:
         :return: The URL to upload the file to.
         """
         raise NotImplementedError("Implement in subclass")
+
+    def create_temporary_upload_links(
+            self, file_names: Union[int, List[str]], time_limit: int = 20, *args, **kwargs
+    ) -> List[str]:
+        """
+        Creates temporary upload links for many files in one call.
+        :param file_names: Names of the files, or the number of links to create with random names.
+        :param time_limit: Minutes the links stay valid.
+        :return: The URLs to upload the files to, in the order of file_names.
+        """
+        raise NotImplementedError("Implement in subclass")
+
+    def create_temporary_download_links(self, urls: List[str], time_limit: int = 20, *args, **kwargs) -> List[str]:
+        """
+        Creates temporary read links for many stored files in one call.
+        :param urls: The URLs of the files as returned by upload.
+        :param time_limit: Minutes the links stay valid.
+        :return: The signed URLs, in the order of urls.
+        """
+        raise NotImplementedError("Implement in subclass")
+
+    def close(self) -> None:
+        """
+        Releases long-lived clients and connection pools held by the provider.
+        Providers without persistent resources don't need to override this.
+        """
+        pass
+
+    async def aclose(self) -> None:
+        """
+        Releases long-lived clients and connection pools held by the provider asynchronously.
+        Must be awaited on the event loop the async clients were used on.
+        """
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
@@ -0,0 +1,419 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from media_toolkit.utils.dependency_requirements import requires
+
+logger = logging.getLogger(__name__)
+
+# phases an operation's latency is split into
+PHASES = ("prepare", "network", "parse")
+# upper bounds of the size classes used as metric label
+SIZE_CLASSES = (
+    (64 * 1024, "<64KB"),
+    (1024 ** 2, "<1MB"),
+    (16 * 1024 ** 2, "<16MB"),
+    (256 * 1024 ** 2, "<256MB"),
+)
+
+# the operation running in the current thread / task. Worker threads and tasks of an operation inherit it.
+_current_operation: contextvars.ContextVar = contextvars.ContextVar("fastcloud_operation", default=None)
+# False within nested operations (e.g. the downloads of download_many): they run concurrently, so only the outer
+# operation switches phases
+_owns_phases: contextvars.ContextVar = contextvars.ContextVar("fastcloud_owns_phases", default=True)
+
+
+class OperationEvent:
+    """
+    Measurements of one storage operation (upload, download, delete, ...), passed to Instrumentation.on_operation.
+    Latency is split into phases: prepare (reading / hashing sources), network (requests) and parse (building the
+    result, e.g. the MediaFile of a download).
+    """
+
+    def __init__(self, provider: str, operation: str, bucket: str = None, phase: str = "network"):
+        self.provider = provider
+        self.operation = operation
+        self.bucket = bucket
+        self.bytes = 0
+        self.objects = 0
+        self.retries = 0
+        # objects the operation failed on without raising, e.g. the failed part of a batch delete
+        self.failed_objects = 0
+        self.error: Optional[BaseException] = None
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.started = time.time()
+        self._phase = phase
+        self._phase_started = time.perf_counter()
+
+    def enter_phase(self, phase: str):
+        """Account the time since the last switch to the current phase and continue with phase."""
+        now = time.perf_counter()
+        self.phases[self._phase] += now - self._phase_started
+        self._phase = phase
+        self._phase_started = now
+
+    def finish(self):
+        self.enter_phase(self._phase)
+
+    @property
+    def latency(self) -> float:
+        """Total duration of the operation in seconds."""
+        return sum(self.phases.values())
+
+    @property
+    def status(self) -> str:
+        return "ok" if self.error is None and not self.failed_objects else "error"
+
+    @property
+    def size_class(self) -> str:
+        """Bucket of the average object size, for grouping metrics by file size."""
+        size = self.bytes / self.objects if self.objects else 0
+        for limit, label in SIZE_CLASSES:
+            if size < limit:
+                return label
+        return ">=256MB"
+
+    def to_dict(self) -> dict:
+        return {
+            "provider": self.provider,
+            "operation": self.operation,
+            "bucket": self.bucket,
+            "bytes": self.bytes,
+            "objects": self.objects,
+            "retries": self.retries,
+            "failed_objects": self.failed_objects,
+            "status": self.status,
+            "error": type(self.error).__name__ if self.error is not None else None,
+            "latency": self.latency,
+            **{f"{phase}_seconds": seconds for phase, seconds in self.phases.items()},
+        }
+
+    def __repr__(self):
+        return f"OperationEvent({self.to_dict()})"
+
+
+class Instrumentation:
+    """
+    Receives an OperationEvent after every upload, download, download_many, iter_download and delete of a provider.
+    Subclass it and override on_operation, or use PrometheusInstrumentation / OpenTelemetryInstrumentation.
+
+    Usage:
+        storage = S3Storage(..., instrumentation=PrometheusInstrumentation())
+    """
+
+    def on_operation(self, event: OperationEvent) -> None:
+        pass
+
+    def emit(self, event: OperationEvent):
+        """Call on_operation; errors of the instrumentation never fail the storage operation."""
+        try:
+            self.on_operation(event)
+        except Exception:
+            logger.exception("Instrumentation %r failed", self)
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Exports operations as Prometheus metrics (all labelled with provider and operation):
+        <namespace>_operations_total             counter, + bucket, size_class, status
+        <namespace>_operation_duration_seconds   histogram, + bucket, size_class
+        <namespace>_operation_phase_seconds      histogram, + phase
+        <namespace>_transferred_bytes_total      counter, + bucket
+        <namespace>_objects_total                counter, + bucket
+        <namespace>_retries_total                counter, + bucket
+        <namespace>_failed_objects_total         counter, + bucket
+    """
+
+    @requires("prometheus_client")
+    def __init__(self, namespace: str = "fastcloud", registry=None, bucket_label: bool = True, buckets: tuple = None):
+        """
+        :param namespace: Prefix of the metric names.
+        :param registry: The CollectorRegistry to register the metrics with. Defaults to the global registry.
+        :param bucket_label: Label metrics with the bucket / container. Disable it for many buckets (cardinality).
+        :param buckets: Histogram buckets in seconds. Defaults to prometheus_client's defaults.
+        """
+        import prometheus_client
+
+        registry = registry if registry is not None else prometheus_client.REGISTRY
+        self.bucket_label = bucket_label
+        histogram_kwargs = {"registry": registry}
+        if buckets is not None:
+            histogram_kwargs["buckets"] = buckets
+
+        labels = ("provider", "operation", "bucket")
+        self.operations = prometheus_client.Counter(
+            f"{namespace}_operations", "Storage operations", labels + ("size_class", "status"), registry=registry
+        )
+        self.duration = prometheus_client.Histogram(
+            f"{namespace}_operation_duration_seconds", "Duration of storage operations",
+            labels + ("size_class",), **histogram_kwargs
+        )
+        self.phase_duration = prometheus_client.Histogram(
+            f"{namespace}_operation_phase_seconds", "Duration of the phases of storage operations",
+            ("provider", "operation", "phase"), **histogram_kwargs
+        )
+        self.bytes = prometheus_client.Counter(
+            f"{namespace}_transferred_bytes", "Bytes uploaded or downloaded", labels, registry=registry
+        )
+        self.objects = prometheus_client.Counter(
+            f"{namespace}_objects", "Objects uploaded, downloaded or deleted", labels, registry=registry
+        )
+        self.retries = prometheus_client.Counter(
+            f"{namespace}_retries", "Retried requests", labels, registry=registry
+        )
+        self.failed_objects = prometheus_client.Counter(
+            f"{namespace}_failed_objects", "Objects a batch operation failed on", labels, registry=registry
+        )
+
+    def on_operation(self, event: OperationEvent) -> None:
+        bucket = (event.bucket or "") if self.bucket_label else ""
+        size_class = event.size_class
+        self.operations.labels(event.provider, event.operation, bucket, size_class, event.status).inc()
+        self.duration.labels(event.provider, event.operation, bucket, size_class).observe(event.latency)
+        for phase, seconds in event.phases.items():
+            if seconds:
+                self.phase_duration.labels(event.provider, event.operation, phase).observe(seconds)
+        if event.bytes:
+            self.bytes.labels(event.provider, event.operation, bucket).inc(event.bytes)
+        if event.objects:
+            self.objects.labels(event.provider, event.operation, bucket).inc(event.objects)
+        if event.retries:
+            self.retries.labels(event.provider, event.operation, bucket).inc(event.retries)
+        if event.failed_objects:
+            self.failed_objects.labels(event.provider, event.operation, bucket).inc(event.failed_objects)
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Records operations with the OpenTelemetry API: a span per operation (with the phase durations as attributes)
+    and the metrics fastcloud.operation.duration, fastcloud.operation.bytes, fastcloud.operation.objects,
+    fastcloud.operation.retries and fastcloud.operation.failed_objects. Without a configured SDK the API is a no-op.
+    """
+
+    @requires("opentelemetry")
+    def __init__(self, meter_provider=None, tracer_provider=None, spans: bool = True):
+        """
+        :param meter_provider: MeterProvider to use. Defaults to the global one.
+        :param tracer_provider: TracerProvider to use. Defaults to the global one.
+        :param spans: Record a span per operation in addition to the metrics.
+        """
+        from opentelemetry import metrics as otel_metrics, trace as otel_trace
+
+        meter = otel_metrics.get_meter("fastcloud", meter_provider=meter_provider)
+        self.duration = meter.create_histogram(
+            "fastcloud.operation.duration", unit="s", description="Duration of storage operations"
+        )
+        self.bytes = meter.create_counter(
+            "fastcloud.operation.bytes", unit="By", description="Bytes uploaded or downloaded"
+        )
+        self.objects = meter.create_counter(
+            "fastcloud.operation.objects", description="Objects uploaded, downloaded or deleted"
+        )
+        self.retries = meter.create_counter("fastcloud.operation.retries", description="Retried requests")
+        self.failed_objects = meter.create_counter(
+            "fastcloud.operation.failed_objects", description="Objects a batch operation failed on"
+        )
+        self.tracer = otel_trace.get_tracer("fastcloud", tracer_provider=tracer_provider) if spans else None
+        self._status = otel_trace.Status
+        self._error_code = otel_trace.StatusCode.ERROR
+
+    def on_operation(self, event: OperationEvent) -> None:
+        attributes = {
+            "fastcloud.provider": event.provider,
+            "fastcloud.operation": event.operation,
+            "fastcloud.bucket": event.bucket or "",
+            "fastcloud.size_class": event.size_class,
+            "fastcloud.status": event.status,
+        }
+        self.duration.record(event.latency, attributes)
+        self.bytes.add(event.bytes, attributes)
+        self.objects.add(event.objects, attributes)
+        if event.retries:
+            self.retries.add(event.retries, attributes)
+        if event.failed_objects:
+            self.failed_objects.add(event.failed_objects, attributes)
+
+        if self.tracer is None:
+            return
+        start = int(event.started * 1e9)
+        span = self.tracer.start_span(
+            f"fastcloud.{event.operation}",
+            start_time=start,
+            attributes={
+                **attributes,
+                "fastcloud.bytes": event.bytes,
+                "fastcloud.objects": event.objects,
+                "fastcloud.retries": event.retries,
+                "fastcloud.failed_objects": event.failed_objects,
+                **{f"fastcloud.{phase}_seconds": seconds for phase, seconds in event.phases.items()},
+            }
+        )
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(self._status(self._error_code, str(event.error)))
+        elif event.failed_objects:
+            span.set_status(self._status(self._error_code, f"failed on {event.failed_objects} objects"))
+        span.end(end_time=start + int(event.latency * 1e9))
+
+
+# ---------------------------------------------------------------------- #
+# Hooks used by the providers                                             #
+# ---------------------------------------------------------------------- #
+
+def current_operation() -> Optional[OperationEvent]:
+    """The instrumented operation running in this context, None if instrumentation is disabled."""
+    return _current_operation.get()
+
+
+def mark_phase(phase: str):
+    """Switch the running operation to phase. A single context variable lookup if instrumentation is disabled."""
+    event = _current_operation.get()
+    if event is not None and _owns_phases.get():
+        event.enter_phase(phase)
+
+
+def note_retry():
+    """Count a retried request for the running operation."""
+    event = _current_operation.get()
+    if event is not None:
+        event.retries += 1
+
+
+def note_failure(error: BaseException = None, objects: int = 0):
+    """
+    Report objects the running operation failed on without raising, e.g. the failed part of a batch delete.
+    The operation's status becomes "error"; error is reported as its error unless it already has one.
+    """
+    event = _current_operation.get()
+    if event is not None:
+        event.failed_objects += objects
+        if error is not None and event.error is None:
+            event.error = error
+
+
+def count_transfer(nbytes: int = 0, objects: int = 0):
+    """Add transferred bytes / objects to the running operation."""
+    event = _current_operation.get()
+    if event is not None:
+        event.bytes += nbytes
+        event.objects += objects
+
+
+def bucket_of(url: Any) -> Optional[str]:
+    """Bucket / container of a URL: the first path segment (path-style URLs), else the host."""
+    if isinstance(url, (list, tuple)):
+        url = url[0] if url else None
+    if not isinstance(url, str):
+        return None
+    parsed = urlparse(url)
+    return parsed.path.lstrip("/").split("/", 1)[0] or parsed.netloc
+
+
+def _measure_result(event: OperationEvent, result: Any):
+    """Count objects and bytes from the result of an operation whose provider didn't report them."""
+    if isinstance(result, (list, tuple)):
+        for item in result:
+            _measure_result(event, item)
+    elif isinstance(result, bool):
+        event.objects += int(result)
+    elif hasattr(result, "file_size"):  # MediaFile
+        event.objects += 1
+        event.bytes += result.file_size()
+    elif hasattr(result, "content_length"):  # DownloadStream: bytes are known up front, the body is not read yet
+        if not result.not_modified:
+            event.objects += 1
+            event.bytes += result.content_length or 0
+    elif isinstance(result, str) and os.path.isfile(result):  # save_path of a download
+        event.objects += 1
+        event.bytes += os.path.getsize(result)
+
+
+def instrumented(operation: str, phase: str = "network", bucket: Callable[[tuple, dict], Optional[str]] = None):
+    """
+    Decorator for the public operations of a FastCloud. If the provider has an instrumentation, the call is timed
+    and reported as OperationEvent; otherwise it costs an attribute lookup. Operations called from within an
+    instrumented operation (e.g. download from download_many) are part of the outer event.
+    :param operation: Name of the operation in the events.
+    :param phase: The phase the operation starts in.
+    :param bucket: Function (args, kwargs) -> bucket of the call. Defaults to the bucket of the first argument (URL).
+    """
+    bucket = bucket or (lambda args, kwargs: bucket_of(args[0]) if args else None)
+
+    def decorator(func):
+        def start(self, args, kwargs) -> Optional[OperationEvent]:
+            if getattr(self, "instrumentation", None) is None:
+                return None
+            return OperationEvent(type(self).__name__, operation, bucket(args, kwargs), phase)
+
+        def finish(self, event: OperationEvent, result: Any = None, error: BaseException = None):
+            event.finish()
+            if error is not None:
+                event.error = error
+            if error is None and not event.objects:
+                _measure_result(event, result)
+            self.instrumentation.emit(event)
+
+        def nested(self, args, kwargs):
+            token = _owns_phases.set(False)
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                _owns_phases.reset(token)
+
+        async def nested_async(self, args, kwargs):
+            token = _owns_phases.set(False)
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                _owns_phases.reset(token)
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                event = start(self, args, kwargs)
+                if event is None:
+                    return await func(self, *args, **kwargs)
+                if _current_operation.get() is not None:
+                    return await nested_async(self, args, kwargs)
+                token = _current_operation.set(event)
+                try:
+                    result = await func(self, *args, **kwargs)
+                except BaseException as e:
+                    finish(self, event, error=e)
+                    raise
+                finally:
+                    _current_operation.reset(token)
+                finish(self, event, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            event = start(self, args, kwargs)
+            if event is None:
+                return func(self, *args, **kwargs)
+            if _current_operation.get() is not None:
+                return nested(self, args, kwargs)
+            token = _current_operation.set(event)
+            try:
+                result = func(self, *args, **kwargs)
+            except BaseException as e:
+                finish(self, event, error=e)
+                raise
+            finally:
+                _current_operation.reset(token)
+            finish(self, event, result)
+            return result
+        return wrapper
+
+    return decorator
+
+
+def upload_bucket(args: tuple, kwargs: dict) -> Optional[str]:
+    """Bucket of an upload call: the folder argument of the storage providers."""
+    return kwargs.get("folder")
@@ -0,0 +1,29 @@
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_imports(package: str, namespace: dict, imports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    Module level __getattr__ / __dir__ (PEP 562) which import the given names on first access. Provider modules
+    import their SDKs (boto3, azure-storage-blob, httpx, ...) at the top, so deferring them keeps `import fastCloud`
+    cheap and only the provider actually used pays its import cost.
+
+    Usage in a package __init__:
+        __getattr__, __dir__ = lazy_imports(__name__, globals(), {"S3Storage": ".storage_providers.s3_storage"})
+
+    :param package: __name__ of the package; relative module paths are resolved against it.
+    :param namespace: globals() of the package. Imported names are cached in it, so __getattr__ runs once per name.
+    :param imports: {name: module path} of the lazily imported names.
+    """
+    def __getattr__(name: str):
+        module = imports.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(module, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(imports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,152 @@
+import io
+import mmap
+import os
+import tempfile
+import weakref
+from contextlib import contextmanager
+from typing import Optional, Iterator
+
+from media_toolkit import MediaFile, ImageFile, AudioFile, VideoFile
+from media_toolkit.core.content_detectors import ContentDetector
+from media_toolkit.core.media_files.file_content_buffer import FileContentBuffer
+from media_toolkit.core.media_files.universal_file import UniversalFile
+
+# content types which say nothing about the content; detect the type instead
+_GENERIC_CONTENT_TYPES = ("application/octet-stream", "binary/octet-stream")
+# magic numbers are in the first bytes; detecting on the whole content would copy it
+_DETECTION_BYTES = 64 * 1024
+
+
+class MmapContentBuffer(FileContentBuffer):
+    """
+    MediaFile content buffer backed by a memory-mapped file.
+
+    Pages are loaded lazily by the OS when they are accessed and are shared through the page cache with every other
+    process mapping the same file. getbuffer() returns a zero-copy memoryview of the mapping, and .name points at the
+    file, so uploads stream the content from disk.
+    """
+
+    def __init__(self, path: str, delete: bool = False):
+        """
+        :param path: The file to map. It must not be resized while it is mapped.
+        :param delete: Remove the file when the buffer is closed or garbage collected (for temporary downloads).
+        """
+        # an in-memory buffer is created and dropped right away; the mapped file takes the temp file's place.
+        # The attributes follow FileContentBuffer of media-toolkit <0.3 (pinned in pyproject.toml).
+        super().__init__(use_temp_file=False)
+        self._use_temp_file = True
+        self._memory_buffer = None
+        # read-only: the file may be a shared cache object or the caller's save_path
+        self._temp_file = open(path, "rb")
+        size = os.fstat(self._temp_file.fileno()).st_size
+        # empty files cannot be mapped
+        self._mmap = mmap.mmap(self._temp_file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else None
+        self._finalizer = weakref.finalize(self, self._release, self._temp_file, self._mmap, path, delete)
+
+    @property
+    def mmap(self) -> Optional[mmap.mmap]:
+        """The read-only mapping, None for empty files."""
+        return self._mmap
+
+    def getbuffer(self) -> memoryview:
+        """Zero-copy view of the mapped content."""
+        if self._mmap is None:
+            return memoryview(b"")
+        return memoryview(self._mmap)
+
+    @staticmethod
+    def _release(file, mapping, path: str, delete: bool):
+        try:
+            if mapping is not None:
+                mapping.close()
+        except BufferError:
+            # a memoryview of the mapping is still alive; the OS unmaps it with the process
+            pass
+        file.close()
+        if delete:
+            remove_file(path)
+
+    def close(self):
+        """Unmap and close the file (and remove it if it is temporary)."""
+        finalizer = getattr(self, "_finalizer", None)  # None if __init__ failed
+        if finalizer is not None:
+            finalizer()
+
+    def _remove_temp_file(self):
+        self.close()
+
+
+def remove_file(path: str):
+    """Remove a (partially downloaded) temporary file, ignoring errors."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def download_target(save_path: str = None, temp_dir: str = None) -> Iterator[str]:
+    """
+    File to download into. With save_path the content is written to "<save_path>.part", which replaces save_path
+    only when the block completes; a failed download therefore leaves an existing file at save_path untouched.
+    Without save_path a temporary file in temp_dir is used (for memory-mapped results, which remove it with the
+    MediaFile). On any exception the partial file is removed.
+    :param save_path: The final (persistent) file. Mapping a shared path lets worker processes share pages.
+    :param temp_dir: Directory of the temporary file if no save_path is given.
+    :return: Context manager yielding the path to write to.
+    """
+    if save_path is not None:
+        path = f"{save_path}.part"
+    else:
+        fd, path = tempfile.mkstemp(prefix="fastcloud-", dir=temp_dir)
+        os.close(fd)
+    try:
+        yield path
+    except BaseException:
+        remove_file(path)
+        raise
+    if save_path is not None:
+        os.replace(path, save_path)
+
+
+def media_file_from_mmap(path: str, delete: bool = False, content_type: str = None, file_name: str = None) -> MediaFile:
+    """
+    Create a MediaFile whose content is a memory map of the file at path instead of a copy in memory.
+    :param path: The downloaded file.
+    :param delete: Remove the file once the MediaFile is garbage collected.
+    :param content_type: Known mime type (e.g. from the response headers). Detected from the content otherwise.
+    :param file_name: Name of the file. Defaults to the basename of path.
+    """
+    if content_type in _GENERIC_CONTENT_TYPES:
+        content_type = None
+    media_file = MediaFile(content_type=content_type)
+    media_file._content_buffer = MmapContentBuffer(path, delete=delete)
+    media_file._file_info()
+    if file_name:
+        media_file.file_name = file_name
+    return media_file
+
+
+def media_file_from_buffer(
+        buffer: io.BytesIO, content_type: str = None, file_name: str = None, typed: bool = False
+) -> MediaFile:
+    """
+    Create a MediaFile which adopts buffer (e.g. a RangeSink buffer) as its content instead of copying it.
+    :param buffer: The downloaded content. It belongs to the MediaFile afterwards.
+    :param content_type: Known mime type (e.g. from the response headers). Detected from the first bytes otherwise.
+    :param file_name: Name of the file.
+    :param typed: Return an ImageFile / AudioFile / VideoFile according to the content type, like media_from_any.
+    """
+    if content_type is None or content_type in _GENERIC_CONTENT_TYPES:
+        with buffer.getbuffer() as view:
+            head = UniversalFile().from_bytes(bytes(view[:_DETECTION_BYTES]))
+        content_type = ContentDetector.detect_from_universal_file(head, file_name=file_name).content_type
+        content_type = content_type or _GENERIC_CONTENT_TYPES[0]
+    media_class = MediaFile
+    if typed:
+        media_class = {"image": ImageFile, "audio": AudioFile, "video": VideoFile}.get(content_type.split("/")[0], MediaFile)
+    # with a known content type, from_bytesio skips the content detection
+    media_file = media_class(content_type=content_type).from_bytesio(buffer, copy=False)
+    if file_name:
+        media_file.file_name = file_name
+    return media_file
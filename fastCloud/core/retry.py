@@ -0,0 +1,352 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from fastCloud.core.instrumentation import note_retry
+
+# exceptions of dropped connections and timeouts of the supported clients: (module, exception names)
+_TRANSPORT_ERROR_TYPES = (
+    ("httpx", ("TransportError",)),
+    ("azure.core.exceptions", ("ServiceRequestError", "ServiceResponseError")),
+    ("botocore.exceptions", ("ConnectionError", "ReadTimeoutError")),
+)
+_transport_errors_cache: Dict[tuple, tuple] = {}
+
+
+def _transport_errors() -> tuple:
+    """
+    Transport exception types of all clients imported so far. SDKs are not imported for this: one that was never
+    imported cannot have raised, so importing fastCloud stays cheap.
+    """
+    loaded = tuple(module for module, _ in _TRANSPORT_ERROR_TYPES if module in sys.modules)
+    errors = _transport_errors_cache.get(loaded)
+    if errors is None:
+        errors = [ConnectionError, TimeoutError, asyncio.TimeoutError]
+        for module, names in _TRANSPORT_ERROR_TYPES:
+            if module in loaded:
+                errors.extend(getattr(sys.modules[module], name) for name in names if hasattr(sys.modules[module], name))
+        errors = _transport_errors_cache[loaded] = tuple(errors)
+    return errors
+
+
+# S3 error codes which are worth a retry even if the status code alone doesn't say so
+_RETRYABLE_S3_CODES = {"SlowDown", "Throttling", "ThrottlingException", "RequestTimeout", "InternalError"}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The operation did not succeed within the deadline of its RetryPolicy."""
+
+
+class RetryPolicy:
+    """
+    Retries failed operations with exponential backoff and full jitter, within an optional per-operation deadline.
+
+    Used by all providers: the upload APIs run their requests through call() / acall(). S3 and Azure hand the
+    attempt count and backoff to their SDK's retry engine (see botocore_retries() / azure_backoff()), and retry
+    ranged downloads per range and Azure blocks per block with call() / acall(). Those calls make a single SDK
+    attempt each, so only one layer retries.
+
+    Hedging (async only): for operations with a hedge_key (small-object GETs and PUTs, which are idempotent), a
+    duplicate request is started if the first one has not finished after the hedge_percentile latency observed for
+    that key. The first successful response wins, the other request is cancelled. This cuts tail latency at the
+    price of roughly (100 - hedge_percentile)% extra requests.
+
+    Usage:
+        policy = RetryPolicy(max_attempts=5, deadline=30, hedge=True)
+        storage = S3Storage(..., retry_policy=policy)
+    """
+
+    RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+    def __init__(
+            self,
+            max_attempts: int = 4,
+            base_delay: float = 0.1,
+            max_delay: float = 10.0,
+            deadline: Optional[float] = None,
+            retryable_statuses: Iterable[int] = RETRYABLE_STATUSES,
+            hedge: bool = False,
+            hedge_percentile: float = 95.0,
+            hedge_delay: Optional[float] = None,
+            hedge_max_bytes: int = 1024 * 1024,
+            hedge_min_samples: int = 20,
+            latency_window: int = 256
+    ):
+        """
+        :param max_attempts: Total number of attempts per operation (1 = no retries).
+        :param base_delay: Backoff before the second attempt is drawn from [0, base_delay]; the upper bound doubles
+            with every attempt (full jitter).
+        :param max_delay: Upper bound of a single backoff.
+        :param deadline: Seconds an operation may take in total, including all attempts and backoffs. None = no limit.
+        :param retryable_statuses: HTTP status codes which are retried.
+        :param hedge: Send hedged duplicate requests for small idempotent operations (async only).
+        :param hedge_percentile: Hedge requests which take longer than this percentile of the observed latencies.
+        :param hedge_delay: Fixed hedge delay in seconds instead of the percentile.
+        :param hedge_max_bytes: Only objects up to this size are hedged.
+        :param hedge_min_samples: Number of observed latencies needed before percentile based hedging starts.
+        :param latency_window: Number of recent latencies per operation kind the percentile is computed from.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be >= 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retryable_statuses = frozenset(retryable_statuses)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_delay = hedge_delay
+        self.hedge_max_bytes = hedge_max_bytes
+        self.hedge_min_samples = hedge_min_samples
+        self.latency_window = latency_window
+
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        # counters, e.g. for metrics
+        self.retries = 0
+        self.hedges = 0
+
+    # ------------------------------------------------------------------ #
+    # Classification and backoff                                         #
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _status_of(error: BaseException) -> Optional[int]:
+        """HTTP status of an Azure HttpResponseError, a botocore ClientError or an httpx.HTTPStatusError."""
+        status = getattr(error, "status_code", None)
+        if status is not None:
+            return status
+        response = getattr(error, "response", None)
+        if isinstance(response, dict):
+            return response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return getattr(response, "status_code", None)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """True for dropped connections, timeouts and errors with a retryable HTTP status (429, 5xx, ...)."""
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if isinstance(error, _transport_errors()):
+            return True
+        response = getattr(error, "response", None)
+        if isinstance(response, dict) and response.get("Error", {}).get("Code") in _RETRYABLE_S3_CODES:
+            return True
+        return self._status_of(error) in self.retryable_statuses
+
+    def is_retryable_response(self, result: Any) -> bool:
+        """True if an operation returned (instead of raised) a response with a retryable status code."""
+        return getattr(result, "status_code", None) in self.retryable_statuses
+
+    def backoff(self, attempt: int, result: Any = None) -> float:
+        """
+        Delay before the next attempt after attempt failed attempts: uniform in [0, base_delay * 2**(attempt-1)],
+        capped at max_delay. A Retry-After header of a throttled response is honoured up to max_delay.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        headers = getattr(result, "headers", None)
+        retry_after = headers.get("retry-after") if headers is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(self.max_delay, float(retry_after)))
+            except ValueError:
+                pass  # HTTP date format; keep the jittered backoff
+        return delay
+
+    def _remaining(self, started: float) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - (time.monotonic() - started)
+
+    def _next_delay(self, attempt: int, attempts: int, started: float, result: Any = None) -> Optional[float]:
+        """Backoff before the next attempt, or None if the operation must give up."""
+        if attempt >= attempts:
+            return None
+        delay = self.backoff(attempt, result)
+        remaining = self._remaining(started)
+        if remaining is not None and delay >= remaining:
+            return None
+        with self._lock:
+            self.retries += 1
+        note_retry()
+        return delay
+
+    # ------------------------------------------------------------------ #
+    # Execution                                                           #
+    # ------------------------------------------------------------------ #
+
+    def call(self, func: Callable[..., Any], *args, attempts: int = None, **kwargs) -> Any:
+        """
+        Call func(*args, **kwargs) and retry it on retryable errors / responses.
+        func must be safe to repeat (e.g. reopen or rewind its upload source).
+        :param attempts: Override max_attempts for this operation (1 = only the deadline check).
+        :return: The result of the first successful attempt. A retryable response of the last attempt is returned
+            as is, so the caller's normal error handling applies.
+        """
+        attempts = attempts or self.max_attempts
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    raise
+                delay = self._next_delay(attempt, attempts, started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+
+            if not self.is_retryable_response(result):
+                return result
+            delay = self._next_delay(attempt, attempts, started, result)
+            if delay is None:
+                return result
+            self._close_response(result)
+            time.sleep(delay)
+
+    async def acall(
+            self,
+            func: Callable[..., Awaitable],
+            *args,
+            attempts: int = None,
+            hedge_key: str = None,
+            **kwargs
+    ) -> Any:
+        """
+        Async variant of call(). func is called once per attempt and must return a new awaitable each time.
+        Every attempt is bounded by the remaining deadline (DeadlineExceeded).
+        :param attempts: Override max_attempts for this operation (1 = only deadline and hedging).
+        :param hedge_key: Kind of operation (e.g. "s3.get") for hedged requests. Only idempotent operations on
+            small objects may pass one. Ignored unless the policy has hedge=True.
+        """
+        attempts = attempts or self.max_attempts
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await self._bounded(self._attempt(func, args, kwargs, hedge_key), started)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    raise
+                delay = self._next_delay(attempt, attempts, started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            if not self.is_retryable_response(result):
+                return result
+            delay = self._next_delay(attempt, attempts, started, result)
+            if delay is None:
+                return result
+            await self._aclose_response(result)
+            await asyncio.sleep(delay)
+
+    async def _bounded(self, awaitable: Awaitable, started: float) -> Any:
+        remaining = self._remaining(started)
+        if remaining is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Operation exceeded its deadline of {self.deadline}s") from None
+
+    async def _attempt(self, func: Callable[..., Awaitable], args: tuple, kwargs: dict, hedge_key: Optional[str]):
+        if hedge_key is None or not self.hedge:
+            return await func(*args, **kwargs)
+
+        delay = self.hedge_delay_for(hedge_key)
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(func(*args, **kwargs))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                # the request is slower than hedge_percentile: race it against a duplicate
+                with self._lock:
+                    self.hedges += 1
+                pending.add(asyncio.ensure_future(func(*args, **kwargs)))
+
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        self.record_latency(hedge_key, time.monotonic() - started)
+                        return task.result()
+                    error = error or task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    @staticmethod
+    def _close_response(response: Any):
+        close = getattr(response, "close", None)
+        if callable(close):
+            close()
+
+    @staticmethod
+    async def _aclose_response(response: Any):
+        aclose = getattr(response, "aclose", None)
+        if callable(aclose):
+            await aclose()
+
+    # ------------------------------------------------------------------ #
+    # Hedging                                                             #
+    # ------------------------------------------------------------------ #
+
+    def should_hedge(self, size: Optional[int]) -> bool:
+        """True if an object of size bytes is small enough for hedged requests."""
+        return self.hedge and size is not None and size <= self.hedge_max_bytes
+
+    def record_latency(self, key: str, seconds: float):
+        """Add the latency of a successful operation of this kind to its window."""
+        with self._lock:
+            window = self._latencies.get(key)
+            if window is None:
+                window = self._latencies[key] = deque(maxlen=self.latency_window)
+            window.append(seconds)
+
+    def hedge_delay_for(self, key: str) -> Optional[float]:
+        """Seconds after which a request of this kind is hedged. None while too few latencies were observed."""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            window = sorted(self._latencies.get(key, ()))
+        if len(window) < self.hedge_min_samples:
+            return None
+        index = min(len(window) - 1, int(len(window) * self.hedge_percentile / 100))
+        return window[index]
+
+    # ------------------------------------------------------------------ #
+    # SDK retry configuration                                              #
+    # ------------------------------------------------------------------ #
+
+    def botocore_retries(self, sdk_retries: bool = True) -> dict:
+        """
+        Retry settings for botocore's Config(retries=...). The 'standard' mode uses exponential backoff with full
+        jitter and retries throttling, transient 5xx and connection errors, like this policy.
+        :param sdk_retries: False for clients whose calls are wrapped in call() / acall(): botocore then makes a
+            single attempt, so attempts and backoffs don't multiply and the deadline applies to every attempt.
+        """
+        return {"total_max_attempts": self.max_attempts if sdk_retries else 1, "mode": "standard"}
+
+    def azure_backoff(self, settings: dict) -> float:
+        """Backoff for the Azure storage clients' retry policy (see AzureBlobStorage), from its retry settings."""
+        note_retry()
+        return self.backoff(max(1, settings["count"]))
+
+    def __repr__(self):
+        return (
+            f"RetryPolicy(max_attempts={self.max_attempts}, base_delay={self.base_delay}, "
+            f"max_delay={self.max_delay}, deadline={self.deadline}, hedge={self.hedge})"
+        )
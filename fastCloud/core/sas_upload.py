@@ -0,0 +1,239 @@
+import base64
+import contextvars
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List
+from urllib.parse import quote
+
+from fastCloud.core.retry import RetryPolicy
+from fastCloud.core.scheduler import ConcurrencyScheduler
+from fastCloud.core.transfer import run_bounded
+from fastCloud.core.streaming import UploadSource
+from fastCloud.core.api_providers.HTTPClientManager import HTTPClientManager
+
+try:
+    from httpx import Client, AsyncClient, Response
+except ImportError:
+    pass
+
+
+_default_http_client = None
+_default_http_client_lock = threading.Lock()
+
+
+def default_http_client() -> HTTPClientManager:
+    """Process-wide pooled HTTP clients for SAS uploads which are not given a client of their own."""
+    global _default_http_client
+    if _default_http_client is None:
+        with _default_http_client_lock:
+            if _default_http_client is None:
+                _default_http_client = HTTPClientManager()
+    return _default_http_client
+
+
+class SasUploader:
+    """
+    Streams files to Azure blob SAS URLs (temporary upload links) with plain HTTP requests.
+
+    Files up to single_put_threshold are sent with one streaming Put Blob request. Larger files and streams of unknown
+    size are cut into blocks which are sent with Put Block, up to max_block_concurrency at a time, and committed with
+    Put Block List. Blocks are read just in time, so at most max_block_concurrency + 1 blocks are held in memory.
+    """
+
+    def __init__(
+            self,
+            block_size: int = 8 * 1024 * 1024,
+            max_block_concurrency: int = 8,
+            single_put_threshold: int = 64 * 1024 * 1024,
+            if_none_match: bool = False
+    ):
+        """
+        :param block_size: Size of the blocks large files are split into.
+        :param max_block_concurrency: Number of blocks of one file which are uploaded in parallel.
+        :param single_put_threshold: Files up to this size are uploaded with a single request.
+        :param if_none_match: Fail with 409 instead of overwriting an existing blob. A 409 after a retried request
+            counts as success, because an earlier attempt whose response was lost may have created the blob.
+        """
+        self.block_size = block_size
+        self.max_block_concurrency = max_block_concurrency
+        self.single_put_threshold = single_put_threshold
+        self.if_none_match = if_none_match
+
+    def use_blocks(self, source: UploadSource) -> bool:
+        return source.size is None or source.size > self.single_put_threshold
+
+    @staticmethod
+    def _with_query(sas_url: str, query: str) -> str:
+        return f"{sas_url}{'&' if '?' in sas_url else '?'}{query}"
+
+    @staticmethod
+    def _block_id(upload_id: str, index: int) -> str:
+        """Block ids must be base64 and of equal length for all blocks of a blob."""
+        return base64.b64encode(f"{upload_id}{index:010d}".encode()).decode()
+
+    def _block_url(self, sas_url: str, block_id: str) -> str:
+        # base64 may contain + / =, which must be escaped in the query
+        return self._with_query(sas_url, f"comp=block&blockid={quote(block_id, safe='')}")
+
+    @staticmethod
+    def _block_list(block_ids: List[str]) -> bytes:
+        latest = "".join(f"<Latest>{block_id}</Latest>" for block_id in block_ids)
+        return f'<?xml version="1.0" encoding="utf-8"?><BlockList>{latest}</BlockList>'.encode()
+
+    def _put_blob_headers(self, source: UploadSource) -> dict:
+        headers = {"x-ms-blob-type": "BlockBlob", "x-ms-blob-content-type": source.content_type, "Content-Length": str(source.size)}
+        if self.if_none_match:
+            headers["x-ms-if-none-match"] = "*"
+        return headers
+
+    def _commit_headers(self, source: UploadSource) -> dict:
+        headers = {"x-ms-blob-content-type": source.content_type, "Content-Type": "application/xml"}
+        if self.if_none_match:
+            headers["x-ms-if-none-match"] = "*"
+        return headers
+
+    def _check(self, response: "Response", sas_url: str, retried: bool) -> None:
+        if response.status_code == 201:
+            return
+        # a retried request may find the blob created by an attempt whose response was lost
+        if response.status_code == 409 and retried and self.if_none_match:
+            return
+        raise Exception(f"Failed to upload to temporary URL {sas_url.split('?')[0]}. Response: {response.text}")
+
+    # ------------------------------------------------------------------ #
+    # Sync                                                                 #
+    # ------------------------------------------------------------------ #
+
+    def upload(self, client: "Client", sas_url: str, source: UploadSource, retry_policy: RetryPolicy = None) -> None:
+        """
+        Upload source to sas_url with the (pooled) client.
+        :raises Exception: If the upload fails.
+        """
+        retry_policy = retry_policy or RetryPolicy()
+        if self.use_blocks(source):
+            self._upload_blocks(client, sas_url, source, retry_policy)
+            return
+
+        attempt = 0
+
+        def put() -> "Response":
+            nonlocal attempt
+            attempt += 1
+            source.rewind()
+            return client.put(sas_url, content=source.iter_chunks(), headers=self._put_blob_headers(source))
+
+        response = retry_policy.call(put, attempts=None if source.replayable else 1)
+        self._check(response, sas_url, attempt > 1)
+
+    def _put_block(self, client: "Client", sas_url: str, block_id: str, data: bytes, retry_policy: RetryPolicy):
+        url = self._block_url(sas_url, block_id)
+        headers = {"Content-Length": str(len(data))}
+        # httpx responses reference their request in a cycle, which would keep every block alive until the next
+        # garbage collection. An exhausted one-shot iterator no longer references the block.
+        response = retry_policy.call(lambda: client.put(url, content=iter((data,)), headers=headers))
+        self._check(response, sas_url, retried=False)
+
+    def _upload_blocks(self, client: "Client", sas_url: str, source: UploadSource, retry_policy: RetryPolicy):
+        upload_id = uuid.uuid4().hex
+        block_ids = []
+        with ThreadPoolExecutor(max_workers=self.max_block_concurrency) as pool:
+            pending = set()
+            try:
+                for index, data in enumerate(source.iter_chunks(self.block_size)):
+                    block_id = self._block_id(upload_id, index)
+                    block_ids.append(block_id)
+                    pending.add(pool.submit(
+                        contextvars.copy_context().run, self._put_block, client, sas_url, block_id, data, retry_policy
+                    ))
+                    if len(pending) >= self.max_block_concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                for future in pending:
+                    future.result()
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        attempt = 0
+
+        def commit() -> "Response":
+            nonlocal attempt
+            attempt += 1
+            return client.put(
+                self._with_query(sas_url, "comp=blocklist"), content=self._block_list(block_ids), headers=self._commit_headers(source)
+            )
+
+        self._check(retry_policy.call(commit), sas_url, attempt > 1)
+
+    # ------------------------------------------------------------------ #
+    # Async                                                                #
+    # ------------------------------------------------------------------ #
+
+    async def upload_async(
+            self, client: "AsyncClient", sas_url: str, source: UploadSource, retry_policy: RetryPolicy = None,
+            scheduler: ConcurrencyScheduler = None
+    ) -> None:
+        """
+        Async variant of upload.
+        :param scheduler: Every block request takes a slot of this scheduler for the host of sas_url.
+        """
+        retry_policy = retry_policy or RetryPolicy()
+        if self.use_blocks(source):
+            await self._upload_blocks_async(client, sas_url, source, retry_policy, scheduler)
+            return
+
+        attempt = 0
+
+        async def put() -> "Response":
+            nonlocal attempt
+            attempt += 1
+            source.rewind()
+            return await client.put(sas_url, content=source.aiter_chunks(), headers=self._put_blob_headers(source))
+
+        response = await retry_policy.acall(put, attempts=None if source.replayable else 1)
+        self._check(response, sas_url, attempt > 1)
+
+    async def _put_block_async(self, client: "AsyncClient", sas_url: str, block_id: str, data: bytes, retry_policy: RetryPolicy):
+        url = self._block_url(sas_url, block_id)
+        headers = {"Content-Length": str(len(data))}
+
+        async def body():
+            yield data
+
+        # one-shot body, see _put_block
+        response = await retry_policy.acall(lambda: client.put(url, content=body(), headers=headers))
+        self._check(response, sas_url, retried=False)
+
+    async def _upload_blocks_async(
+            self, client: "AsyncClient", sas_url: str, source: UploadSource, retry_policy: RetryPolicy,
+            scheduler: ConcurrencyScheduler = None
+    ):
+        upload_id = uuid.uuid4().hex
+
+        async def numbered_blocks():
+            index = 0
+            async for data in source.aiter_chunks(self.block_size):
+                yield self._block_id(upload_id, index), data
+                index += 1
+
+        async def put_block(block):
+            block_id, data = block
+            await self._put_block_async(client, sas_url, block_id, data, retry_policy)
+            return block_id
+
+        host = scheduler.host_of(sas_url) if scheduler is not None else None
+        block_ids = await run_bounded(numbered_blocks(), put_block, self.max_block_concurrency, scheduler, host)
+
+        attempt = 0
+
+        async def commit() -> "Response":
+            nonlocal attempt
+            attempt += 1
+            return await client.put(
+                self._with_query(sas_url, "comp=blocklist"), content=self._block_list(block_ids), headers=self._commit_headers(source)
+            )
+
+        self._check(await retry_policy.acall(commit), sas_url, attempt > 1)
@@ -0,0 +1,146 @@
+import asyncio
+import contextvars
+import threading
+import weakref
+from typing import Awaitable, Iterable, List, Optional, Any
+from urllib.parse import urlparse
+
+# the scheduler whose slot the running task holds (set by ConcurrencyScheduler.run while the operation runs)
+_held_slot = contextvars.ContextVar("fastcloud_held_slot", default=None)
+
+
+class ConcurrencyScheduler:
+    """
+    Bounds the number of in-flight async operations, globally and per host.
+
+    All providers route their async fan-outs (batch uploads, deletes, part transfers) through the scheduler of
+    their FastCloud instance instead of calling asyncio.gather directly. Large batches therefore run with a steady
+    number of open requests instead of opening one connection per file.
+    Pass the same scheduler to several providers to share one budget between them.
+
+    Operations split into parts (multipart and block uploads, ranged downloads) take a slot per part request as well,
+    see transfer.run_bounded. So the limits bound the requests in flight, not only the number of files.
+
+    Semaphores are created per event loop, so one scheduler can safely be used from several loops / threads.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = 64, max_concurrency_per_host: Optional[int] = None):
+        """
+        :param max_concurrency: Maximum number of operations in flight at once. None means unbounded.
+        :param max_concurrency_per_host: Maximum number of operations in flight per host. None means only the
+            global limit applies.
+        """
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1 or None")
+        if max_concurrency_per_host is not None and max_concurrency_per_host < 1:
+            raise ValueError("max_concurrency_per_host must be >= 1 or None")
+
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_host = max_concurrency_per_host
+
+        # id(loop) -> (weakref(loop), global semaphore, {host: semaphore})
+        self._loop_state = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: Optional[str]) -> Optional[str]:
+        """Return the host (netloc) part of a URL, which is used as key for the per-host limit."""
+        if not url:
+            return None
+        return urlparse(url).netloc or None
+
+    def _get_loop_state(self) -> tuple:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loop_state.get(id(loop))
+            if state is None or state[0]() is not loop:
+                # drop state of loops that no longer exist
+                for key, (loop_ref, _, _) in list(self._loop_state.items()):
+                    if loop_ref() is None:
+                        del self._loop_state[key]
+                global_semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+                state = (weakref.ref(loop), global_semaphore, {})
+                self._loop_state[id(loop)] = state
+            return state
+
+    def _get_semaphores(self, host: Optional[str]) -> List[asyncio.Semaphore]:
+        _, global_semaphore, host_semaphores = self._get_loop_state()
+        semaphores = []
+        if host is not None and self.max_concurrency_per_host:
+            if host not in host_semaphores:
+                host_semaphores[host] = asyncio.Semaphore(self.max_concurrency_per_host)
+            # acquire the per-host slot first so waiting requests of a saturated host don't block the global budget
+            semaphores.append(host_semaphores[host])
+        if global_semaphore is not None:
+            semaphores.append(global_semaphore)
+        return semaphores
+
+    async def acquire(self, host: Optional[str] = None, wait: bool = True) -> Optional[List[asyncio.Semaphore]]:
+        """
+        Take a global (and per-host) slot. Release it with release().
+        :param host: Host the operation talks to. Used for the per-host limit.
+        :param wait: If False, only take the slot if it is free right away.
+        :return: The acquired semaphores, or None if wait is False and no slot was free.
+        """
+        semaphores = self._get_semaphores(host)
+        if not wait and any(semaphore.locked() for semaphore in semaphores):
+            return None
+        acquired = []
+        try:
+            for semaphore in semaphores:
+                await semaphore.acquire()
+                acquired.append(semaphore)
+        except BaseException:
+            self.release(acquired)
+            raise
+        return acquired
+
+    @staticmethod
+    def release(slot: List[asyncio.Semaphore]):
+        """Release a slot taken with acquire()."""
+        for semaphore in reversed(slot):
+            semaphore.release()
+
+    def holds_slot(self) -> bool:
+        """True if the running task is an operation started by run() of this scheduler, i.e. holds one of its slots."""
+        return _held_slot.get() is self
+
+    async def run(self, awaitable: Awaitable, host: Optional[str] = None) -> Any:
+        """
+        Await a single operation once a global (and per-host) slot is free.
+        :param awaitable: The coroutine to run. It is only started when a slot was acquired.
+        :param host: Host the operation talks to. Used for the per-host limit.
+        :return: The result of the awaitable.
+        """
+        try:
+            slot = await self.acquire(host)
+        except BaseException:
+            # make sure the coroutine is not left un-awaited if acquiring was cancelled
+            close = getattr(awaitable, "close", None)
+            if close is not None:
+                close()
+            raise
+        token = _held_slot.set(self)
+        try:
+            return await awaitable
+        finally:
+            _held_slot.reset(token)
+            self.release(slot)
+
+    async def gather(
+            self,
+            awaitables: Iterable[Awaitable],
+            host: Optional[str] = None,
+            return_exceptions: bool = False
+    ) -> list:
+        """
+        Bounded replacement for asyncio.gather. Results are returned in input order.
+        :param awaitables: The coroutines to run.
+        :param host: Host all operations talk to. Used for the per-host limit.
+        :param return_exceptions: Same as in asyncio.gather.
+        :return: List of results in the order of the awaitables.
+        """
+        return list(await asyncio.gather(
+            *[self.run(aw, host=host) for aw in awaitables],
+            return_exceptions=return_exceptions
+        ))
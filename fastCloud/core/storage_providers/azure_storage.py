@@ -1,129 +1,483 @@
+import asyncio
+import base64
+import contextvars
 import logging
+import os
+import threading
 import uuid
-from asyncio import gather
-from datetime import datetime, timedelta
-from typing import Union, List, Any
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Union, List, Any, Set, Tuple
 import io
-from urllib.parse import urlparse
+from urllib.parse import urlparse, quote, unquote
 from fastCloud.core.i_fast_cloud import FastCloud
+from fastCloud.core.streaming import UploadSource, DownloadStream, AsyncDownloadStream, DEFAULT_CHUNK_SIZE
+from fastCloud.core.storage_providers.batch_delete import plan_delete_batches, delete_results
+from fastCloud.core.storage_providers.content_dedup import (
+    DIGEST_METADATA_KEY, hash_source, hash_sources_async, digest_key, is_duplicate, check_existing, plan_dedup_uploads
+)
+from fastCloud.core.transfer import run_bounded, download_ranges, download_ranges_async, parse_content_range
+from fastCloud.core.sas_upload import SasUploader, default_http_client
+from fastCloud.core.api_providers.HTTPClientManager import HTTPClientManager
+from fastCloud.core.instrumentation import instrumented, mark_phase, note_failure
+from fastCloud.core.mmap_file import download_target, media_file_from_mmap, media_file_from_buffer
 
 try:
-    from azure.core.exceptions import ResourceNotFoundError
-    from azure.storage.blob import BlobServiceClient
+    from azure.core import MatchConditions
+    from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ResourceNotModifiedError
+    from azure.storage.blob import BlobServiceClient, BlobBlock, ContentSettings
     from azure.storage.blob.aio import BlobServiceClient as AioBlobServiceClient
     from azure.storage.blob import generate_blob_sas, BlobSasPermissions
-except ImportError:
-    pass
+    from azure.storage.blob import ExponentialRetry
+    from azure.storage.blob.aio import ExponentialRetry as AioExponentialRetry
 
-try:
-    import httpx
+    class _PolicyRetry(ExponentialRetry):
+        """Azure's retry engine with the full-jitter backoff of a RetryPolicy."""
+
+        def __init__(self, policy, **kwargs):
+            super().__init__(retry_total=policy.max_attempts - 1, **kwargs)
+            self.policy = policy
+
+        def get_backoff_time(self, settings):
+            return self.policy.azure_backoff(settings)
+
+    class _AioPolicyRetry(AioExponentialRetry):
+        """Async variant of _PolicyRetry."""
+
+        def __init__(self, policy, **kwargs):
+            super().__init__(retry_total=policy.max_attempts - 1, **kwargs)
+            self.policy = policy
+
+        def get_backoff_time(self, settings):
+            return self.policy.azure_backoff(settings)
 except ImportError:
     pass
 
 
-from media_toolkit import MediaFile, IMediaContainer, media_from_any
+from media_toolkit import MediaFile, IMediaContainer
 from media_toolkit.utils.dependency_requirements import requires
 
+logger = logging.getLogger(__name__)
+
 
 class AzureBlobStorage(FastCloud):
+    # A blob batch request may contain at most 256 sub-requests.
+    MAX_DELETE_BATCH_SIZE = 256
+
     @requires("azure.storage.blob")
-    def __init__(self, sas_access_token: str = None, connection_string: str = None):
+    def __init__(
+            self,
+            sas_access_token: str = None,
+            connection_string: str = None,
+            block_size: int = 8 * 1024 * 1024,
+            max_block_concurrency: int = 8,
+            single_upload_threshold: int = 64 * 1024 * 1024,
+            block_retries: int = 3,
+            download_part_size: int = 8 * 1024 * 1024,
+            max_download_concurrency: int = 8,
+            dedup: bool = False,
+            **kwargs
+    ):
         """
         Create an azure blob storage client either with a SAS access token or a connection string.
         :param sas_access_token: sas_access_token in form
         :param connection_string: formatted like
+        :param block_size: Size of the blocks large blobs are split into (large-object mode).
+        :param max_block_concurrency: Number of blocks of one blob which are staged in parallel.
+        :param single_upload_threshold: Blobs up to this size are uploaded with a single request. Larger blobs
+            (and streams of unknown size) are staged block by block and committed with a block list.
+        :param block_retries: How often a failed block is retried before the upload fails.
+        :param download_part_size: Blobs larger than this are downloaded as concurrent byte ranges of this size.
+        :param max_download_concurrency: Number of byte ranges of one blob which are downloaded in parallel.
+        :param dedup: Default of the per-call dedup kwarg: name unnamed blobs by their SHA-256 and skip uploads whose
+            content already exists in the container.
+        :param kwargs: Concurrency settings passed to FastCloud (max_concurrency, max_concurrency_per_host, scheduler).
         """
         if not sas_access_token and not connection_string:
             raise ValueError("Either a sas_access_token or a connection_string must be provided")
 
+        super().__init__(**kwargs)
+
         self.sas_access_token = sas_access_token
         self.connection_string = connection_string
 
+        self.block_size = block_size
+        self.max_block_concurrency = max_block_concurrency
+        self.single_upload_threshold = single_upload_threshold
+        self.block_retries = block_retries
+        self.download_part_size = download_part_size
+        self.max_download_concurrency = max_download_concurrency
+        self.dedup = dedup
+
         self._blob_client = None
-        self._async_blob_client = None
+        # (expiry, UserDelegationKey) used to sign SAS links when the client authenticates with a token credential
+        self._user_delegation_key = None
+        # The async client's transport (aiohttp session) is bound to the event loop it was opened on.
+        # One client per loop, keyed by id(loop): (weakref(loop), AioBlobServiceClient).
+        self._async_blob_clients = {}
+        self._client_lock = threading.Lock()
 
         # changing logging level of azure.storage.blob to print only errors
         self._blob_service_logger = logging.getLogger('azure.storage.blob')
         self._blob_service_logger.setLevel(logging.ERROR)
 
     def _get_blob_service_client(self, async_mode: bool = False):
-        """Retrieve or create a BlobServiceClient."""
+        """
+        Retrieve or create a BlobServiceClient.
+        With async_mode the persistent AioBlobServiceClient of the running event loop is returned. It is kept open
+        and shared by all async operations on that loop; release it with aclose() / close().
+        """
+        if async_mode:
+            return self._get_async_blob_service_client()
+
+        if not self._blob_client:
+            with self._client_lock:
+                if not self._blob_client:
+                    self._blob_client = self._create_blob_service_client(BlobServiceClient)
+        return self._blob_client
+
+    def _get_async_blob_service_client(self):
+        """The AioBlobServiceClient bound to the running event loop. Created on first use per loop."""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            self._prune_async_blob_clients()
+            entry = self._async_blob_clients.get(id(loop))
+            if entry is not None and entry[0]() is loop:
+                return entry[1]
+
+            client = self._create_blob_service_client(AioBlobServiceClient)
+            self._async_blob_clients[id(loop)] = (weakref.ref(loop), client)
+            return client
+
+    def _create_blob_service_client(self, client_class):
+        # single-shot uploads are used up to our threshold; larger blobs are staged by ourselves
+        client_kwargs = {"max_single_put_size": self.single_upload_threshold, "max_block_size": self.block_size}
+        retry_class = _AioPolicyRetry if client_class is AioBlobServiceClient else _PolicyRetry
+        client_kwargs["retry_policy"] = retry_class(self.retry_policy)
         if self.sas_access_token:
-            if async_mode:
-                if not self._async_blob_client:
-                    self._async_blob_client = AioBlobServiceClient(account_url=self.sas_access_token)
-                return self._async_blob_client
+            return client_class(account_url=self.sas_access_token, **client_kwargs)
+        return client_class.from_connection_string(self.connection_string, **client_kwargs)
+
+    def _prune_async_blob_clients(self):
+        """Forget clients whose event loop was garbage collected or closed."""
+        for key, (loop_ref, _) in list(self._async_blob_clients.items()):
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                del self._async_blob_clients[key]
 
-            if not self._blob_client:
-                self._blob_client = BlobServiceClient(account_url=self.sas_access_token)
-            return self._blob_client
+    async def __aenter__(self):
+        # open the transport up front, so concurrent first requests share one connection pool
+        await self._get_blob_service_client(async_mode=True).__aenter__()
+        return self
 
-        elif self.connection_string:
-            if async_mode:
-                if not self._async_blob_client:
-                    self._async_blob_client = AioBlobServiceClient.from_connection_string(self.connection_string)
-                return self._async_blob_client
+    def close(self) -> None:
+        """
+        Close the sync client and the async clients of all event loops.
+        Clients of a loop running in another thread are closed on that loop.
+        Inside a running loop prefer `await storage.aclose()`.
+        """
+        with self._client_lock:
+            blob_client, self._blob_client = self._blob_client, None
+            async_clients, self._async_blob_clients = self._async_blob_clients, {}
 
-            if not self._blob_client:
-                self._blob_client = BlobServiceClient.from_connection_string(self.connection_string)
-            return self._blob_client
+        if blob_client is not None:
+            blob_client.close()
 
-    def _upload_files(self, files: Union[MediaFile, List[MediaFile]], folder: str, *args, **kwargs) -> Union[str, List[str]]:
+        for loop_ref, async_client in async_clients.values():
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(async_client.close(), loop)
+            else:
+                loop.run_until_complete(async_client.close())
+
+    async def aclose(self) -> None:
+        """Close the async client of the running event loop, then all other clients (see close)."""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            entry = self._async_blob_clients.pop(id(loop), None)
+
+        if entry is not None:
+            await entry[1].close()
+        self.close()
+
+    def _upload_files(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], folder: str, *args, **kwargs
+    ) -> Union[str, List[str]]:
         """
-        Upload files to Azure Blob Storage.
+        Upload files to Azure Blob Storage. The content is streamed in chunks from its source.
+        :param large_object: (kwarg) True forces block-staged uploads, False forces single uploads.
+            By default blobs above single_upload_threshold or of unknown size are staged in blocks.
+        :param dedup: (kwarg) Hash the content, name unnamed blobs by the digest and skip blobs whose content already
+            exists. Defaults to self.dedup.
+        :param max_workers: (kwarg) Upload the blobs in this many threads sharing the (thread-safe) BlobServiceClient.
+            Defaults to self.max_workers.
         """
-        if not isinstance(files, (MediaFile, list)):
-            raise ValueError("files must be a MediaFile or list of MediaFile")
+        if not isinstance(files, (MediaFile, UploadSource, list)):
+            raise ValueError("files must be a MediaFile, UploadSource or list of those")
 
         if not isinstance(files, list):
             files = [files]
 
-        # Upload Files
         blob_service_client = self._get_blob_service_client(async_mode=False)
-        urls = []
-        for f in files:
-            if not f.file_name or f.file_name == "" or f.file_name == "file":
-                f.file_name = str(uuid.uuid4())
+        max_workers = kwargs.get("max_workers")
+        if kwargs.get("dedup", self.dedup):
+            mark_phase("prepare")
+            hashed = self._map(lambda f: hash_source(UploadSource.from_any(f)), files, max_workers)
+            mark_phase("network")
+            sources, digests = self._dedup_sources(hashed)
+            existing = check_existing(
+                {source.file_name: digest for source, digest in zip(sources, digests)},
+                lambda name, digest: self._blob_exists_sync(
+                    blob_service_client.get_blob_client(container=folder, blob=name), digest
+                ),
+            )
+            upload_flags = plan_dedup_uploads([source.file_name for source in sources], digests, existing)
+        else:
+            sources = [self._to_upload_source(f) for f in files]
+            digests = [None] * len(sources)
+            upload_flags = [True] * len(sources)
 
-            blob_client = blob_service_client.get_blob_client(container=folder, blob=f.file_name)
-            b = f.to_bytes()
-            blob_client.upload_blob(b, overwrite=True)
-            urls.append(blob_client.url)
+        # Upload Files
+        def upload(item) -> str:
+            source, digest, needs_upload = item
+            blob_client = blob_service_client.get_blob_client(container=folder, blob=source.file_name)
+            if needs_upload:
+                metadata = {DIGEST_METADATA_KEY: digest} if digest is not None else None
+                self._upload_source_sync(blob_client, source, kwargs.get("large_object"), metadata)
+            return blob_client.url
 
+        urls = self._map(upload, list(zip(sources, digests, upload_flags)), max_workers)
         if len(urls) == 1:
             return urls[0]
         return urls
 
-    async def _upload_files_async(self, files: Union[MediaFile, List[MediaFile]], folder: str, *args, **kwargs) -> Union[str, List[str]]:
+    async def _upload_files_async(
+            self, files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]], folder: str, *args, **kwargs
+    ) -> Union[str, List[str]]:
         """
-        Upload files to Azure Blob Storage asynchronously.
+        Upload files to Azure Blob Storage asynchronously. The content is streamed in chunks from its source.
+        :param large_object: (kwarg) True forces block-staged uploads, False forces single uploads.
+            By default blobs above single_upload_threshold or of unknown size are staged in blocks.
+        :param dedup: (kwarg) Hash the content, name unnamed blobs by the digest and skip blobs whose content already
+            exists. Defaults to self.dedup.
         """
-        if not isinstance(files, (MediaFile, list)):
-            raise ValueError("files must be a MediaFile or list of MediaFile")
+        if not isinstance(files, (MediaFile, UploadSource, list)):
+            raise ValueError("files must be a MediaFile, UploadSource or list of those")
 
         if not isinstance(files, list):
             files = [files]
 
+        # the persistent client is not closed here: all uploads share its connection pool across calls
+        bc = self._get_blob_service_client(async_mode=True)
+        host = self.scheduler.host_of(bc.url)
+        if kwargs.get("dedup", self.dedup):
+            mark_phase("prepare")
+            hashed = await hash_sources_async(files)
+            mark_phase("network")
+            sources, digests = self._dedup_sources(hashed)
+            candidates = {source.file_name: digest for source, digest in zip(sources, digests)}
+            exists = await self.scheduler.gather(
+                [
+                    self._blob_exists_async(bc.get_blob_client(container=folder, blob=name), digest)
+                    for name, digest in candidates.items()
+                ],
+                host=host
+            )
+            existing = dict(zip(candidates, exists))
+            upload_flags = plan_dedup_uploads([source.file_name for source in sources], digests, existing)
+        else:
+            sources = [self._to_upload_source(f) for f in files]
+            digests = [None] * len(sources)
+            upload_flags = [True] * len(sources)
+
         jobs = []
         urls = []
-        async with self._get_blob_service_client(async_mode=True) as bc:
-            for f in files:
-                if not f.file_name or f.file_name == "" or f.file_name == "file":
-                    f.file_name = str(uuid.uuid4())
-
-                blob_client = bc.get_blob_client(container=folder, blob=f.file_name)
-                b = f.to_bytes()
-                up = blob_client.upload_blob(b, overwrite=True)
-                jobs.append(up)
-                urls.append(blob_client.url)
+        for source, digest, upload in zip(sources, digests, upload_flags):
+            blob_client = bc.get_blob_client(container=folder, blob=source.file_name)
+            urls.append(blob_client.url)
+            if upload:
+                metadata = {DIGEST_METADATA_KEY: digest} if digest is not None else None
+                jobs.append(self._upload_source_async(blob_client, source, kwargs.get("large_object"), metadata))
 
-            await gather(*jobs)
+        await self.scheduler.gather(jobs, host=host)
 
         if len(urls) == 1:
             return urls[0]
 
         return urls
 
+    @staticmethod
+    def _to_upload_source(file: Union[MediaFile, UploadSource], digest: str = None) -> UploadSource:
+        """
+        Wrap a file into an UploadSource and give unnamed files a random blob name.
+        In dedup mode unnamed files are named by their content digest instead.
+        """
+        source = UploadSource.from_any(file)
+        if not source.file_name or source.file_name == "" or source.file_name == "file":
+            source.file_name = digest_key(source, digest) if digest is not None else str(uuid.uuid4())
+        return source
+
+    def _dedup_sources(self, hashed: List[Tuple[UploadSource, str]]) -> Tuple[List[UploadSource], List[str]]:
+        """Resolve the blob names of hashed (source, digest) pairs. Unnamed files are named by their digest."""
+        sources = [self._to_upload_source(source, digest) for source, digest in hashed]
+        return sources, [digest for _, digest in hashed]
+
+    @staticmethod
+    def _blob_exists_sync(blob_client, digest: str) -> bool:
+        """Cheap existence check (Get Blob Properties): True if the blob exists and holds the content with digest."""
+        try:
+            properties = blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            return False
+        return is_duplicate(blob_client.blob_name, digest, properties.metadata)
+
+    @staticmethod
+    async def _blob_exists_async(blob_client, digest: str) -> bool:
+        """Async variant of _blob_exists_sync."""
+        try:
+            properties = await blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            return False
+        return is_duplicate(blob_client.blob_name, digest, properties.metadata)
+
+    def _upload_source_sync(
+            self, blob_client, source: UploadSource, large_object: bool = None, metadata: dict = None
+    ):
+        """Stream a single source into a blob with the sync client."""
+        if self._use_block_upload(source, large_object):
+            self._upload_blocks(blob_client, source, metadata)
+            return
+
+        with source.open() as stream:
+            blob_client.upload_blob(
+                stream, length=source.size, overwrite=True, metadata=metadata,
+                content_settings=ContentSettings(content_type=source.content_type)
+            )
+
+    async def _upload_source_async(
+            self, blob_client, source: UploadSource, large_object: bool = None, metadata: dict = None
+    ):
+        """Stream a single source into a blob with the async client."""
+        if self._use_block_upload(source, large_object):
+            await self._upload_blocks_async(blob_client, source, metadata)
+            return
+
+        content_settings = ContentSettings(content_type=source.content_type)
+        if source.is_async_iterator:
+            await blob_client.upload_blob(
+                source.aiter_chunks(), length=source.size, overwrite=True, metadata=metadata,
+                content_settings=content_settings
+            )
+            return
+
+        if source.reopenable and self.retry_policy.should_hedge(source.size):
+            # small, re-readable content: a slow PUT is hedged with a second one that reads its own stream
+            async def put():
+                with source.open() as stream:
+                    await blob_client.upload_blob(
+                        stream, length=source.size, overwrite=True, metadata=metadata, content_settings=content_settings
+                    )
+            await self.retry_policy.acall(put, attempts=1, hedge_key="azure.put")
+            return
+
+        with source.open() as stream:
+            await blob_client.upload_blob(
+                stream, length=source.size, overwrite=True, metadata=metadata, content_settings=content_settings
+            )
+
+    # ------------------------------------------------------------------ #
+    # Large-object mode: parallel block staging                           #
+    # ------------------------------------------------------------------ #
+
+    def _use_block_upload(self, source: UploadSource, large_object: bool = None) -> bool:
+        """Decide between a single upload request and block staging."""
+        if large_object is not None:
+            return large_object
+        return source.size is None or source.size > self.single_upload_threshold
+
+    @staticmethod
+    def _block_id(upload_id: str, index: int) -> str:
+        """Block ids must be base64 and of equal length for all blocks of a blob."""
+        return base64.b64encode(f"{upload_id}{index:010d}".encode()).decode()
+
+    def _stage_block_with_retry(self, blob_client, block_id: str, data: bytes):
+        """
+        Stage a single block. Failed blocks are retried individually with the backoff of the retry policy; the
+        SDK makes a single attempt per call (retry_total=0), so the two retry layers don't multiply.
+        """
+        self.retry_policy.call(
+            blob_client.stage_block, attempts=self.block_retries + 1,
+            block_id=block_id, data=data, length=len(data), retry_total=0
+        )
+
+    async def _stage_block_with_retry_async(self, blob_client, block_id: str, data: bytes):
+        """Async variant of _stage_block_with_retry."""
+        await self.retry_policy.acall(
+            blob_client.stage_block, attempts=self.block_retries + 1,
+            block_id=block_id, data=data, length=len(data), retry_total=0
+        )
+
+    def _upload_blocks(self, blob_client, source: UploadSource, metadata: dict = None):
+        """
+        Split the source into blocks, stage up to max_block_concurrency of them in parallel and commit the
+        block list. Blocks are read just in time, so at most max_block_concurrency + 1 blocks are held in memory.
+        """
+        upload_id = uuid.uuid4().hex
+        block_ids = []
+        with ThreadPoolExecutor(max_workers=self.max_block_concurrency) as pool:
+            pending = set()
+            try:
+                for index, data in enumerate(source.iter_chunks(self.block_size)):
+                    block_id = self._block_id(upload_id, index)
+                    block_ids.append(block_id)
+                    pending.add(pool.submit(
+                        contextvars.copy_context().run, self._stage_block_with_retry, blob_client, block_id, data
+                    ))
+                    if len(pending) >= self.max_block_concurrency:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                for future in pending:
+                    future.result()
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+        blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in block_ids],
+            content_settings=ContentSettings(content_type=source.content_type),
+            metadata=metadata
+        )
+
+    async def _upload_blocks_async(self, blob_client, source: UploadSource, metadata: dict = None):
+        """Async variant of _upload_blocks. Every staged block takes a slot of the scheduler."""
+        upload_id = uuid.uuid4().hex
+
+        async def numbered_blocks():
+            index = 0
+            async for data in source.aiter_chunks(self.block_size):
+                yield self._block_id(upload_id, index), data
+                index += 1
+
+        async def stage(block):
+            block_id, data = block
+            await self._stage_block_with_retry_async(blob_client, block_id, data)
+            return block_id
+
+        block_ids = await run_bounded(
+            numbered_blocks(), stage, self.max_block_concurrency, self.scheduler, self.scheduler.host_of(blob_client.url)
+        )
+        await blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in block_ids],
+            content_settings=ContentSettings(content_type=source.content_type),
+            metadata=metadata
+        )
+
     def upload(
             self,
             file: Union[IMediaContainer, MediaFile, Any],
@@ -170,25 +524,193 @@ class AzureBlobStorage(FastCloud):
             kwargs['folder'] = folder
         return await super().upload_async(file, *args, **kwargs)
 
-    def download(self, url: str, save_path: str = None, *args, **kwargs) -> Union[MediaFile, None, str]:
-        parsed_url = urlparse(url)
-        container_name = parsed_url.path.split('/')[1]
-        blob_name = '/'.join(parsed_url.path.split('/')[2:])
+    def _get_first_range(self, blob_client, length: int):
+        """
+        Downloader of the first length bytes of a blob, with a single SDK attempt (the retry policy retries it).
+        Ranges of empty blobs are not satisfiable (416); those are fetched without a range.
+        """
+        try:
+            return blob_client.download_blob(offset=0, length=length, retry_total=0)
+        except HttpResponseError as e:
+            if e.status_code != 416:
+                raise
+            return blob_client.download_blob(retry_total=0)
 
+    async def _get_first_range_async(self, blob_client, length: int):
+        """Async variant of _get_first_range."""
+        try:
+            return await blob_client.download_blob(offset=0, length=length, retry_total=0)
+        except HttpResponseError as e:
+            if e.status_code != 416:
+                raise
+            return await blob_client.download_blob(retry_total=0)
+
+    @staticmethod
+    def _first_range(downloader) -> Tuple[int, int]:
+        """(end of the first range, blob size) from the downloader of the first request."""
+        content_range = parse_content_range(downloader.properties.content_range)
+        size = content_range[2] if content_range is not None else downloader.size
+        return downloader.size - 1, size
+
+    @instrumented("download")
+    def download(self, url: str, save_path: str = None, *args, **kwargs) -> Union[MediaFile, None, str]:
+        """
+        Download a blob. The first request fetches the first part, so blobs up to the part size take a single
+        request. The rest of larger blobs is fetched as concurrent byte ranges pinned to the blob's ETag; every
+        range is written into its slot of a preallocated buffer or file.
+        :param url: The URL of the blob.
+        :param save_path: Write the blob to this path. If None the blob is returned as MediaFile.
+        :param part_size: (kwarg) Size of the byte ranges. Defaults to download_part_size.
+        :param part_concurrency: (kwarg) Number of ranges fetched in parallel. Defaults to max_download_concurrency.
+        :param mmap: (kwarg) Download into a file (save_path or a temp file in temp_dir) and return a MediaFile
+            memory-mapping it instead of holding a copy in memory.
+        :return: MediaFile, the save_path or None if the blob does not exist.
+        """
+        container_name, blob_name = self._container_and_blob(url)
         blob_client = self._get_blob_service_client(async_mode=False).get_blob_client(container=container_name, blob=blob_name)
+        part_size, concurrency = self._download_parts(**kwargs)
+
+        try:
+            first = self.retry_policy.call(self._get_first_range, blob_client, part_size)
+        except ResourceNotFoundError as e:
+            print(f"An error occurred: {e}")
+            return None
+        first_end, size = self._first_range(first)
+        properties = first.properties
+
+        def read_range(start: int, end: int):
+            downloader = blob_client.download_blob(
+                offset=start, length=end - start + 1, etag=properties.etag, match_condition=MatchConditions.IfNotModified,
+                retry_total=0
+            )
+            return downloader.chunks()
+
+        first_range = (first_end, first.chunks())
+        content_type = properties.content_settings.content_type
+        if kwargs.get("mmap") or save_path is not None:
+            with download_target(save_path, kwargs.get("temp_dir")) as path:
+                download_ranges(size, read_range, part_size, concurrency, path, self.retry_policy, first_range)
+            if not kwargs.get("mmap"):
+                return save_path
+            mark_phase("parse")
+            return media_file_from_mmap(save_path or path, save_path is None, content_type, os.path.basename(blob_name))
+
+        sink = download_ranges(size, read_range, part_size, concurrency, None, self.retry_policy, first_range)
+        mark_phase("parse")
+        return media_file_from_buffer(sink.buffer, content_type, os.path.basename(blob_name), typed=True)
 
+    @instrumented("download")
+    async def download_async(self, url: str, save_path: str = None, *args, **kwargs) -> Union[MediaFile, None, str]:
+        """
+        Download a blob asynchronously with the persistent async client. Same ranged strategy and kwargs as download.
+        With a hedging retry policy the first request fetches at most hedge_max_bytes, so small blobs are fetched
+        with a single, hedged request.
+        """
+        container_name, blob_name = self._container_and_blob(url)
+        blob_client = self._get_blob_service_client(async_mode=True).get_blob_client(container=container_name, blob=blob_name)
+        part_size, concurrency = self._download_parts(**kwargs)
+
+        first_size = min(part_size, self.retry_policy.hedge_max_bytes) if self.retry_policy.hedge else part_size
         try:
-            blob_data = blob_client.download_blob()
+            first = await self.retry_policy.acall(
+                self._get_first_range_async, blob_client, first_size,
+                hedge_key="azure.get" if self.retry_policy.should_hedge(first_size) else None
+            )
         except ResourceNotFoundError as e:
             print(f"An error occurred: {e}")
             return None
+        first_end, size = self._first_range(first)
+        properties = first.properties
 
-        if save_path is None:
-            return media_from_any(blob_data.readall())
+        async def read_range(start: int, end: int):
+            downloader = await blob_client.download_blob(
+                offset=start, length=end - start + 1, etag=properties.etag, match_condition=MatchConditions.IfNotModified,
+                retry_total=0
+            )
+            async for chunk in downloader.chunks():
+                yield chunk
 
-        with open(save_path, "wb") as f:
-            blob_data.readinto(f)
-        return save_path
+        first_range = (first_end, first.chunks())
+        content_type = properties.content_settings.content_type
+        hedge_key = "azure.get" if self.retry_policy.should_hedge(size) else None
+        if kwargs.get("mmap") or save_path is not None:
+            with download_target(save_path, kwargs.get("temp_dir")) as path:
+                await download_ranges_async(
+                    size, read_range, part_size, concurrency, path, self.retry_policy, hedge_key, first_range,
+                    scheduler=self.scheduler, host=self.scheduler.host_of(url)
+                )
+            if not kwargs.get("mmap"):
+                return save_path
+            mark_phase("parse")
+            return media_file_from_mmap(save_path or path, save_path is None, content_type, os.path.basename(blob_name))
+
+        sink = await download_ranges_async(
+            size, read_range, part_size, concurrency, None, self.retry_policy, hedge_key, first_range,
+            scheduler=self.scheduler, host=self.scheduler.host_of(url)
+        )
+        mark_phase("parse")
+        return media_file_from_buffer(sink.buffer, content_type, os.path.basename(blob_name), typed=True)
+
+    @instrumented("iter_download")
+    def iter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> DownloadStream:
+        """
+        Stream a blob in chunks of chunk_size bytes instead of loading it into memory.
+        :param url: The URL of the blob.
+        :param chunk_size: Size of the yielded chunks.
+        :param if_none_match: (kwarg) ETag - conditional download, see DownloadStream.not_modified.
+        :param if_modified_since: (kwarg) HTTP date - conditional download if no ETag is known.
+        :return: DownloadStream with content_length / content_type / etag from the blob properties.
+        """
+        container_name, blob_name = self._container_and_blob(url)
+        blob_client = self._get_blob_service_client(async_mode=False).get_blob_client(container=container_name, blob=blob_name)
+        try:
+            downloader = blob_client.download_blob(**self._conditional_kwargs(kwargs))
+        except ResourceNotModifiedError:
+            return DownloadStream([], etag=kwargs.get("if_none_match"), not_modified=True)
+        return DownloadStream(downloader.chunks(), chunk_size=chunk_size, **self._stream_metadata(downloader.properties))
+
+    @instrumented("iter_download")
+    async def aiter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> AsyncDownloadStream:
+        """Async variant of iter_download on the persistent async client."""
+        container_name, blob_name = self._container_and_blob(url)
+        blob_client = self._get_blob_service_client(async_mode=True).get_blob_client(container=container_name, blob=blob_name)
+        try:
+            downloader = await blob_client.download_blob(**self._conditional_kwargs(kwargs))
+        except ResourceNotModifiedError:
+            return AsyncDownloadStream([], etag=kwargs.get("if_none_match"), not_modified=True)
+        return AsyncDownloadStream(downloader.chunks(), chunk_size=chunk_size, **self._stream_metadata(downloader.properties))
+
+    @staticmethod
+    def _conditional_kwargs(kwargs: dict) -> dict:
+        """download_blob arguments for the conditional download kwargs of iter_download."""
+        if kwargs.get("if_none_match"):
+            return {"etag": kwargs["if_none_match"], "match_condition": MatchConditions.IfModified}
+        if kwargs.get("if_modified_since"):
+            return {"if_modified_since": parsedate_to_datetime(kwargs["if_modified_since"])}
+        return {}
+
+    @staticmethod
+    def _stream_metadata(properties) -> dict:
+        """Content length / type and validators of a blob."""
+        last_modified = properties.last_modified
+        return {
+            "content_length": properties.size,
+            "content_type": properties.content_settings.content_type,
+            "etag": properties.etag,
+            "last_modified": format_datetime(last_modified.astimezone(timezone.utc), usegmt=True) if last_modified else None,
+        }
+
+    def _download_parts(self, part_size: int = None, part_concurrency: int = None, **kwargs) -> tuple[int, int]:
+        """Part size and number of parallel ranges of a download, per-call values override the defaults."""
+        return part_size or self.download_part_size, part_concurrency or self.max_download_concurrency
+
+    @staticmethod
+    def _container_and_blob(url: str) -> tuple[str, str]:
+        """Split a blob URL into container and blob name."""
+        parsed_url = urlparse(url)
+        container_name = parsed_url.path.split('/')[1]
+        blob_name = '/'.join(parsed_url.path.split('/')[2:])
+        return container_name, blob_name
 
     def _parse_and_validate_url(self, url: str) -> tuple[str, str]:
         """
@@ -203,9 +725,7 @@ class AzureBlobStorage(FastCloud):
         Raises:
             ValueError: If the URL doesn't belong to this storage provider
         """
-        parsed_url = urlparse(url)
-        container_name = parsed_url.path.split('/')[1]
-        blob_name = '/'.join(parsed_url.path.split('/')[2:])
+        container_name, blob_name = self._container_and_blob(url)
 
         service_client = self._get_blob_service_client(async_mode=False)
         if service_client.url not in url:
@@ -225,13 +745,13 @@ class AzureBlobStorage(FastCloud):
         """
         try:
             container_name, blob_name = self._parse_and_validate_url(url)
-            async with self._get_blob_service_client(async_mode=True) as service_client:
-                blob_client = service_client.get_blob_client(
-                    container=container_name,
-                    blob=blob_name
-                )
-                await blob_client.delete_blob()
-                return True
+            service_client = self._get_blob_service_client(async_mode=True)
+            blob_client = service_client.get_blob_client(
+                container=container_name,
+                blob=blob_name
+            )
+            await blob_client.delete_blob()
+            return True
         except ResourceNotFoundError:
             print(f"The file {container_name}/{blob_name} was not found.")
             return False
@@ -265,15 +785,87 @@ class AzureBlobStorage(FastCloud):
             print(f"An error occurred: {e}")
             return False
 
+    def _delete_batch_sync(
+            self, container: str, blob_names: List[str], max_workers: int = None
+    ) -> Set[Tuple[str, str]]:
+        """
+        Delete up to MAX_DELETE_BATCH_SIZE blobs of one container with a single blob batch request.
+        Falls back to single deletes if the batch request itself fails (e.g. credentials without batch support).
+
+        Returns:
+            Set[Tuple[str, str]]: The (container, blob) pairs which were deleted.
+        """
+        container_client = self._get_blob_service_client(async_mode=False).get_container_client(container)
+        try:
+            responses = container_client.delete_blobs(*blob_names, raise_on_any_failure=False)
+            return self._deleted_from_responses(container, blob_names, list(responses))
+        except Exception as e:
+            logger.warning("Batch delete in %s failed, deleting blobs one by one: %s", container, e)
+
+        def delete_one(blob_name: str) -> bool:
+            try:
+                container_client.delete_blob(blob_name)
+                return True
+            except Exception as e:
+                logger.warning("Deleting %s/%s failed: %s", container, blob_name, e)
+                note_failure(e, 1)
+                return False
+
+        results = self._map(delete_one, blob_names, max_workers)
+        return {(container, blob_name) for blob_name, ok in zip(blob_names, results) if ok}
+
+    async def _delete_batch_async(
+            self, container: str, blob_names: List[str], host: str = None
+    ) -> Set[Tuple[str, str]]:
+        """
+        Async variant of _delete_batch_sync.
+        The batch request and the single deletes of the fallback each take a slot of the scheduler for host.
+        """
+        container_client = self._get_blob_service_client(async_mode=True).get_container_client(container)
+        try:
+            responses = await self.scheduler.run(
+                container_client.delete_blobs(*blob_names, raise_on_any_failure=False), host=host
+            )
+            return self._deleted_from_responses(container, blob_names, [r async for r in responses])
+        except Exception as e:
+            logger.warning("Batch delete in %s failed, deleting blobs one by one: %s", container, e)
+
+        async def delete_one(blob_name: str):
+            try:
+                await container_client.delete_blob(blob_name)
+                return True
+            except Exception as e:
+                logger.warning("Deleting %s/%s failed: %s", container, blob_name, e)
+                note_failure(e, 1)
+                return False
+
+        results = await self.scheduler.gather([delete_one(blob_name) for blob_name in blob_names], host=host)
+        return {(container, blob_name) for blob_name, ok in zip(blob_names, results) if ok}
+
+    @staticmethod
+    def _deleted_from_responses(container: str, blob_names: List[str], responses: list) -> Set[Tuple[str, str]]:
+        """The batch returns one sub-response per blob, in request order. 202 means deleted."""
+        deleted = set()
+        for blob_name, response in zip(blob_names, responses):
+            if response.status_code == 202:
+                deleted.add((container, blob_name))
+            else:
+                logger.warning("Deleting %s/%s failed: HTTP %d", container, blob_name, response.status_code)
+                note_failure(objects=1)
+        return deleted
+
+    @instrumented("delete")
     def delete(self, url: Union[str, List[str]], *args, **kwargs) -> Union[bool, List[bool]]:
         """
         Delete a file or list of files from Azure Blob Storage synchronously.
+        Lists are grouped by container and deleted with blob batch requests of up to MAX_DELETE_BATCH_SIZE blobs.
 
         Args:
             url: Single URL or list of URLs to delete
+            max_workers: (kwarg) Send the batch requests from this many threads. Defaults to self.max_workers.
 
         Returns:
-            Union[bool, List[bool]]: Result(s) of deletion operation(s)
+            Union[bool, List[bool]]: Result(s) of deletion operation(s), in input order
         """
         if not url:
             return False
@@ -282,18 +874,26 @@ class AzureBlobStorage(FastCloud):
             return self._delete_single_blob_sync(url)
 
         if isinstance(url, list):
-            url = list(set(url))
-            return [self._delete_single_blob_sync(u) for u in url]
+            batches, targets = plan_delete_batches(url, self._parse_and_validate_url, self.MAX_DELETE_BATCH_SIZE)
+            max_workers = kwargs.get("max_workers")
+            deleted = set()
+            for batch_deleted in self._map(
+                    lambda batch: self._delete_batch_sync(*batch, max_workers=max_workers), batches, max_workers
+            ):
+                deleted |= batch_deleted
+            return delete_results(targets, deleted)
 
         return False
 
+    @instrumented("delete")
     async def delete_async(self, url: Union[str, List[str]], *args, **kwargs) -> Union[bool, List[bool]]:
         """
         Delete a file or list of files from Azure Blob Storage asynchronously.
+        Lists are grouped into blob batch requests (see delete) which run concurrently through the scheduler.
         Args:
             url: Single URL or list of URLs to delete
         Returns:
-            Union[bool, List[bool]]: Result(s) of deletion operation(s)
+            Union[bool, List[bool]]: Result(s) of deletion operation(s), in input order
         """
         if not url:
             return False
@@ -302,9 +902,15 @@ class AzureBlobStorage(FastCloud):
             return await self._delete_single_blob_async(url)
 
         if isinstance(url, list):
-            url = list(set(url))
-            tasks = [self._delete_single_blob_async(u) for u in url]
-            return await gather(*tasks)
+            batches, targets = plan_delete_batches(url, self._parse_and_validate_url, self.MAX_DELETE_BATCH_SIZE)
+            host = self.scheduler.host_of(self._get_blob_service_client().url)
+            # the requests of each batch are bounded by the scheduler inside _delete_batch_async; a batch must not
+            # hold a slot itself while its fallback waits for slots of the single deletes
+            tasks = [self._delete_batch_async(container, blob_names, host) for container, blob_names in batches]
+            deleted = set()
+            for batch_deleted in await asyncio.gather(*tasks):
+                deleted |= batch_deleted
+            return delete_results(targets, deleted)
 
         return False
 
@@ -322,56 +928,122 @@ class AzureBlobStorage(FastCloud):
             blob_name = uuid.uuid4()
 
         try:
-            bc = self._get_blob_service_client(async_mode=False)
-            sas_token = generate_blob_sas(
-                account_name=bc.account_name,
-                container_name=container,
-                blob_name=blob_name,
-                account_key=bc.credential.account_key,
-                permission=BlobSasPermissions(read=True, write=True, create=True),
-                expiry=datetime.utcnow() + timedelta(minutes=time_limit)
-            )
-
-            blob_url = bc.get_blob_client(container=container, blob=blob_name).url
-            return f"{blob_url}?{sas_token}"
-
+            return self.create_temporary_upload_links([str(blob_name)], container=container, time_limit=time_limit)[0]
         except Exception as e:
             print(f"An error occurred while generating SAS token: {e}")
             return None
 
+    def _sas_signing_material(self, expiry: datetime) -> Tuple[str, dict]:
+        """
+        The account name and the key SAS tokens are signed with: the account key of the connection string, or for
+        token credentials a user delegation key. The delegation key is fetched once and reused until it would expire
+        before the requested SAS expiry; everything else happens offline.
+        """
+        service_client = self._get_blob_service_client(async_mode=False)
+        account_key = getattr(service_client.credential, "account_key", None)
+        if account_key:
+            return service_client.account_name, {"account_key": account_key}
+
+        if not hasattr(service_client.credential, "get_token"):
+            raise ValueError("Signing SAS links requires a connection string with an account key or a token credential.")
+
+        cached = self._user_delegation_key
+        if cached is None or cached[0] < expiry:
+            now = datetime.now(timezone.utc)
+            # delegation keys are valid for at most 7 days
+            key_expiry = min(max(expiry, now + timedelta(days=1)), now + timedelta(days=7))
+            key = service_client.get_user_delegation_key(key_start_time=now - timedelta(minutes=5), key_expiry_time=key_expiry)
+            cached = self._user_delegation_key = (key_expiry, key)
+        return service_client.account_name, {"user_delegation_key": cached[1]}
+
+    def _sas_urls(self, blobs: List[Tuple[str, str]], permission: "BlobSasPermissions", time_limit: int) -> List[str]:
+        """Sign (container, blob_name) pairs offline; the batch shares expiry, permission and signing key."""
+        expiry = datetime.now(timezone.utc) + timedelta(minutes=time_limit)
+        account_name, signing_key = self._sas_signing_material(expiry)
+        base_url = self._get_blob_service_client(async_mode=False).url.split("?")[0].rstrip("/")
+        return [
+            f"{base_url}/{container}/{quote(blob_name, safe='~/')}?"
+            + generate_blob_sas(account_name, container, blob_name, permission=permission, expiry=expiry, **signing_key)
+            for container, blob_name in blobs
+        ]
+
+    def create_temporary_upload_links(
+            self, blob_names: Union[int, List[str]], time_limit: int = 20, container: str = "upload", **kwargs
+    ) -> List[str]:
+        """
+        Generate upload links (SAS URLs) for many blobs in one call, e.g. for direct uploads from a frontend.
+        The links are signed offline with the cached account or user delegation key; no request per link is made.
+        Upload with `PUT <url>` and the header `x-ms-blob-type: BlockBlob` (see upload_with_temporary_upload_link).
+        :param blob_names: Names of the blobs, or the number of links to create with random UUID names.
+        :param time_limit: Time in minutes for the SAS tokens to remain valid.
+        :param container: Name of the Azure Blob Storage container.
+        :return: The SAS URLs in the order of blob_names.
+        """
+        if isinstance(blob_names, int):
+            blob_names = [str(uuid.uuid4()) for _ in range(blob_names)]
+        permission = BlobSasPermissions(read=True, write=True, create=True)
+        return self._sas_urls([(container, blob_name) for blob_name in blob_names], permission, time_limit)
+
+    def create_temporary_download_links(self, urls: List[str], time_limit: int = 20, **kwargs) -> List[str]:
+        """
+        Generate read-only SAS URLs for many blobs in one call. Signed offline like create_temporary_upload_links.
+        :param urls: URLs of the blobs as returned by upload.
+        :param time_limit: Time in minutes for the SAS tokens to remain valid.
+        :return: The SAS URLs in the order of urls.
+        """
+        service_url = self._get_blob_service_client(async_mode=False).url
+        blobs = []
+        for url in urls:
+            if service_url not in url:
+                raise ValueError("File does not belong to this storage provider.")
+            container_name, blob_name = self._container_and_blob(url)
+            blobs.append((container_name, unquote(blob_name)))
+        return self._sas_urls(blobs, BlobSasPermissions(read=True), time_limit)
+
     @requires("httpx")
     @staticmethod
-    def upload_with_temporary_upload_link(sas_url: str, file: Union[bytes, io.BytesIO, MediaFile, str]) -> bool:
+    def upload_with_temporary_upload_link(
+            sas_url: str, file: Union[bytes, io.BytesIO, MediaFile, str, UploadSource],
+            http_client: HTTPClientManager = None, sas_uploader: SasUploader = None
+    ) -> bool:
         """
-        Upload a file directly to a given SAS URL.
+        Upload a file directly to a given SAS URL. The file is streamed from its path or file object; files above
+        64 MB (or of unknown size) are uploaded as concurrent blocks and committed with a block list.
         :param sas_url: The SAS URL for the blob.
         :param file: The file to upload.
+        :param http_client: Pooled HTTP clients to use. Defaults to a shared process-wide pool.
+        :param sas_uploader: Block size, block concurrency and single upload threshold.
         :return: True if the upload succeeds, False otherwise.
         """
         try:
-            file = MediaFile().from_any(file)
-            headers = {"x-ms-blob-type": "BlockBlob"}
-            response = httpx.put(sas_url, content=file.to_bytes(), headers=headers)
-            return response.status_code == 201
+            http_client = http_client or default_http_client()
+            with http_client.get_client() as client:
+                (sas_uploader or SasUploader()).upload(client, sas_url, UploadSource.from_any(file))
+            return True
         except Exception as e:
             print(f"An error occurred during SAS upload: {e}")
             return False
 
     @requires("httpx")
     @staticmethod
-    async def async_upload_with_temporary_upload_link(sas_url: str, file: Union[bytes, io.BytesIO, MediaFile, str]) -> bool:
+    async def async_upload_with_temporary_upload_link(
+            sas_url: str, file: Union[bytes, io.BytesIO, MediaFile, str, UploadSource],
+            http_client: HTTPClientManager = None, sas_uploader: SasUploader = None
+    ) -> bool:
         """
-        Asynchronously upload a file directly to a given SAS URL.
+        Asynchronously upload a file directly to a given SAS URL. Streams like upload_with_temporary_upload_link,
+        but does not overwrite an existing blob.
         :param sas_url: The SAS URL for the blob.
         :param file: The file to upload.
+        :param http_client: Pooled HTTP clients to use. Defaults to a shared process-wide pool.
+        :param sas_uploader: Block size, block concurrency and single upload threshold.
         :return: True if the upload succeeds, False otherwise.
         """
         try:
-            file = MediaFile().from_any(file)
-            headers = {"x-ms-blob-type": "BlockBlob", "x-ms-if-none-match": "*"}
-            async with httpx.AsyncClient() as client:
-                response = await client.put(sas_url, content=file.to_bytes(), headers=headers)
-                return response.status_code == 201
+            http_client = http_client or default_http_client()
+            async with http_client.get_async_client() as client:
+                await (sas_uploader or SasUploader(if_none_match=True)).upload_async(client, sas_url, UploadSource.from_any(file))
+            return True
         except Exception as e:
             print(f"An error occurred during async SAS upload: {e}")
             return False
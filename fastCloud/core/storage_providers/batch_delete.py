@@ -0,0 +1,50 @@
+import logging
+from typing import Callable, List, Optional, Set, Tuple
+
+from fastCloud.core.instrumentation import note_failure
+
+logger = logging.getLogger(__name__)
+
+# (folder, name) i.e. (bucket, key) or (container, blob)
+Target = Tuple[str, str]
+
+
+def plan_delete_batches(
+        urls: List[str],
+        parse_url: Callable[[str], Target],
+        batch_size: int
+) -> Tuple[List[Tuple[str, List[str]]], List[Optional[Target]]]:
+    """
+    Group URLs by folder (bucket / container) into batches for the providers' batch delete APIs.
+    Duplicate URLs are deleted once.
+
+    :param urls: The URLs to delete.
+    :param parse_url: Function returning (folder, name) for a URL. URLs it raises for are not deleted.
+    :param batch_size: Maximum number of objects per batch request.
+    :return: ([(folder, [names])], targets) where targets[i] is the parsed URL i or None if it was invalid.
+    """
+    targets = []
+    names_by_folder = {}
+    for url in urls:
+        try:
+            folder, name = parse_url(url)
+        except Exception as e:
+            logger.warning("Cannot delete %s: %s", url, e)
+            note_failure(e, 1)
+            targets.append(None)
+            continue
+        targets.append((folder, name))
+        # dict keeps insertion order and removes duplicates
+        names_by_folder.setdefault(folder, {})[name] = None
+
+    batches = []
+    for folder, names in names_by_folder.items():
+        names = list(names)
+        for start in range(0, len(names), batch_size):
+            batches.append((folder, names[start:start + batch_size]))
+    return batches, targets
+
+
+def delete_results(targets: List[Optional[Target]], deleted: Set[Target]) -> List[bool]:
+    """Map the set of deleted (folder, name) pairs back to one bool per input URL, in input order."""
+    return [target is not None and target in deleted for target in targets]
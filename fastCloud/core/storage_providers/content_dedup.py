@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import io
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from fastCloud.core.streaming import UploadSource, DEFAULT_CHUNK_SIZE, _SPOOL_MAX_MEMORY
+from fastCloud.core.transfer import run_bounded
+
+# Object metadata holding the content digest. Alphanumeric only, so it is valid as S3 header and Azure metadata name.
+DIGEST_METADATA_KEY = "contentsha256"
+# Number of existence checks (HEAD requests) of a batch which run in parallel in the sync upload path.
+EXISTENCE_CHECK_CONCURRENCY = 16
+# Number of sources hashed at the same time in the async upload path (each one is a worker thread or an open spool).
+HASH_CONCURRENCY = 8
+
+
+def _is_seekable(fileobj) -> bool:
+    try:
+        return fileobj.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def hash_source(source: UploadSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[UploadSource, str]:
+    """
+    SHA-256 of a source, read in chunks. Paths, MediaFiles, bytes and seekable file objects are read twice (hash,
+    then upload); one-shot streams (iterators, pipes) are spooled to a temporary file while hashing.
+    :return: (source to upload, hex digest). The source is a spooled copy for one-shot streams.
+    """
+    hasher = hashlib.sha256()
+    if source.fileobj is not None and _is_seekable(source.fileobj):
+        position = source.fileobj.tell()
+        for chunk in source.iter_chunks(chunk_size):
+            hasher.update(chunk)
+        source.fileobj.seek(position)
+        return source, hasher.hexdigest()
+
+    if source.fileobj is not None or source.chunks is not None:
+        spooled = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+        for chunk in source.iter_chunks(chunk_size):
+            hasher.update(chunk)
+            spooled.write(chunk)
+        return _spooled_source(source, spooled), hasher.hexdigest()
+
+    for chunk in source.iter_chunks(chunk_size):
+        hasher.update(chunk)
+    return source, hasher.hexdigest()
+
+
+async def hash_source_async(source: UploadSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[UploadSource, str]:
+    """Async variant of hash_source. Hashing runs in a worker thread, async iterators are spooled while hashing."""
+    if not source.is_async_iterator:
+        return await asyncio.to_thread(hash_source, source, chunk_size)
+
+    hasher = hashlib.sha256()
+    spooled = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+    async for chunk in source.aiter_chunks(chunk_size):
+        hasher.update(chunk)
+        spooled.write(chunk)
+    return _spooled_source(source, spooled), hasher.hexdigest()
+
+
+async def hash_sources_async(files: list, concurrency: int = HASH_CONCURRENCY) -> List[Tuple[UploadSource, str]]:
+    """
+    hash_source_async for every file of a batch with at most concurrency files hashed at the same time, so a large
+    batch neither fills the default thread pool nor reads all of its streams at once.
+    :return: (source to upload, hex digest) per file, in the order of files.
+    """
+    return await run_bounded(files, lambda file: hash_source_async(UploadSource.from_any(file)), concurrency)
+
+
+def _spooled_source(source: UploadSource, spooled: io.IOBase) -> UploadSource:
+    size = spooled.tell()
+    spooled.seek(0)
+    return UploadSource(spooled, file_name=source.file_name, content_type=source.content_type, size=size)
+
+
+def digest_key(source: UploadSource, digest: str) -> str:
+    """Object key of an unnamed file in dedup mode: the digest plus the file extension."""
+    ext = source.extension
+    return f"{digest}.{ext}" if ext else digest
+
+
+def is_duplicate(key: str, digest: str, metadata: Optional[Mapping[str, str]]) -> bool:
+    """
+    True if an existing object already holds the content with this digest: its key was derived from the digest, or
+    its metadata records the digest (named files keep their key).
+    """
+    if key.split(".", 1)[0] == digest:
+        return True
+    return bool(metadata) and metadata.get(DIGEST_METADATA_KEY) == digest
+
+
+def check_existing(
+        candidates: Dict[str, str],
+        exists: Callable[[str, str], bool],
+        concurrency: int = EXISTENCE_CHECK_CONCURRENCY
+) -> Dict[str, bool]:
+    """
+    Run the existence checks of a batch in parallel threads.
+    :param candidates: {key: digest} of the objects to check.
+    :param exists: Function (key, digest) -> True if the object exists with this content.
+    :param concurrency: Number of checks in flight.
+    :return: {key: exists}
+    """
+    items = list(candidates.items())
+    if len(items) <= 1:
+        return {key: exists(key, digest) for key, digest in items}
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as pool:
+        results = list(pool.map(lambda item: exists(*item), items))
+    return {key: result for (key, _), result in zip(items, results)}
+
+
+def plan_dedup_uploads(keys: List[str], digests: List[str], existing: Dict[str, bool]) -> List[bool]:
+    """
+    Decide which sources of a batch are uploaded: only the first occurrence of every (key, content) that does not
+    exist yet. Repeated content within the batch and content already in the bucket are skipped.
+    :return: One flag per key, in input order.
+    """
+    seen = set()
+    flags = []
+    for key, digest in zip(keys, digests):
+        flags.append(not existing.get(key, False) and (key, digest) not in seen)
+        seen.add((key, digest))
+    return flags
@@ -1,12 +1,14 @@
 import asyncio
-import io
 import logging
-import multiprocessing
+import threading
 import time
+import weakref
 import uuid
 import os
-from typing import Optional, Union, List, Any
-from urllib.parse import urlparse
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Union, List, Any, Set, Tuple
+from urllib.parse import urlparse, quote, unquote
 
 from media_toolkit import MediaFile, IMediaContainer
 from media_toolkit.utils.dependency_requirements import requires
@@ -14,6 +16,16 @@ from media_toolkit.utils.dependency_requirements import requires
 # FastCloud base class handles all type-dispatch logic (dict, list, single file)
 # so S3Storage only needs to implement the raw file-level operations.
 from fastCloud.core.i_fast_cloud import FastCloud
+from fastCloud.core.streaming import UploadSource, DownloadStream, AsyncDownloadStream, DEFAULT_CHUNK_SIZE
+from fastCloud.core.transfer import run_bounded, download_ranges, download_ranges_async, parse_content_range
+from fastCloud.core.instrumentation import instrumented, mark_phase, note_failure
+from fastCloud.core.mmap_file import download_target, media_file_from_mmap, media_file_from_buffer
+from fastCloud.core.storage_providers.s3_transfer_policy import S3TransferPolicy
+from fastCloud.core.storage_providers.batch_delete import plan_delete_batches, delete_results
+from fastCloud.core.storage_providers.presign import SigV4Presigner
+from fastCloud.core.storage_providers.content_dedup import (
+    DIGEST_METADATA_KEY, hash_source, hash_sources_async, digest_key, is_duplicate, check_existing, plan_dedup_uploads
+)
 
 try:
     import boto3
@@ -29,6 +41,8 @@ try:
 except ImportError:
     pass
 
+logger = logging.getLogger(__name__)
+
 
 class S3Storage(FastCloud):
     """
@@ -66,12 +80,21 @@ class S3Storage(FastCloud):
     }
     _SCALEWAY_ENDPOINT_TEMPLATE = "https://s3.{region}.scw.cloud"
 
+    # DeleteObjects accepts at most 1,000 keys per request.
+    MAX_DELETE_BATCH_SIZE = 1000
+    # Size of the chunks a ranged GET body is read in.
+    _DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
     @requires("boto3")
     def __init__(
         self,
         endpoint_url: str = None,
         access_key_id: str = None,
         access_key_secret: str = None,
+        transfer_policy: S3TransferPolicy = None,
+        transfer_config: "TransferConfig" = None,
+        dedup: bool = False,
+        **kwargs,
     ):
         """
         Initialise the S3Storage client.
@@ -79,28 +102,43 @@ class S3Storage(FastCloud):
         :param endpoint_url:      S3-compatible endpoint, e.g. "https://nyc3.digitaloceanspaces.com"
         :param access_key_id:     AWS / provider access key ID.
         :param access_key_secret: AWS / provider secret access key.
+        :param transfer_policy:   Chooses single PUT vs multipart, part size and part concurrency
+                                  per object from its size. Defaults to S3TransferPolicy().
+        :param transfer_config:   A fixed boto3 TransferConfig used for every object instead of the policy.
+        :param dedup:             Default of the per-call dedup kwarg: key unnamed files by their SHA-256 and
+                                  skip uploads whose content already exists in the bucket.
+        :param kwargs:            Concurrency settings passed to FastCloud
+                                  (max_concurrency, max_concurrency_per_host, scheduler).
         """
+        super().__init__(**kwargs)
         self.endpoint_url = endpoint_url
         self.access_key_id = access_key_id
         self.secret_access_key = access_key_secret
 
-        # Multipart upload configuration — mirrors what the original implementation used.
-        self.transfer_config = TransferConfig(
-            multipart_threshold=1024 * 25,   # 25 MB threshold before switching to multipart
-            max_concurrency=multiprocessing.cpu_count(),
-            multipart_chunksize=1024 * 25,
-            use_threads=True
-        )
+        # Multipart configuration is derived per object (see _get_transfer_config).
+        # A fixed transfer_config takes precedence over the adaptive policy.
+        self.transfer_policy = transfer_policy if transfer_policy is not None else S3TransferPolicy()
+        self.transfer_config = transfer_config
+        self.dedup = dedup
 
         # Lazily initialised sync boto3 client (one per instance, thread-safe for reads).
         self._boto_client = None
+        # Single-attempt client for the ranged GETs, which the retry policy retries per range.
+        self._boto_range_client = None
+
+        # Offline signer for presigned links; caches the derived SigV4 key (see create_temporary_upload_links).
+        self._presigner = None
 
         # Lazily initialised aioboto3 Session for async operations.
-        # We cache the *Session* rather than the client because aioboto3 clients
-        # must be used as async context managers and cannot be kept open persistently.
         # Creating a new Session is cheap — it holds no network connections itself.
         self._aioboto_session = None
 
+        # Persistent aioboto3 clients, one per event loop (their aiohttp connection
+        # pool cannot be shared between loops) and retry mode. Keyed by (id(loop), sdk_retries):
+        # (weakref(loop), client context manager, task entering the context).
+        self._aioboto_clients = {}
+        self._client_lock = threading.Lock()
+
         # Suppress overly verbose boto3 / botocore logs (mirrors Azure's approach).
         logging.getLogger("boto3").setLevel(logging.ERROR)
         logging.getLogger("botocore").setLevel(logging.ERROR)
@@ -160,27 +198,41 @@ class S3Storage(FastCloud):
     # ------------------------------------------------------------------ #
     # Internal client management                                           #
     # ------------------------------------------------------------------ #
-    def _get_boto_client(self) -> "boto3.client":
+    def _get_boto_client(self, sdk_retries: bool = True) -> "boto3.client":
         """
         Return a cached boto3 S3 client, creating one on first call.
 
         Keeping a single client instance avoids the overhead of re-authenticating
         on every request (same pattern as AzureBlobStorage._get_blob_service_client).
+
+        :param sdk_retries: False returns the single-attempt client for calls which
+                            are retried by self.retry_policy (ranged downloads).
         """
-        if self._boto_client is not None:
-            return self._boto_client
+        attribute = "_boto_client" if sdk_retries else "_boto_range_client"
+        client = getattr(self, attribute)
+        if client is not None:
+            return client
 
         if not all([self.endpoint_url, self.access_key_id, self.secret_access_key]):
             raise ValueError(
                 "endpoint_url, access_key_id, and access_key_secret are all required."
             )
 
+        with self._client_lock:
+            # another thread of a max_workers batch may have created it meanwhile
+            if getattr(self, attribute) is None:
+                setattr(self, attribute, self._create_boto_client(sdk_retries))
+        return getattr(self, attribute)
+
+    def _create_boto_client(self, sdk_retries: bool = True) -> "boto3.client":
         region = self._extract_region_from_url(self.endpoint_url)
         boto_config = Config(
             signature_version="s3v4",
-            retries={"max_attempts": 3, "mode": "standard"},
+            retries=self.retry_policy.botocore_retries(sdk_retries),
+            # every worker thread runs its own multipart transfer
+            max_pool_connections=max(10, (self.max_workers or 1) * self.transfer_policy.max_concurrency),
         )
-        self._boto_client = session.Session().client(
+        return session.Session().client(
             "s3",
             endpoint_url=self.endpoint_url,
             aws_access_key_id=self.access_key_id,
@@ -188,23 +240,63 @@ class S3Storage(FastCloud):
             config=boto_config,
             region_name=region,
         )
-        return self._boto_client
 
     @requires("aioboto3")
-    def _get_aioboto_client_context(self):
+    async def _get_aioboto_client(self, sdk_retries: bool = True):
         """
-        Return an aioboto3 S3 client as an *async context manager*.
+        Return the persistent aioboto3 S3 client of the running event loop.
+        With sdk_retries=False, the single-attempt client for calls retried by self.retry_policy.
 
-        Why a context manager instead of a cached client?
-        aioboto3 clients own an aiohttp connection pool that must be explicitly
-        closed to avoid resource leaks. The async-with pattern guarantees cleanup
-        even when exceptions occur.  We build the client config fresh each time,
-        but the underlying aioboto3 Session (and its resolver cache) is reused
-        across calls via self._aioboto_session.
+        The client (and its aiohttp connection pool and resolved credentials) is
+        created on first use and reused by all async calls on that loop. A call
+        from another event loop gets its own client, so a storage object can be
+        used from asyncio.run() repeatedly or from several threads.
+        Release the clients with aclose() / close() or `async with storage:`.
 
-        Typical usage:
-            async with self._get_aioboto_client_context() as client:
-                await client.upload_fileobj(...)
+        Concurrent first calls share one creation task instead of each opening a client.
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), sdk_retries)
+        with self._client_lock:
+            self._prune_aioboto_clients()
+            entry = self._aioboto_clients.get(key)
+            if entry is None or entry[0]() is not loop:
+                context = self._get_aioboto_client_context(sdk_retries)
+                entry = (weakref.ref(loop), context, loop.create_task(context.__aenter__()))
+                self._aioboto_clients[key] = entry
+
+        try:
+            # shield: a cancelled caller must not cancel the creation other callers wait for
+            return await asyncio.shield(entry[2])
+        except Exception:
+            with self._client_lock:
+                if self._aioboto_clients.get(key) is entry:
+                    del self._aioboto_clients[key]
+            raise
+
+    def _prune_aioboto_clients(self):
+        """Forget clients whose event loop was garbage collected or closed."""
+        for key, (loop_ref, _, _) in list(self._aioboto_clients.items()):
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                del self._aioboto_clients[key]
+
+    @staticmethod
+    async def _close_aioboto_client(context, task):
+        """Exit the client context entered by task. Clients that failed to open are skipped."""
+        try:
+            await task
+        except Exception:
+            return
+        await context.__aexit__(None, None, None)
+
+    def _get_aioboto_client_context(self, sdk_retries: bool = True):
+        """
+        Build a new aioboto3 S3 client as an *async context manager*.
+
+        Used by _get_aioboto_client, which enters it once per event loop and keeps
+        the client open. The underlying aioboto3 Session (and its resolver cache)
+        is reused across clients via self._aioboto_session.
         """
         if self._aioboto_session is None:
             self._aioboto_session = aioboto3.Session()
@@ -212,9 +304,8 @@ class S3Storage(FastCloud):
         region = self._extract_region_from_url(self.endpoint_url)
         boto_config = Config(
             signature_version="s3v4",
-            retries={"max_attempts": 3, "mode": "standard"},
+            retries=self.retry_policy.botocore_retries(sdk_retries),
         )
-        # Returns the async context manager — caller must use `async with`.
         return self._aioboto_session.client(
             "s3",
             endpoint_url=self.endpoint_url,
@@ -224,107 +315,145 @@ class S3Storage(FastCloud):
             region_name=region,
         )
 
+    def close(self) -> None:
+        """
+        Close the sync boto3 client and the aioboto3 clients of all event loops.
+        Clients of a loop running in another thread are closed on that loop.
+        Inside a running loop prefer `await storage.aclose()`.
+        """
+        with self._client_lock:
+            boto_clients = (self._boto_client, self._boto_range_client)
+            self._boto_client = self._boto_range_client = None
+            clients, self._aioboto_clients = self._aioboto_clients, {}
+
+        for boto_client in boto_clients:
+            if boto_client is not None:
+                boto_client.close()
+
+        for loop_ref, context, task in clients.values():
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                continue
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._close_aioboto_client(context, task), loop)
+            else:
+                loop.run_until_complete(self._close_aioboto_client(context, task))
+
+    async def aclose(self) -> None:
+        """Close the aioboto3 clients of the running event loop, then all other clients (see close)."""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            entries = [self._aioboto_clients.pop((id(loop), sdk_retries), None) for sdk_retries in (True, False)]
+
+        for entry in entries:
+            if entry is not None:
+                await self._close_aioboto_client(entry[1], entry[2])
+        self.close()
+
     # ------------------------------------------------------------------ #
     # Core upload primitives (called by FastCloud after type dispatch)     #
     # ------------------------------------------------------------------ #
 
     def _upload_files(
         self,
-        files: Union[MediaFile, List[MediaFile]],
+        files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]],
         folder: str,
         *args,
         **kwargs,
     ) -> Union[str, List[str]]:
         """
-        Upload one or more MediaFile objects to S3 synchronously.
+        Upload one or more files to S3 synchronously.
 
-        FastCloud guarantees that `files` is already a list of MediaFile by the
-        time it reaches here, so we don't need to repeat type-checking.
+        Every file is wrapped into an UploadSource and streamed into
+        upload_fileobj, so boto3 reads it chunk by chunk (multipart for large
+        files) instead of us materialising the whole content as bytes first.
 
-        :param files:  A single MediaFile or a list of MediaFile instances.
+        :param files:  A single file or a list of MediaFile / UploadSource instances.
         :param folder: The S3 bucket name (equivalent to Azure's container).
+        :param transfer_config: (kwarg) S3TransferPolicy or boto3 TransferConfig overriding
+                       the storage's transfer settings for this call.
+        :param dedup:  (kwarg) Hash the content, key unnamed files by the digest and skip
+                       files whose content already exists (see _dedup_sources). Defaults to self.dedup.
+        :param max_workers: (kwarg) Upload the files in this many threads sharing the
+                       (thread-safe) boto3 client. Defaults to self.max_workers.
         :return:       A single URL string when one file was uploaded, or a list of URLs.
         """
         if not isinstance(files, list):
             files = [files]
 
         boto_client = self._get_boto_client()
-        urls: List[str] = []
-
-        for f in files:
-            # Guard 1: FastCloud's get_processable_files() may hand us raw bytes,
-            # file paths, or other non-MediaFile types depending on the container
-            # variant (MediaList, MediaDict, nested structures). Normalise everything
-            # to MediaFile so the rest of this loop is type-safe.
-            if not isinstance(f, MediaFile):
-                f = MediaFile().from_any(f)
-
-            # Guard 2: Certain MediaFile subclasses (e.g. VideoFile) implement
-            # to_bytes() as a generator/chunked API that returns a list of byte
-            # segments rather than a single bytes object. This is transparent in
-            # the sync path because FastCloud recurses item-by-item, but surfaces
-            # in the async path where all files arrive together via
-            # get_processable_files(). Join the chunks into a single bytes object
-            # before handing off to BytesIO.
-            raw = f.to_bytes()
-            if isinstance(raw, (list, tuple)):
-                raw = b"".join(raw)
-
-            # Determine the S3 object key (the filename stored in the bucket).
-            #
-            # MediaFile._file_info() guarantees file_name is never None — it
-            # always falls back to the literal string "file". We treat "file"
-            # as "no meaningful name" and generate a UUID instead.
-            #
-            # Crucially we preserve the file extension by reading MediaFile.extension,
-            # which first maps content_type via mime_to_extension(), then falls back
-            # to the filename suffix. Without this, files uploaded with a UUID key
-            # would have NO extension and S3 would serve them as application/octet-stream
-            # regardless of their actual type — breaking any client that relies on
-            # the Content-Type header or the key suffix to determine how to handle them.
-            #
-            # Examples:
-            #   VideoFile  -> content_type="video/mp4"  -> extension="mp4"  -> key="<uuid>.mp4"
-            #   ImageFile  -> content_type="image/png"  -> extension="png"  -> key="<uuid>.png"
-            #   MediaFile with file_name="report.pdf"   ->                     key="report.pdf"
-            if not f.file_name or f.file_name in ("", "file"):
-                ext = f.extension  # None when truly undetermined
-                base = str(uuid.uuid4())
-                f.file_name = f"{base}.{ext}" if ext else base
-
-            key = f.file_name
-
-            # content_type is guaranteed non-None by MediaFile._file_info()
-            # (defaults to "application/octet-stream"), so the fallback here
-            # is purely defensive for any non-standard MediaFile subclass.
-            content_type = f.content_type or "application/octet-stream"
-
-            boto_client.upload_fileobj(
-                io.BytesIO(raw),
-                folder,
-                key,
-                ExtraArgs={
-                    "ContentType": content_type,
-                    "ACL": "public-read",
-                },
-                Config=self.transfer_config,
+        max_workers = kwargs.get("max_workers")
+
+        if kwargs.get("dedup", self.dedup):
+            mark_phase("prepare")
+            hashed = self._map(lambda f: hash_source(UploadSource.from_any(f)), files, max_workers)
+            mark_phase("network")
+            sources, digests = self._dedup_sources(hashed)
+            existing = check_existing(
+                {source.file_name: digest for source, digest in zip(sources, digests)},
+                lambda key, digest: self._object_exists_sync(boto_client, folder, key, digest),
             )
-
+            upload_flags = plan_dedup_uploads([source.file_name for source in sources], digests, existing)
+        else:
+            sources = [self._to_upload_source(f) for f in files]
+            digests = [None] * len(sources)
+            upload_flags = [True] * len(sources)
+
+        def upload(item) -> str:
+            source, digest, needs_upload = item
+            if needs_upload:
+                self._upload_single_file_sync(boto_client, source, folder, kwargs.get("transfer_config"), digest)
             # Build a public URL — mirrors how Azure returns blob_client.url.
-            url = f"{self.endpoint_url.rstrip('/')}/{folder}/{key}"
-            urls.append(url)
+            return self._object_url(folder, source.file_name)
 
+        urls = self._map(upload, list(zip(sources, digests, upload_flags)), max_workers)
         return urls[0] if len(urls) == 1 else urls
 
+    def _upload_single_file_sync(
+        self,
+        boto_client,
+        source: UploadSource,
+        folder: str,
+        transfer_config: Union[S3TransferPolicy, "TransferConfig", None] = None,
+        digest: str = None,
+    ) -> None:
+        """
+        Stream a single UploadSource to S3 with the boto3 managed transfer.
+
+        :param boto_client: The shared boto3 client (see _get_boto_client).
+        :param source: UploadSource with file_name and content_type already resolved.
+        :param folder: S3 bucket name.
+        :param transfer_config: Per-call S3TransferPolicy or TransferConfig.
+        :param digest: SHA-256 of the content, stored as object metadata (dedup mode).
+        """
+        extra_args = {
+            "ContentType": source.content_type,
+            "ACL": "public-read",
+        }
+        if digest is not None:
+            extra_args["Metadata"] = {DIGEST_METADATA_KEY: digest}
+        config = self._get_transfer_config(source.size, transfer_config)
+        if source.path is not None:
+            # upload_file reads each part lazily from disk, while upload_fileobj
+            # buffers up to ~10 parts of a file object in memory.
+            boto_client.upload_file(
+                source.path, folder, source.file_name, ExtraArgs=extra_args, Config=config
+            )
+        else:
+            with source.open() as stream:
+                boto_client.upload_fileobj(
+                    stream, folder, source.file_name, ExtraArgs=extra_args, Config=config
+                )
+
     async def _upload_files_async(
         self,
-        files: Union[MediaFile, List[MediaFile]],
+        files: Union[MediaFile, UploadSource, List[Union[MediaFile, UploadSource]]],
         folder: str,
         *args,
         **kwargs,
     ) -> Union[str, List[str]]:
         """
-        Upload one or more MediaFile objects to S3 using true async I/O via aioboto3.
+        Upload one or more files to S3 using true async I/O via aioboto3.
 
         Design rationale vs the old asyncio.to_thread approach:
           - asyncio.to_thread offloads the synchronous boto3 call to a thread pool.
@@ -332,81 +461,247 @@ class S3Storage(FastCloud):
             during serialisation; each upload consumes an OS thread.
           - aioboto3 (backed by aiohttp + aiobotocore) performs genuine async I/O.
             All uploads share a single event loop with no thread overhead, and
-            asyncio.gather runs them concurrently within a single client context.
+            the scheduler runs them concurrently on the persistent client.
 
-        We deliberately prepare all files (CPU-bound: type coercion, byte
-        serialisation) BEFORE opening the async client so the heavy work doesn't
-        block inside the async context where we want pure I/O.
+        Content is streamed from each source while uploading; nothing is
+        read into memory up front.
 
-        :param files:  A single MediaFile or a list of MediaFile instances.
+        :param files:  A single file or a list of MediaFile / UploadSource instances.
         :param folder: The S3 bucket name.
         :return:       A single URL string when one file was uploaded, or a list of URLs.
         """
         if not isinstance(files, list):
             files = [files]
 
-        # --- Phase 1: prepare (CPU-bound, runs synchronously before async I/O) ---
-        # Normalise types, join chunked bytes, and resolve filenames up front.
-        # This keeps the async section below pure I/O with no heavy computation.
-        prepared: List[tuple] = []
-        for f in files:
-            if not isinstance(f, MediaFile):
-                f = MediaFile().from_any(f)
-
-            raw = f.to_bytes()
-            if isinstance(raw, (list, tuple)):
-                raw = b"".join(raw)
-
-            if not f.file_name or f.file_name in ("", "file"):
-                ext = f.extension
-                base = str(uuid.uuid4())
-                f.file_name = f"{base}.{ext}" if ext else base
-
-            prepared.append((f, raw))
+        client = await self._get_aioboto_client()
+        host = self.scheduler.host_of(self.endpoint_url)
+
+        # --- Phase 1: resolve sources and object keys ------------------------
+        # Without dedup this is cheap and no content is read. With dedup every source is
+        # hashed and the existence checks of the batch run concurrently.
+        if kwargs.get("dedup", self.dedup):
+            mark_phase("prepare")
+            hashed = await hash_sources_async(files)
+            mark_phase("network")
+            sources, digests = self._dedup_sources(hashed)
+            candidates = {source.file_name: digest for source, digest in zip(sources, digests)}
+            exists = await self.scheduler.gather(
+                [self._object_exists_async(client, folder, key, digest) for key, digest in candidates.items()],
+                host=host
+            )
+            existing = dict(zip(candidates, exists))
+            upload_flags = plan_dedup_uploads([source.file_name for source in sources], digests, existing)
+        else:
+            sources = [self._to_upload_source(f) for f in files]
+            digests = [None] * len(sources)
+            upload_flags = [True] * len(sources)
 
         # --- Phase 2: upload (true async I/O, all files concurrent) -------------
-        # Open a single aioboto3 client for the entire batch. The context manager
-        # guarantees the underlying aiohttp session is properly closed afterwards,
-        # even if one of the uploads raises an exception.
-        async with self._get_aioboto_client_context() as client:
-            tasks = [
-                self._upload_single_file_async(client, f, raw, folder)
-                for f, raw in prepared
-            ]
-            # gather() runs all uploads concurrently on the event loop.
-            urls = await asyncio.gather(*tasks)
-
-        return urls[0] if len(urls) == 1 else list(urls)
+        # All uploads share the storage's persistent client and its connection pool.
+        tasks = [
+            self._upload_single_file_async(client, source, folder, kwargs.get("transfer_config"), digest)
+            for source, digest, upload in zip(sources, digests, upload_flags) if upload
+        ]
+        # The scheduler runs the uploads concurrently, but never more than its
+        # configured number of requests at once.
+        await self.scheduler.gather(tasks, host=host)
+
+        urls = [self._object_url(folder, source.file_name) for source in sources]
+        return urls[0] if len(urls) == 1 else urls
 
     async def _upload_single_file_async(
         self,
         client,
-        f: MediaFile,
-        raw: bytes,
+        source: UploadSource,
         folder: str,
+        transfer_config: Union[S3TransferPolicy, "TransferConfig", None] = None,
+        digest: str = None,
     ) -> str:
         """
-        Upload a single pre-prepared MediaFile using an open aioboto3 client.
+        Stream a single UploadSource to S3 using an open aioboto3 client.
 
-        Kept as a small, focused coroutine so _upload_files_async can fan out
-        multiple of these with asyncio.gather cleanly.
+        Uses the same TransferConfig as the sync path (see _get_transfer_config):
+        objects below multipart_threshold go up with a single PutObject, larger
+        objects and streams of unknown size as a concurrent multipart upload.
 
-        :param client: Active aioboto3 S3 client (open async context manager).
-        :param f:      MediaFile with file_name and content_type already resolved.
-        :param raw:    File contents as a single bytes object.
+        :param client: Active aioboto3 S3 client (see _get_aioboto_client).
+        :param source: UploadSource with file_name and content_type already resolved.
         :param folder: S3 bucket name.
+        :param transfer_config: Per-call S3TransferPolicy or TransferConfig.
+        :param digest: SHA-256 of the content, stored as object metadata (dedup mode).
         :return:       Public URL of the uploaded object.
         """
-        await client.upload_fileobj(
-            io.BytesIO(raw),
-            folder,
-            f.file_name,
-            ExtraArgs={
-                "ContentType": f.content_type or "application/octet-stream",
-                "ACL": "public-read",
-            },
+        config = self._get_transfer_config(source.size, transfer_config)
+        metadata = {DIGEST_METADATA_KEY: digest} if digest is not None else {}
+
+        if source.size is not None and source.size < config.multipart_threshold:
+            # small object: a single request, content is at most multipart_threshold bytes
+            body = b"".join([chunk async for chunk in source.aiter_chunks()])
+            # botocore retries the request itself; the policy adds the deadline and hedging of slow PUTs
+            await self.retry_policy.acall(
+                client.put_object,
+                attempts=1,
+                hedge_key="s3.put" if self.retry_policy.should_hedge(len(body)) else None,
+                Bucket=folder,
+                Key=source.file_name,
+                Body=body,
+                ContentType=source.content_type,
+                ACL="public-read",
+                Metadata=metadata,
+            )
+        else:
+            await self._multipart_upload_async(client, source, folder, config, metadata)
+
+        return self._object_url(folder, source.file_name)
+
+    async def _multipart_upload_async(
+        self, client, source: UploadSource, folder: str, config: "TransferConfig", metadata: dict = None
+    ):
+        """
+        Upload a source as S3 multipart upload: CreateMultipartUpload, UploadPart for
+        every part (max_request_concurrency parts in flight, each taking a scheduler slot)
+        and CompleteMultipartUpload.
+
+        Parts are read just in time from the source, so at most
+        max_request_concurrency + 1 parts are held in memory. If any part fails the
+        multipart upload is aborted, so no orphaned parts are left behind (and billed).
+
+        :param client: Active aioboto3 S3 client.
+        :param source: The content to upload. Async iterators are supported without spooling.
+        :param folder: S3 bucket name.
+        :param config: TransferConfig providing multipart_chunksize and max_request_concurrency.
+        :param metadata: User metadata of the object.
+        """
+        key = source.file_name
+        metadata = metadata or {}
+        created = await client.create_multipart_upload(
+            Bucket=folder, Key=key, ContentType=source.content_type, ACL="public-read", Metadata=metadata
         )
-        return f"{self.endpoint_url.rstrip('/')}/{folder}/{f.file_name}"
+        upload_id = created["UploadId"]
+
+        async def numbered_parts():
+            part_number = 1
+            async for chunk in source.aiter_chunks(config.multipart_chunksize):
+                yield part_number, chunk
+                part_number += 1
+
+        async def upload_part(part):
+            part_number, data = part
+            response = await client.upload_part(
+                Bucket=folder, Key=key, PartNumber=part_number, UploadId=upload_id, Body=data
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+        try:
+            parts = await run_bounded(
+                numbered_parts(), upload_part, config.max_request_concurrency,
+                self.scheduler, self.scheduler.host_of(self.endpoint_url)
+            )
+            if not parts:
+                # empty stream: S3 needs at least one part, use a plain (empty) PutObject instead
+                await client.abort_multipart_upload(Bucket=folder, Key=key, UploadId=upload_id)
+                await client.put_object(
+                    Bucket=folder, Key=key, Body=b"", ContentType=source.content_type, ACL="public-read",
+                    Metadata=metadata
+                )
+                return
+            await client.complete_multipart_upload(
+                Bucket=folder, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            try:
+                await client.abort_multipart_upload(Bucket=folder, Key=key, UploadId=upload_id)
+            except Exception as e:
+                logging.warning(f"Failed to abort multipart upload {upload_id} of {key}: {e}")
+            raise
+
+    @staticmethod
+    def _to_upload_source(file: Union[MediaFile, UploadSource], digest: str = None) -> UploadSource:
+        """
+        Wrap a file into an UploadSource and determine its S3 object key.
+
+        UploadSource.from_any accepts MediaFiles as well as the raw bytes, file
+        paths or handles that FastCloud's get_processable_files() may hand us,
+        and streams all of them without an intermediate bytes copy.
+
+        MediaFile._file_info() guarantees file_name is never None — it always
+        falls back to the literal string "file". We treat "file" as "no
+        meaningful name" and generate a UUID instead.
+
+        Crucially we preserve the file extension (derived from the content type,
+        falling back to the filename suffix). Without this, files uploaded with a
+        UUID key would have NO extension and S3 would serve them as
+        application/octet-stream regardless of their actual type.
+
+        Examples:
+          VideoFile  -> content_type="video/mp4"  -> extension="mp4"  -> key="<uuid>.mp4"
+          ImageFile  -> content_type="image/png"  -> extension="png"  -> key="<uuid>.png"
+          MediaFile with file_name="report.pdf"   ->                     key="report.pdf"
+
+        In dedup mode the content digest replaces the UUID, so identical content
+        always maps to the same key:  key="<sha256>.png"
+        """
+        source = UploadSource.from_any(file)
+        if not source.file_name or source.file_name in ("", "file"):
+            if digest is not None:
+                source.file_name = digest_key(source, digest)
+            else:
+                ext = source.extension  # None when truly undetermined
+                base = str(uuid.uuid4())
+                source.file_name = f"{base}.{ext}" if ext else base
+        return source
+
+    def _dedup_sources(self, hashed: List[Tuple[UploadSource, str]]) -> Tuple[List[UploadSource], List[str]]:
+        """Resolve the keys of hashed (source, digest) pairs. Unnamed files are keyed by their digest."""
+        sources = [self._to_upload_source(source, digest) for source, digest in hashed]
+        return sources, [digest for _, digest in hashed]
+
+    @staticmethod
+    def _object_exists_sync(client, bucket: str, key: str, digest: str) -> bool:
+        """Cheap existence check (HeadObject): True if the object exists and holds the content with this digest."""
+        try:
+            response = client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return is_duplicate(key, digest, response.get("Metadata"))
+
+    @staticmethod
+    async def _object_exists_async(client, bucket: str, key: str, digest: str) -> bool:
+        """Async variant of _object_exists_sync."""
+        try:
+            response = await client.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return is_duplicate(key, digest, response.get("Metadata"))
+
+    def _get_transfer_config(
+        self,
+        size: Optional[int],
+        override: Union[S3TransferPolicy, "TransferConfig", None] = None,
+    ) -> "TransferConfig":
+        """
+        Resolve the boto3 TransferConfig for one object.
+
+        Precedence: per-call override > fixed self.transfer_config > self.transfer_policy.
+        Policies are evaluated for the object size, fixed TransferConfigs are used as is.
+
+        :param size:     Object size in bytes, None when unknown (streams).
+        :param override: Per-call S3TransferPolicy or TransferConfig.
+        """
+        config = override if override is not None else self.transfer_config
+        if config is None:
+            config = self.transfer_policy
+        if isinstance(config, S3TransferPolicy):
+            return config.transfer_config(size)
+        return config
+
+    def _object_url(self, bucket: str, key: str) -> str:
+        """Public URL of an object — mirrors how Azure returns blob_client.url (the key is URL-encoded)."""
+        return f"{self.endpoint_url.rstrip('/')}/{bucket}/{quote(key, safe='~/')}"
 
     # ------------------------------------------------------------------ #
     # Public upload interface (delegates type-dispatch to FastCloud)       #
@@ -463,46 +758,240 @@ class S3Storage(FastCloud):
     # Download                                                             #
     # ------------------------------------------------------------------ #
 
+    def _download_parts(self, size: int, **kwargs) -> Tuple[int, int]:
+        """
+        Part size and number of parallel ranges for downloading an object of size bytes.
+
+        Defaults come from the same TransferConfig as uploads: objects below
+        multipart_threshold are fetched with one request, larger ones in ranges of
+        multipart_chunksize with max_request_concurrency ranges in flight.
+        The kwargs part_size / part_concurrency override them per call.
+        """
+        config = self._get_transfer_config(size, kwargs.get("transfer_config"))
+        part_size = kwargs.get("part_size")
+        if part_size is None:
+            part_size = config.multipart_chunksize if size >= config.multipart_threshold else size
+        concurrency = kwargs.get("part_concurrency") or config.max_request_concurrency
+        return part_size, concurrency
+
+    def _first_range_size(self, **kwargs) -> int:
+        """
+        Bytes requested by the first GET of a download. Objects up to multipart_threshold are downloaded with this
+        single request; for larger objects its Content-Range reveals the size and the rest is fetched in ranges.
+        """
+        return kwargs.get("part_size") or self._get_transfer_config(None, kwargs.get("transfer_config")).multipart_threshold
+
+    @staticmethod
+    def _first_range(response: dict) -> Tuple[int, int]:
+        """(end of the first range, object size) from the response of the first GET."""
+        content_range = parse_content_range(response.get("ContentRange"))
+        if content_range is None:
+            # the whole object, e.g. an empty one
+            return response["ContentLength"] - 1, response["ContentLength"]
+        return content_range[1], content_range[2]
+
+    @staticmethod
+    def _is_invalid_range(error: "ClientError") -> bool:
+        """Ranges of empty objects are not satisfiable (416 InvalidRange)."""
+        return error.response.get("Error", {}).get("Code") in ("InvalidRange", "416")
+
+    @instrumented("download")
     def download(self, url: str, save_path: str = None, *args, **kwargs) -> Union[MediaFile, str, None]:
         """
         Download a blob from S3.
 
+        The first GET requests the first multipart_threshold bytes, so small objects take a single request.
+        The rest of large objects is fetched as concurrent ranged GETs pinned to the ETag of the first
+        response; every range is written into its slot of a preallocated buffer or file.
+
         :param url:       Full URL of the S3 object.
         :param save_path: Optional local path to write the file to.
                           When omitted the file is returned as a MediaFile in memory.
-        :return:          MediaFile (in-memory) or the save_path string, mirroring Azure.
+        :param part_size: (kwarg) Size of the byte ranges.
+        :param part_concurrency: (kwarg) Number of ranges fetched in parallel.
+        :param transfer_config: (kwarg) S3TransferPolicy or TransferConfig for this call.
+        :param mmap:      (kwarg) Download into a file (save_path or a temp file in temp_dir) and return a
+                          MediaFile memory-mapping it, instead of holding a copy in memory.
+        :return:          MediaFile (in-memory or memory-mapped) or the save_path string, mirroring Azure.
         """
-        boto_client = self._get_boto_client()
         bucket, key = self._parse_s3_url(url)
-
-        if save_path is None:
-            buffer = io.BytesIO()
-            boto_client.download_fileobj(bucket, key, buffer)
-            buffer.seek(0)
-            return MediaFile().from_any(buffer.read())
-
-        boto_client.download_file(bucket, key, save_path)
-        return save_path
-
+        # one attempt per request: the retry policy retries the first GET and each range
+        range_client = self._get_boto_client(sdk_retries=False)
+
+        def get_range(start: int, end: int, etag: str = None) -> dict:
+            conditions = {"IfMatch": etag} if etag else {}
+            try:
+                return range_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", **conditions)
+            except ClientError as e:
+                if start != 0 or not self._is_invalid_range(e):
+                    raise
+                return range_client.get_object(Bucket=bucket, Key=key, **conditions)
+
+        def chunks(response: dict):
+            body = response["Body"]
+            try:
+                yield from body.iter_chunks(self._DOWNLOAD_CHUNK_SIZE)
+            finally:
+                body.close()
+
+        first = self.retry_policy.call(get_range, 0, self._first_range_size(**kwargs) - 1)
+        first_end, size = self._first_range(first)
+        part_size, concurrency = self._download_parts(size, **kwargs)
+
+        def read_range(start: int, end: int):
+            return chunks(get_range(start, end, first["ETag"]))
+
+        first_range = (first_end, chunks(first))
+        if kwargs.get("mmap") or save_path is not None:
+            with download_target(save_path, kwargs.get("temp_dir")) as path:
+                download_ranges(size, read_range, part_size, concurrency, path, self.retry_policy, first_range)
+            if not kwargs.get("mmap"):
+                return save_path
+            mark_phase("parse")
+            return media_file_from_mmap(save_path or path, save_path is None, first.get("ContentType"), os.path.basename(key))
+
+        sink = download_ranges(size, read_range, part_size, concurrency, None, self.retry_policy, first_range)
+        mark_phase("parse")
+        return media_file_from_buffer(sink.buffer, first.get("ContentType"), os.path.basename(key))
+
+    @instrumented("download")
     async def download_async(self, url: str, save_path: str = None, *args, **kwargs) -> Union[MediaFile, str, None]:
         """
         Download an S3 object asynchronously using aioboto3.
 
+        Same ranged, parallel strategy and kwargs as download(). With a hedging retry policy the first GET
+        requests at most hedge_max_bytes, so small objects are fetched with a single, hedged request.
+
         :param url:       Full URL of the S3 object.
         :param save_path: Optional local path. When omitted returns a MediaFile.
         :return:          MediaFile (in-memory) or save_path string.
         """
         bucket, key = self._parse_s3_url(url)
+        range_client = await self._get_aioboto_client(sdk_retries=False)
+
+        async def get_range(start: int, end: int, etag: str = None) -> dict:
+            conditions = {"IfMatch": etag} if etag else {}
+            try:
+                return await range_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", **conditions)
+            except ClientError as e:
+                if start != 0 or not self._is_invalid_range(e):
+                    raise
+                return await range_client.get_object(Bucket=bucket, Key=key, **conditions)
+
+        async def chunks(response: dict):
+            body = response["Body"]
+            try:
+                async for chunk in body.iter_chunks(self._DOWNLOAD_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                body.close()
+
+        first_size = self._first_range_size(**kwargs)
+        if self.retry_policy.hedge:
+            first_size = min(first_size, self.retry_policy.hedge_max_bytes)
+        first = await self.retry_policy.acall(
+            get_range, 0, first_size - 1, hedge_key="s3.get" if self.retry_policy.should_hedge(first_size) else None
+        )
+        first_end, size = self._first_range(first)
+        part_size, concurrency = self._download_parts(size, **kwargs)
+        hedge_key = "s3.get" if self.retry_policy.should_hedge(size) else None
+
+        async def read_range(start: int, end: int):
+            async for chunk in chunks(await get_range(start, end, first["ETag"])):
+                yield chunk
+
+        first_range = (first_end, chunks(first))
+        if kwargs.get("mmap") or save_path is not None:
+            with download_target(save_path, kwargs.get("temp_dir")) as path:
+                await download_ranges_async(
+                    size, read_range, part_size, concurrency, path, self.retry_policy, hedge_key, first_range,
+                    scheduler=self.scheduler, host=self.scheduler.host_of(url)
+                )
+            if not kwargs.get("mmap"):
+                return save_path
+            mark_phase("parse")
+            return media_file_from_mmap(save_path or path, save_path is None, first.get("ContentType"), os.path.basename(key))
+
+        sink = await download_ranges_async(
+            size, read_range, part_size, concurrency, None, self.retry_policy, hedge_key, first_range,
+            scheduler=self.scheduler, host=self.scheduler.host_of(url)
+        )
+        mark_phase("parse")
+        return media_file_from_buffer(sink.buffer, first.get("ContentType"), os.path.basename(key))
+
+    @instrumented("iter_download")
+    def iter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> DownloadStream:
+        """
+        Stream an S3 object in chunks of chunk_size bytes with a single GET.
+
+        :param url:        Full URL of the S3 object.
+        :param chunk_size: Size of the yielded chunks.
+        :param if_none_match:     (kwarg) ETag — conditional GET, see DownloadStream.not_modified.
+        :param if_modified_since: (kwarg) HTTP date — conditional GET if no ETag is known.
+        :return:           DownloadStream with content_length / content_type / etag taken from the response headers.
+        """
+        bucket, key = self._parse_s3_url(url)
+        try:
+            response = self._get_boto_client().get_object(Bucket=bucket, Key=key, **self._conditional_params(kwargs))
+        except ClientError as e:
+            if self._is_not_modified(e):
+                return DownloadStream([], etag=kwargs.get("if_none_match"), not_modified=True)
+            raise
+        return DownloadStream(
+            response["Body"].iter_chunks(chunk_size),
+            chunk_size=chunk_size,
+            on_close=response["Body"].close,
+            **self._stream_metadata(response),
+        )
 
-        async with self._get_aioboto_client_context() as client:
-            if save_path is None:
-                buffer = io.BytesIO()
-                await client.download_fileobj(bucket, key, buffer)
-                buffer.seek(0)
-                return MediaFile().from_any(buffer.read())
+    @instrumented("iter_download")
+    async def aiter_download(self, url: str, chunk_size: int = DEFAULT_CHUNK_SIZE, *args, **kwargs) -> AsyncDownloadStream:
+        """
+        Async variant of iter_download on the persistent aioboto3 client.
 
-            await client.download_file(bucket, key, save_path)
-            return save_path
+        :return: AsyncDownloadStream — consume it with `async for`.
+        """
+        bucket, key = self._parse_s3_url(url)
+        client = await self._get_aioboto_client()
+        try:
+            response = await client.get_object(Bucket=bucket, Key=key, **self._conditional_params(kwargs))
+        except ClientError as e:
+            if self._is_not_modified(e):
+                return AsyncDownloadStream([], etag=kwargs.get("if_none_match"), not_modified=True)
+            raise
+        return AsyncDownloadStream(
+            response["Body"].iter_chunks(chunk_size),
+            chunk_size=chunk_size,
+            on_close=response["Body"].close,
+            **self._stream_metadata(response),
+        )
+
+    @staticmethod
+    def _conditional_params(kwargs: dict) -> dict:
+        """GetObject parameters for the conditional download kwargs of iter_download."""
+        if kwargs.get("if_none_match"):
+            return {"IfNoneMatch": kwargs["if_none_match"]}
+        if kwargs.get("if_modified_since"):
+            return {"IfModifiedSince": parsedate_to_datetime(kwargs["if_modified_since"])}
+        return {}
+
+    @staticmethod
+    def _is_not_modified(error: "ClientError") -> bool:
+        """botocore raises a ClientError with code 304 for conditional GETs of unchanged objects."""
+        code = str(error.response.get("Error", {}).get("Code"))
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return code in ("304", "NotModified") or status == 304
+
+    @staticmethod
+    def _stream_metadata(response: dict) -> dict:
+        """Content length / type and validators of a GetObject response."""
+        last_modified = response.get("LastModified")
+        return {
+            "content_length": response.get("ContentLength"),
+            "content_type": response.get("ContentType"),
+            "etag": response.get("ETag"),
+            "last_modified": format_datetime(last_modified.astimezone(timezone.utc), usegmt=True) if last_modified else None,
+        }
 
     # ------------------------------------------------------------------ #
     # Delete                                                               #
@@ -535,8 +1024,8 @@ class S3Storage(FastCloud):
         """
         try:
             bucket, key = self._parse_s3_url(url)
-            async with self._get_aioboto_client_context() as client:
-                await client.delete_object(Bucket=bucket, Key=key)
+            client = await self._get_aioboto_client()
+            await client.delete_object(Bucket=bucket, Key=key)
             return True
         except ClientError as e:
             print(f"ClientError deleting {url}: {e}")
@@ -545,12 +1034,55 @@ class S3Storage(FastCloud):
             print(f"Unexpected error deleting {url}: {e}")
             return False
 
+    def _delete_batch_sync(self, bucket: str, keys: List[str]) -> Set[Tuple[str, str]]:
+        """
+        Delete up to MAX_DELETE_BATCH_SIZE keys of one bucket with a single DeleteObjects request.
+
+        :return: The (bucket, key) pairs which were deleted.
+        """
+        try:
+            response = self._get_boto_client().delete_objects(
+                Bucket=bucket, Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+            )
+        except Exception as e:
+            logger.warning("Deleting %d objects from %s failed: %s", len(keys), bucket, e)
+            note_failure(e, len(keys))
+            return set()
+        return self._deleted_from_response(bucket, keys, response)
+
+    async def _delete_batch_async(self, client, bucket: str, keys: List[str]) -> Set[Tuple[str, str]]:
+        """Async variant of _delete_batch_sync."""
+        try:
+            response = await client.delete_objects(
+                Bucket=bucket, Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+            )
+        except Exception as e:
+            logger.warning("Deleting %d objects from %s failed: %s", len(keys), bucket, e)
+            note_failure(e, len(keys))
+            return set()
+        return self._deleted_from_response(bucket, keys, response)
+
+    @staticmethod
+    def _deleted_from_response(bucket: str, keys: List[str], response: dict) -> Set[Tuple[str, str]]:
+        """In quiet mode DeleteObjects only reports the keys which could not be deleted."""
+        errors = response.get("Errors", [])
+        if errors:
+            logger.warning("Failed to delete %d objects from %s, e.g. %s", len(errors), bucket, errors[0])
+            note_failure(objects=len(errors))
+        failed = {error["Key"] for error in errors}
+        return {(bucket, key) for key in keys if key not in failed}
+
+    @instrumented("delete")
     def delete(self, url: Union[str, List[str]], *args, **kwargs) -> Union[bool, List[bool]]:
         """
         Delete one or more S3 objects synchronously.
 
+        Lists are grouped by bucket and deleted with DeleteObjects requests of up
+        to MAX_DELETE_BATCH_SIZE keys each, instead of one request per object.
+
         :param url: A single URL or a list of URLs to delete.
-        :return:    bool for a single URL, List[bool] for a list — same shape as input.
+        :param max_workers: (kwarg) Send the batch requests from this many threads. Defaults to self.max_workers.
+        :return:    bool for a single URL, List[bool] for a list — one result per URL, in input order.
         """
         if not url:
             return False
@@ -559,17 +1091,21 @@ class S3Storage(FastCloud):
             return self._delete_single_blob_sync(url)
 
         if isinstance(url, list):
-            # Deduplicate to avoid double-deleting the same object (mirrors Azure).
-            return [self._delete_single_blob_sync(u) for u in set(url)]
+            batches, targets = plan_delete_batches(url, self._parse_s3_url, self.MAX_DELETE_BATCH_SIZE)
+            deleted = set()
+            for batch_deleted in self._map(lambda batch: self._delete_batch_sync(*batch), batches, kwargs.get("max_workers")):
+                deleted |= batch_deleted
+            return delete_results(targets, deleted)
 
         return False
 
+    @instrumented("delete")
     async def delete_async(self, url: Union[str, List[str]], *args, **kwargs) -> Union[bool, List[bool]]:
         """
         Delete one or more S3 objects asynchronously.
 
-        Uses asyncio.gather so all deletions run concurrently, matching the
-        parallel behaviour in AzureBlobStorage.delete_async.
+        Lists are grouped into DeleteObjects batches (see delete) which run
+        concurrently through the scheduler.
         """
         if not url:
             return False
@@ -578,11 +1114,74 @@ class S3Storage(FastCloud):
             return await self._delete_single_blob_async(url)
 
         if isinstance(url, list):
-            tasks = [self._delete_single_blob_async(u) for u in set(url)]
-            return list(await asyncio.gather(*tasks))
+            batches, targets = plan_delete_batches(url, self._parse_s3_url, self.MAX_DELETE_BATCH_SIZE)
+            deleted = set()
+            if batches:
+                client = await self._get_aioboto_client()
+                tasks = [self._delete_batch_async(client, bucket, keys) for bucket, keys in batches]
+                for batch_deleted in await self.scheduler.gather(tasks, host=self.scheduler.host_of(self.endpoint_url)):
+                    deleted |= batch_deleted
+            return delete_results(targets, deleted)
 
         return False
 
+    # ------------------------------------------------------------------ #
+    # Presigned links                                                      #
+    # ------------------------------------------------------------------ #
+
+    def _get_presigner(self) -> SigV4Presigner:
+        if self._presigner is None:
+            if not all([self.endpoint_url, self.access_key_id, self.secret_access_key]):
+                raise ValueError("endpoint_url, access_key_id, and access_key_secret are all required.")
+            self._presigner = SigV4Presigner(
+                self.endpoint_url, self.access_key_id, self.secret_access_key,
+                self._extract_region_from_url(self.endpoint_url)
+            )
+        return self._presigner
+
+    def create_temporary_upload_link(
+        self, time_limit: int = 20, folder: str = None, file_name: str = None, **kwargs
+    ) -> str:
+        """
+        Generate a presigned PUT URL for one object. See create_temporary_upload_links.
+
+        :param time_limit: Minutes the link stays valid.
+        :param folder:     S3 bucket name (required).
+        :param file_name:  Object key. A random UUID if None.
+        """
+        return self.create_temporary_upload_links([file_name or str(uuid.uuid4())], folder=folder, time_limit=time_limit)[0]
+
+    def create_temporary_upload_links(
+        self, file_names: Union[int, List[str]], time_limit: int = 20, folder: str = None, **kwargs
+    ) -> List[str]:
+        """
+        Generate presigned PUT URLs for many objects in one call, e.g. for direct uploads from a frontend.
+
+        The URLs are signed offline (SigV4 query auth) with a cached signing key: no request to S3 and
+        no botocore client is involved, so thousands of links take milliseconds.
+        Upload with a plain `PUT <url>` and the file as body.
+
+        :param file_names: Object keys, or the number of links to create with random UUID keys.
+        :param time_limit: Minutes the links stay valid (at most 7 days).
+        :param folder:     S3 bucket name (required).
+        :return:           The presigned URLs in the order of file_names.
+        """
+        if folder is None:
+            raise ValueError("folder (bucket name) must be provided for S3 upload links.")
+        if isinstance(file_names, int):
+            file_names = [str(uuid.uuid4()) for _ in range(file_names)]
+        return self._get_presigner().presign("PUT", ((folder, key) for key in file_names), time_limit * 60)
+
+    def create_temporary_download_links(self, urls: List[str], time_limit: int = 20, **kwargs) -> List[str]:
+        """
+        Generate presigned GET URLs for many objects in one call. Signed offline like create_temporary_upload_links.
+
+        :param urls:       Object URLs as returned by upload.
+        :param time_limit: Minutes the links stay valid (at most 7 days).
+        :return:           The presigned URLs in the order of urls.
+        """
+        return self._get_presigner().presign("GET", (self._parse_s3_url(url) for url in urls), time_limit * 60)
+
     # ------------------------------------------------------------------ #
     # Helpers                                                              #
     # ------------------------------------------------------------------ #
@@ -608,7 +1207,8 @@ class S3Storage(FastCloud):
         maintainers don't accidentally "fix" the working behaviour.
 
         Presigned URLs may carry a query string (?X-Amz-Signature=...) which
-        is stripped before returning the key.
+        is stripped before returning the key. The key is URL-decoded, so keys
+        with spaces or "%" address the stored object and not its encoding.
 
         :raises ValueError: When bucket or key cannot be extracted.
         """
@@ -625,7 +1225,7 @@ class S3Storage(FastCloud):
 
         bucket = path_parts[0]
         # Strip query string that presigned URLs append after the key.
-        key = path_parts[1].split("?")[0]
+        key = unquote(path_parts[1].split("?")[0])
         return bucket, key
 
     @staticmethod
@@ -0,0 +1,119 @@
+import math
+from typing import Optional
+
+try:
+    from boto3.s3.transfer import TransferConfig
+except ImportError:
+    pass
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+
+class S3TransferPolicy:
+    """
+    Picks the S3 transfer strategy per object instead of one fixed TransferConfig.
+
+    For every object it decides
+      - single PUT vs multipart upload (multipart_threshold),
+      - the part size: at least min_part_size, large enough to stay below S3's 10,000 part limit and, if a
+        bandwidth budget is given, large enough that a part takes ~target_part_seconds on one connection,
+      - the part concurrency: at most max_concurrency, never more than there are parts and never more parts in
+        flight than fit into memory_budget.
+
+    Usage:
+        storage = S3Storage(..., transfer_policy=S3TransferPolicy(memory_budget=512 * MB, bandwidth=200 * MB))
+        storage.upload(file, folder="bucket", transfer_config=S3TransferPolicy(max_concurrency=32))  # per call
+    """
+
+    # S3 limits: https://docs.aws.amazon.com/AmazonS3/latest/userguide/qfacts.html
+    MIN_PART_SIZE = 5 * MB
+    MAX_PART_SIZE = 5 * GB
+    MAX_PARTS = 10000
+
+    def __init__(
+            self,
+            multipart_threshold: int = 16 * MB,
+            min_part_size: int = 8 * MB,
+            max_concurrency: int = 10,
+            memory_budget: int = 256 * MB,
+            bandwidth: Optional[int] = None,
+            target_part_seconds: float = 2.0,
+            unknown_size_part_size: int = 16 * MB,
+    ):
+        """
+        :param multipart_threshold: Objects up to this size are uploaded with a single PUT.
+        :param min_part_size: Smallest part size used for multipart transfers (S3 minimum is 5 MB).
+        :param max_concurrency: Maximum number of parts of one object transferred in parallel.
+        :param memory_budget: Upper bound for part_size * concurrency, i.e. the bytes buffered per object.
+        :param bandwidth: Bandwidth budget in bytes per second. Used to size parts and passed to boto3 as
+            max_bandwidth. None means unlimited.
+        :param target_part_seconds: With a bandwidth budget, parts are sized to take about this long on a single
+            connection, which amortises the per-request overhead.
+        :param unknown_size_part_size: Part size for streams of unknown length (allows up to ~160 GB by default).
+        """
+        self.multipart_threshold = multipart_threshold
+        self.min_part_size = max(min_part_size, self.MIN_PART_SIZE)
+        self.max_concurrency = max(1, max_concurrency)
+        self.memory_budget = memory_budget
+        self.bandwidth = bandwidth
+        self.target_part_seconds = target_part_seconds
+        self.unknown_size_part_size = max(unknown_size_part_size, self.min_part_size)
+
+    def use_multipart(self, size: Optional[int]) -> bool:
+        """Multipart is used for objects above the threshold and for streams of unknown size."""
+        return size is None or size > self.multipart_threshold
+
+    def part_size_for(self, size: Optional[int]) -> int:
+        """Part size in bytes, rounded up to whole MB."""
+        if size is None:
+            return self.unknown_size_part_size
+
+        part_size = max(self.min_part_size, math.ceil(size / self.MAX_PARTS))
+
+        if self.bandwidth:
+            # each of the parallel connections gets bandwidth / concurrency
+            per_connection = self.bandwidth / self.max_concurrency
+            part_size = max(part_size, int(per_connection * self.target_part_seconds))
+            # ...but keep enough parts to actually use all connections
+            part_size = min(part_size, max(self.min_part_size, math.ceil(size / self.max_concurrency)))
+
+        part_size = min(part_size, self.MAX_PART_SIZE)
+        return math.ceil(part_size / MB) * MB
+
+    def concurrency_for(self, size: Optional[int], part_size: int) -> int:
+        """Number of parts transferred in parallel."""
+        concurrency = self.max_concurrency
+        if size is not None:
+            concurrency = min(concurrency, math.ceil(size / part_size))
+        if self.memory_budget:
+            concurrency = min(concurrency, self.memory_budget // part_size)
+        return max(1, concurrency)
+
+    def transfer_config(self, size: Optional[int] = None) -> "TransferConfig":
+        """Build the boto3 TransferConfig for an object of the given size (None = unknown)."""
+        kwargs = {"use_threads": True}
+        if self.bandwidth:
+            kwargs["max_bandwidth"] = int(self.bandwidth)
+
+        if not self.use_multipart(size):
+            return TransferConfig(
+                multipart_threshold=max(self.multipart_threshold, (size or 0) + 1),
+                multipart_chunksize=self.min_part_size,
+                max_concurrency=1,
+                **kwargs
+            )
+
+        part_size = self.part_size_for(size)
+        return TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=part_size,
+            max_concurrency=self.concurrency_for(size, part_size),
+            **kwargs
+        )
+
+    def __repr__(self):
+        return (
+            f"S3TransferPolicy(multipart_threshold={self.multipart_threshold}, min_part_size={self.min_part_size}, "
+            f"max_concurrency={self.max_concurrency}, memory_budget={self.memory_budget}, bandwidth={self.bandwidth})"
+        )
@@ -0,0 +1,505 @@
+import asyncio
+import inspect
+import io
+import mimetypes
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Union, Optional, Iterable, Iterator, AsyncIterable, AsyncIterator, BinaryIO, Any, Callable
+
+from media_toolkit import MediaFile, media_from_any
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024 * 4  # 4 MB
+_SPOOL_MAX_MEMORY = 1024 * 1024 * 8  # spooled sources switch to a temp file above 8 MB
+
+
+class _MemoryViewReader(io.RawIOBase):
+    """Seekable, read-only file object over a memoryview. Lets us stream in-memory MediaFiles without a copy."""
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view.cast("B") if view.format != "B" else view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        self._pos = max(self._pos, 0)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        # release the buffer export so the underlying BytesIO can be resized again
+        self._view.release()
+        super().close()
+
+
+class _IteratorReader(io.RawIOBase):
+    """Non-seekable file object that reads from an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._leftover = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._leftover:
+            try:
+                self._leftover = bytes(next(self._chunks))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._leftover))
+        b[:n] = self._leftover[:n]
+        self._leftover = self._leftover[n:]
+        return n
+
+
+class UploadSource:
+    """
+    A file to upload which is read lazily in chunks instead of being loaded into memory.
+
+    Wraps a file path, an open binary file object, an (async) iterator of byte chunks, bytes or a MediaFile.
+    Providers read the data through open() / iter_chunks() / aiter_chunks(), so peak memory is bounded by the
+    chunk size rather than by the file size.
+    """
+
+    def __init__(
+            self,
+            data: Union[str, os.PathLike, BinaryIO, Iterable[bytes], AsyncIterator[bytes], bytes, MediaFile],
+            file_name: str = None,
+            content_type: str = None,
+            size: int = None
+    ):
+        """
+        :param data: The content to upload.
+        :param file_name: Name of the file. Defaults to the basename of the path / file object if available.
+        :param content_type: Mime type. Guessed from the file name if not given.
+        :param size: Size in bytes. Required to upload iterators of unknown length to providers which need a
+            Content-Length; otherwise the iterator is spooled to a temporary file first.
+        """
+        self.path = None
+        self.fileobj = None
+        self.chunks = None
+        self.media_file = None
+        self.data = None
+        # start position of a seekable file object, to rewind it for a retry
+        self._start = None
+
+        if isinstance(data, os.PathLike):
+            data = os.fspath(data)
+
+        if isinstance(data, str) and not os.path.isfile(data):
+            # urls, base64 etc. are resolved by media-toolkit
+            data = media_from_any(data)
+
+        if isinstance(data, str):
+            self.path = data
+            file_name = file_name or os.path.basename(data)
+            size = size if size is not None else os.path.getsize(data)
+        elif isinstance(data, MediaFile):
+            self.media_file = data
+            file_name = file_name or data.file_name
+            content_type = content_type or data.content_type
+            size = size if size is not None else self._media_file_size(data)
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            self.data = data
+            size = size if size is not None else memoryview(data).nbytes
+        elif hasattr(data, "read"):
+            self.fileobj = data
+            name = getattr(data, "name", None)
+            if file_name is None and isinstance(name, str):
+                file_name = os.path.basename(name)
+            if size is None:
+                size = self._remaining_size(data)
+            try:
+                if data.seekable():
+                    self._start = data.tell()
+            except (OSError, ValueError, AttributeError):
+                pass
+        elif hasattr(data, "__aiter__") or hasattr(data, "__iter__"):
+            self.chunks = data
+        else:
+            raise ValueError(f"Cannot stream data of type {type(data)}")
+
+        self.file_name = file_name
+        if content_type is None and file_name:
+            content_type = mimetypes.guess_type(file_name)[0]
+        self.content_type = content_type or "application/octet-stream"
+        self.size = size
+
+    @staticmethod
+    def is_streamable(data: Any) -> bool:
+        """
+        Check if data can be uploaded as a stream without converting it to a MediaFile first.
+        True for existing file paths, open binary file objects and (async) iterators of byte chunks.
+        """
+        if isinstance(data, UploadSource):
+            return True
+        if isinstance(data, os.PathLike):
+            return os.path.isfile(os.fspath(data))
+        if isinstance(data, str):
+            return os.path.isfile(data)
+        if isinstance(data, (bytes, bytearray, memoryview, dict, list, tuple, MediaFile)):
+            return False
+        if hasattr(data, "read"):
+            return True
+        if hasattr(data, "__aiter__") or hasattr(data, "__next__"):
+            return True
+        return False
+
+    @classmethod
+    def from_any(cls, data: Any) -> "UploadSource":
+        """Wrap data into an UploadSource. UploadSources are returned as is."""
+        if isinstance(data, UploadSource):
+            return data
+        return cls(data)
+
+    @staticmethod
+    def _media_file_size(media_file: MediaFile) -> int:
+        """Size of a MediaFile without reading temp file backed content into memory."""
+        temp_file_path = getattr(media_file._content_buffer, "name", None)
+        if temp_file_path:
+            return os.path.getsize(temp_file_path)
+        return media_file.file_size()
+
+    @staticmethod
+    def _remaining_size(fileobj) -> Optional[int]:
+        """Number of bytes left in a seekable file object, or None if it cannot be determined."""
+        try:
+            if hasattr(fileobj, "fileno"):
+                return os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+        except (OSError, io.UnsupportedOperation, AttributeError):
+            pass
+        try:
+            if fileobj.seekable():
+                pos = fileobj.tell()
+                end = fileobj.seek(0, io.SEEK_END)
+                fileobj.seek(pos)
+                return end - pos
+        except (OSError, io.UnsupportedOperation, AttributeError):
+            pass
+        return None
+
+    @property
+    def extension(self) -> Optional[str]:
+        """File extension without dot, derived from the content type or the file name."""
+        if self.media_file is not None and self.media_file.extension:
+            return self.media_file.extension
+        if self.content_type and self.content_type != "application/octet-stream":
+            ext = mimetypes.guess_extension(self.content_type)
+            if ext:
+                return ext.lstrip(".")
+        if self.file_name and "." in self.file_name:
+            return self.file_name.rsplit(".", 1)[-1].lower()
+        return None
+
+    @property
+    def reopenable(self) -> bool:
+        """True if every open() reads the content from the start independently (paths, bytes, MediaFiles)."""
+        return self.path is not None or self.data is not None or self.media_file is not None
+
+    @property
+    def replayable(self) -> bool:
+        """True if the source can be read again after a failed upload: reopenable, or a seekable file object."""
+        return self.reopenable or self._start is not None
+
+    def rewind(self):
+        """Seek a file object source back to where the upload started. No-op for all other sources."""
+        if self._start is not None:
+            self.fileobj.seek(self._start)
+
+    @property
+    def is_async_iterator(self) -> bool:
+        return self.chunks is not None and hasattr(self.chunks, "__aiter__")
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        """
+        Open the source as a readable binary file object.
+        File paths are opened (and closed again), file objects are returned as is and not closed.
+        """
+        if self.path is not None:
+            with open(self.path, "rb") as f:
+                yield f
+        elif self.media_file is not None:
+            f = self._open_media_file()
+            try:
+                yield f
+            finally:
+                f.close()
+        elif self.data is not None:
+            f = _MemoryViewReader(memoryview(self.data))
+            try:
+                yield f
+            finally:
+                f.close()
+        elif self.fileobj is not None:
+            yield self.fileobj
+        elif self.is_async_iterator:
+            raise TypeError("Async iterators can only be uploaded with the async upload methods.")
+        else:
+            yield _IteratorReader(self.chunks)
+
+    def _open_media_file(self) -> BinaryIO:
+        buffer = self.media_file._content_buffer
+        if getattr(buffer, "name", None):
+            # temp file backed MediaFile: stream from disk
+            return open(buffer.name, "rb")
+        try:
+            return _MemoryViewReader(buffer.getbuffer())
+        except (AttributeError, TypeError, ValueError):
+            return io.BytesIO(self.media_file.read())
+
+    @staticmethod
+    def _read_full(f: BinaryIO, size: int) -> bytes:
+        """Read size bytes from f. Only returns less at the end of the stream (raw streams may return short reads)."""
+        chunk = f.read(size)
+        if not chunk or len(chunk) == size:
+            return chunk
+        parts = [chunk]
+        remaining = size - len(chunk)
+        while remaining > 0:
+            part = f.read(remaining)
+            if not part:
+                break
+            parts.append(part)
+            remaining -= len(part)
+        return b"".join(parts)
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Read the source in chunks of chunk_size bytes. Only the last chunk may be shorter."""
+        with self.open() as f:
+            while True:
+                chunk = self._read_full(f, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    async def aiter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """
+        Read the source in chunks of chunk_size bytes asynchronously. Only the last chunk may be shorter.
+        Disk reads run in the default executor.
+        """
+        if self.is_async_iterator:
+            buffer = bytearray()
+            async for chunk in self.chunks:
+                buffer += chunk
+                while len(buffer) >= chunk_size:
+                    yield bytes(buffer[:chunk_size])
+                    del buffer[:chunk_size]
+            if buffer:
+                yield bytes(buffer)
+            return
+
+        loop = asyncio.get_running_loop()
+        with self.open() as f:
+            offload = self.path is not None or isinstance(f, io.BufferedReader)
+            while True:
+                if offload:
+                    chunk = await loop.run_in_executor(None, self._read_full, f, chunk_size)
+                else:
+                    chunk = self._read_full(f, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def spool(self) -> "UploadSource":
+        """
+        Return a seekable copy of a source with unknown size (iterators, pipes) backed by a temporary file.
+        Sources that already know their size are returned unchanged.
+        """
+        if self.size is not None:
+            return self
+        spooled = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+        for chunk in self.iter_chunks():
+            spooled.write(chunk)
+        size = spooled.tell()
+        spooled.seek(0)
+        return UploadSource(spooled, file_name=self.file_name, content_type=self.content_type, size=size)
+
+    async def spool_async(self) -> "UploadSource":
+        """Async variant of spool() which also supports async iterators."""
+        if self.size is not None:
+            return self
+        spooled = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+        async for chunk in self.aiter_chunks():
+            spooled.write(chunk)
+        size = spooled.tell()
+        spooled.seek(0)
+        return UploadSource(spooled, file_name=self.file_name, content_type=self.content_type, size=size)
+
+    def __repr__(self):
+        return f"UploadSource(file_name={self.file_name!r}, content_type={self.content_type!r}, size={self.size})"
+
+
+class DownloadStream:
+    """
+    A download which is consumed chunk by chunk instead of being buffered as a whole.
+    Content length and type are known before the first chunk is read, e.g. to set the headers of an HTTP response.
+
+    Usage:
+        with storage.iter_download(url) as stream:
+            print(stream.content_length, stream.content_type)
+            for chunk in stream:
+                out.write(chunk)
+    """
+
+    def __init__(
+            self,
+            chunks: Iterable[bytes],
+            content_length: Optional[int] = None,
+            content_type: Optional[str] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            on_close: Callable[[], Any] = None,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+            not_modified: bool = False
+    ):
+        """
+        :param chunks: The provider's chunks. They are re-chunked to chunk_size.
+        :param content_length: Size of the object in bytes, None if unknown.
+        :param content_type: Mime type of the object.
+        :param chunk_size: Size of the yielded chunks. Only the last chunk may be shorter.
+        :param on_close: Called once when the stream is closed or exhausted, e.g. to release the connection.
+        :param etag: ETag of the object, if the provider returned one.
+        :param last_modified: Last-Modified of the object as HTTP date, if the provider returned one.
+        :param not_modified: True if a conditional request (if_none_match / if_modified_since) found the object
+            unchanged. The stream has no content then.
+        """
+        self._chunks = chunks
+        self.content_length = content_length
+        self.content_type = content_type
+        self.chunk_size = chunk_size
+        self._on_close = on_close
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+        self.closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self.not_modified:
+            return
+        try:
+            buffer = bytearray()
+            for chunk in self._chunks:
+                buffer += chunk
+                while len(buffer) >= self.chunk_size:
+                    yield bytes(buffer[:self.chunk_size])
+                    del buffer[:self.chunk_size]
+            if buffer:
+                yield bytes(buffer)
+        finally:
+            self.close()
+
+    def read(self) -> bytes:
+        """Read the remaining content at once."""
+        return b"".join(self)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._on_close is not None:
+            self._on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return (
+            f"DownloadStream(content_length={self.content_length}, content_type={self.content_type!r}, "
+            f"etag={self.etag!r}, not_modified={self.not_modified})"
+        )
+
+
+class AsyncDownloadStream(DownloadStream):
+    """
+    Async variant of DownloadStream. on_close may be a coroutine function.
+
+    Usage:
+        async with await storage.aiter_download(url) as stream:
+            async for chunk in stream:
+                await out.write(chunk)
+    """
+
+    def __init__(
+            self,
+            chunks: AsyncIterable[bytes],
+            content_length: Optional[int] = None,
+            content_type: Optional[str] = None,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            on_close: Callable[[], Any] = None,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+            not_modified: bool = False
+    ):
+        super().__init__(chunks, content_length, content_type, chunk_size, on_close, etag, last_modified, not_modified)
+
+    def __iter__(self):
+        raise TypeError("Use 'async for' to read an AsyncDownloadStream.")
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if self.not_modified:
+            return
+        try:
+            buffer = bytearray()
+            async for chunk in self._chunks:
+                buffer += chunk
+                while len(buffer) >= self.chunk_size:
+                    yield bytes(buffer[:self.chunk_size])
+                    del buffer[:self.chunk_size]
+            if buffer:
+                yield bytes(buffer)
+        finally:
+            await self.aclose()
+
+    async def read(self) -> bytes:
+        """Read the remaining content at once."""
+        return b"".join([chunk async for chunk in self])
+
+    async def aclose(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._on_close is not None:
+            result = self._on_close()
+            if inspect.isawaitable(result):
+                await result
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    def __repr__(self):
+        return (
+            f"AsyncDownloadStream(content_length={self.content_length}, content_type={self.content_type!r}, "
+            f"etag={self.etag!r}, not_modified={self.not_modified})"
+        )
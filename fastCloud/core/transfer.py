@@ -0,0 +1,313 @@
+import asyncio
+import contextvars
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional, Union, Iterable, AsyncIterable, Callable, Awaitable, Any
+
+from fastCloud.core.retry import RetryPolicy
+from fastCloud.core.scheduler import ConcurrencyScheduler
+
+
+def split_ranges(size: int, part_size: int, offset: int = 0) -> List[Tuple[int, int]]:
+    """
+    Split an object of size bytes, from offset on, into consecutive byte ranges of at most part_size bytes.
+    :return: List of (start, end) tuples with inclusive end, as used by HTTP Range headers.
+    """
+    if size <= offset:
+        return []
+    part_size = max(1, part_size)
+    return [(start, min(start + part_size, size) - 1) for start in range(offset, size, part_size)]
+
+
+def parse_content_range(content_range: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """
+    Parse a Content-Range header like "bytes 0-99/1234".
+    :return: (start, end, total size) or None if the header is missing or the size is unknown ("*").
+    """
+    if not content_range:
+        return None
+    try:
+        byte_range, total = content_range.split(" ")[-1].split("/")
+        start, end = byte_range.split("-")
+        return int(start), int(end), int(total)
+    except ValueError:
+        return None
+
+
+class RangeSink:
+    """
+    Preallocated target for ranged downloads. Each range is written into its own slot of an in-memory buffer or
+    of a file, so parts can arrive in any order and are never concatenated afterwards.
+    The in-memory buffer is a BytesIO, which a MediaFile can adopt without copying (see media_file_from_buffer).
+    Writes from several threads or tasks are safe as long as their ranges don't overlap.
+    """
+
+    def __init__(self, size: int, path: Optional[str] = None):
+        """
+        :param size: Total size of the object in bytes.
+        :param path: Write into this file (created / truncated to size). If None, an in-memory BytesIO is used.
+        """
+        self.size = size
+        self.path = path
+        self._buffer = None
+        self._view = None
+        self._file = None
+        self._lock = threading.Lock()
+        if path is None:
+            self._buffer = io.BytesIO()
+            if size > 0:
+                # writing the last byte allocates the whole (zero-filled) buffer once
+                self._buffer.seek(size - 1)
+                self._buffer.write(b"\0")
+                self._buffer.seek(0)
+            # writable view for the slots; released on close, so the BytesIO can be used normally afterwards
+            self._view = self._buffer.getbuffer()
+        else:
+            self._file = open(path, "wb+")
+            self._file.truncate(size)
+
+    def write_at(self, offset: int, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Write data at the given byte offset."""
+        if self._buffer is not None:
+            view = memoryview(data)
+            self._view[offset:offset + view.nbytes] = view
+            return
+
+        if hasattr(os, "pwrite"):
+            view = memoryview(data)
+            fd = self._file.fileno()
+            while view.nbytes:
+                written = os.pwrite(fd, view, offset)
+                view = view[written:]
+                offset += written
+            return
+
+        # no positional writes (Windows): serialise seek + write
+        with self._lock:
+            self._file.seek(offset)
+            self._file.write(data)
+
+    @property
+    def buffer(self) -> Optional[io.BytesIO]:
+        """The in-memory buffer, None for file targets. Only usable after close()."""
+        return self._buffer
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+async def run_bounded(
+        items: Union[Iterable, AsyncIterable],
+        func: Callable[[Any], Awaitable],
+        limit: int,
+        scheduler: ConcurrencyScheduler = None,
+        host: Optional[str] = None
+) -> list:
+    """
+    Run func(item) for every item with at most limit calls in flight. Items are pulled lazily, so for an iterator of
+    chunks at most limit + 1 chunks are held in memory. If one call fails the remaining calls are cancelled and the
+    exception is raised.
+    :param scheduler: Every call takes a slot of this scheduler for host, so part requests count against its
+        max_concurrency / max_concurrency_per_host. If the caller runs in scheduler.run (e.g. one file of a batch),
+        its slot is lent to one call at a time and further calls only start on slots which are free right away.
+        Parts of files which hold slots therefore never wait for each other's slots.
+    :param host: Host the calls talk to. Used for the per-host limit.
+    :return: The results in the order of the items.
+    """
+    limit = max(1, limit)
+    results = {}
+    pending = set()
+    lent_slot_free = scheduler is not None and scheduler.holds_slot()
+
+    async def _run(index: int, item, slot):
+        nonlocal lent_slot_free
+        try:
+            results[index] = await func(item)
+        finally:
+            if slot is None:
+                lent_slot_free = True
+            elif slot:
+                scheduler.release(slot)
+
+    async def _wait(return_when):
+        nonlocal pending
+        done, pending = await asyncio.wait(pending, return_when=return_when)
+        for task in done:
+            task.result()
+
+    async def _take_slot():
+        """None for the lent slot, else the acquired scheduler slot (empty without scheduler)."""
+        nonlocal lent_slot_free
+        if scheduler is None:
+            return []
+        while True:
+            if lent_slot_free:
+                lent_slot_free = False
+                return None
+            # only wait for a slot if none of our own calls is in flight to free one
+            slot = await scheduler.acquire(host, wait=not pending)
+            if slot is not None:
+                return slot
+            await _wait(asyncio.FIRST_COMPLETED)
+
+    async def _start(index: int, item):
+        if len(pending) >= limit:
+            await _wait(asyncio.FIRST_COMPLETED)
+        slot = await _take_slot()
+        pending.add(asyncio.ensure_future(_run(index, item, slot)))
+
+    try:
+        index = 0
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                await _start(index, item)
+                index += 1
+        else:
+            for item in items:
+                await _start(index, item)
+                index += 1
+        if pending:
+            await _wait(asyncio.FIRST_EXCEPTION)
+            if pending:
+                await _wait(asyncio.ALL_COMPLETED)
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        # let cancelled calls unwind before the caller cleans up (e.g. aborts a multipart upload)
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+
+    return [results[i] for i in range(len(results))]
+
+
+def map_threaded(func: Callable[[Any], Any], items: Iterable, max_workers: Optional[int] = None) -> list:
+    """
+    Sync counterpart of run_bounded: run func(item) for every item in a thread pool of max_workers threads.
+    With max_workers None or 1 (or a single item) the items are processed one after another in the calling thread.
+    If one call fails the calls which have not started yet are cancelled and the exception is raised.
+    :return: The results in the order of the items.
+    """
+    items = list(items)
+    if not max_workers or max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        # workers run in the caller's context, so they report to its instrumented operation
+        futures = [pool.submit(contextvars.copy_context().run, func, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def _plan_ranges(size: int, part_size: int, first_range: Optional[tuple]) -> Tuple[List[Tuple[int, int]], dict]:
+    """The byte ranges of a download, and the chunks of the already opened first range keyed by its range."""
+    if first_range is None:
+        return split_ranges(size, part_size), {}
+    end, chunks = first_range
+    return [(0, end)] + split_ranges(size, part_size, end + 1), {(0, end): chunks}
+
+
+def download_ranges(
+        size: int,
+        read_range: Callable[[int, int], Iterable[bytes]],
+        part_size: int,
+        concurrency: int,
+        path: Optional[str] = None,
+        retry_policy: RetryPolicy = None,
+        first_range: Optional[Tuple[int, Iterable[bytes]]] = None
+) -> RangeSink:
+    """
+    Download an object as concurrent byte ranges into a preallocated buffer or file.
+    :param size: Size of the object in bytes.
+    :param read_range: Function (start, end) -> iterable of byte chunks for the inclusive range. Called in threads.
+    :param part_size: Size of the ranges.
+    :param concurrency: Number of ranges fetched in parallel.
+    :param path: Write into this file instead of an in-memory buffer.
+    :param retry_policy: Retry failed ranges (also when the connection drops mid-body). A retried range simply
+        rewrites its slot. read_range should then make a single attempt (SDK retries off), so retries don't multiply.
+    :param first_range: (end, chunks) of an already sent request for the bytes 0 to end, typically the GET whose
+        response revealed the size. Its chunks are the first attempt of that range; the rest is split into part_size
+        ranges. Objects that fit into the first range need no further request.
+    :return: The (closed) RangeSink. For in-memory downloads the content is in sink.buffer.
+    """
+    ranges, opened = _plan_ranges(size, part_size, first_range)
+
+    def fetch_once(byte_range):
+        offset = byte_range[0]
+        chunks = opened.pop(byte_range, None)
+        for chunk in chunks if chunks is not None else read_range(*byte_range):
+            sink.write_at(offset, chunk)
+            offset += len(chunk)
+
+    def fetch(byte_range):
+        if retry_policy is None:
+            return fetch_once(byte_range)
+        return retry_policy.call(fetch_once, byte_range)
+
+    with RangeSink(size, path) as sink:
+        if len(ranges) <= 1 or concurrency <= 1:
+            for byte_range in ranges:
+                fetch(byte_range)
+        else:
+            with ThreadPoolExecutor(max_workers=min(concurrency, len(ranges))) as pool:
+                futures = [pool.submit(contextvars.copy_context().run, fetch, byte_range) for byte_range in ranges]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+    return sink
+
+
+async def download_ranges_async(
+        size: int,
+        read_range: Callable[[int, int], AsyncIterable[bytes]],
+        part_size: int,
+        concurrency: int,
+        path: Optional[str] = None,
+        retry_policy: RetryPolicy = None,
+        hedge_key: Optional[str] = None,
+        first_range: Optional[Tuple[int, AsyncIterable[bytes]]] = None,
+        scheduler: ConcurrencyScheduler = None,
+        host: Optional[str] = None
+) -> RangeSink:
+    """
+    Async variant of download_ranges. read_range and first_range return async iterables of byte chunks.
+    :param hedge_key: Hedge slow range requests (see RetryPolicy.acall). A hedged duplicate writes the same bytes
+        into the same slot, so whichever request wins, the content is correct.
+    :param scheduler: Every range request takes a slot of this scheduler for host (see run_bounded).
+    """
+    ranges, opened = _plan_ranges(size, part_size, first_range)
+
+    async def fetch_once(byte_range):
+        offset = byte_range[0]
+        chunks = opened.pop(byte_range, None)
+        async for chunk in chunks if chunks is not None else read_range(*byte_range):
+            sink.write_at(offset, chunk)
+            offset += len(chunk)
+
+    async def fetch(byte_range):
+        if retry_policy is None:
+            return await fetch_once(byte_range)
+        return await retry_policy.acall(fetch_once, byte_range, hedge_key=hedge_key)
+
+    with RangeSink(size, path) as sink:
+        await run_bounded(ranges, fetch, concurrency, scheduler, host)
+    return sink
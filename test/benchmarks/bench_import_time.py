@@ -0,0 +1,94 @@
+"""
+Measures the import cost of fastCloud in fresh interpreters: wall time, peak RSS and which provider SDKs got loaded.
+`import fastCloud` must not import any provider SDK; each provider import should only pull in its own.
+
+    python test/benchmarks/bench_import_time.py --repeat 10
+    # exit with 1 if `import fastCloud` loads an SDK or takes more than 150 ms on top of media_toolkit
+    python test/benchmarks/bench_import_time.py --check --max-overhead-ms 150
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+SDK_MODULES = (
+    "boto3", "botocore", "aioboto3", "aiobotocore", "azure.storage.blob", "azure.core",
+    "prometheus_client", "opentelemetry",
+)
+
+STATEMENTS = {
+    # media_toolkit is a required dependency of fastCloud and the lower bound of its import time
+    "baseline: import media_toolkit": "import media_toolkit",
+    "import fastCloud": "import fastCloud",
+    "from fastCloud import S3Storage": "from fastCloud import S3Storage",
+    "from fastCloud import AzureBlobStorage": "from fastCloud import AzureBlobStorage",
+    "from fastCloud import SocaityUploadAPI": "from fastCloud import SocaityUploadAPI",
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+peak_kb = None
+try:
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except (OSError, StopIteration):
+    pass
+print(json.dumps({{"ms": elapsed * 1000, "peak_kb": peak_kb, "sdks": [m for m in {sdks!r} if m in sys.modules]}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement, sdks=SDK_MODULES)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    peaks = [s["peak_kb"] for s in samples if s["peak_kb"] is not None]
+    return {
+        "median_ms": round(statistics.median(s["ms"] for s in samples), 1),
+        "min_ms": round(min(s["ms"] for s in samples), 1),
+        "peak_rss_mb": round(statistics.median(peaks) / 1024, 1) if peaks else None,
+        "sdks": samples[-1]["sdks"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per statement")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--check", action="store_true", help="exit with 1 if `import fastCloud` is not lazy")
+    parser.add_argument("--max-overhead-ms", type=float, default=None,
+                        help="with --check: allowed import time of fastCloud on top of media_toolkit")
+    args = parser.parse_args()
+
+    results = {name: measure(statement, args.repeat) for name, statement in STATEMENTS.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'statement':<42}{'median ms':>11}{'min ms':>9}{'peak MB':>9}  SDKs")
+        for name, r in results.items():
+            print(f"{name:<42}{r['median_ms']:>11}{r['min_ms']:>9}{str(r['peak_rss_mb']):>9}  {', '.join(r['sdks'])}")
+
+    if not args.check:
+        return
+    failures = []
+    package = results["import fastCloud"]
+    if package["sdks"]:
+        failures.append(f"`import fastCloud` imports {', '.join(package['sdks'])}")
+    overhead = package["median_ms"] - results["baseline: import media_toolkit"]["median_ms"]
+    if args.max_overhead_ms is not None and overhead > args.max_overhead_ms:
+        failures.append(f"`import fastCloud` takes {overhead:.0f} ms on top of media_toolkit")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
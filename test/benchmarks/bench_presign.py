@@ -0,0 +1,74 @@
+"""
+Measures presigned link generation in links per second. Runs offline with dummy credentials: signing needs no server.
+
+Compares the bulk APIs (create_temporary_upload_links / create_temporary_download_links) with signing one link per
+call, i.e. boto3's generate_presigned_url for S3 and create_temporary_upload_link for Azure.
+
+    python test/benchmarks/bench_presign.py --links 10000 --repeat 3
+"""
+import argparse
+import base64
+import json
+import time
+
+from fastCloud import S3Storage, AzureBlobStorage
+
+S3_ENDPOINT = "https://s3.fr-par.scw.cloud"
+AZURE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=https;AccountName=benchaccount;"
+    f"AccountKey={base64.b64encode(b'0' * 64).decode()};EndpointSuffix=core.windows.net"
+)
+
+
+def links_per_second(func, links: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(links / best)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=10000, help="links per bulk call")
+    parser.add_argument("--single-links", type=int, default=1000, help="links signed one by one for the baselines")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    names = [f"uploads/{i:08d}.png" for i in range(args.links)]
+    single_names = names[:args.single_links]
+
+    s3 = S3Storage(endpoint_url=S3_ENDPOINT, access_key_id="bench", access_key_secret="bench")
+    s3_urls = [s3._object_url("bucket", name) for name in names]
+    boto_client = s3._get_boto_client()
+
+    azure = AzureBlobStorage(connection_string=AZURE_CONNECTION_STRING)
+    azure_urls = [url.split("?")[0] for url in azure.create_temporary_upload_links(names, container="bucket")]
+
+    cases = {
+        "s3 upload links (bulk)": (lambda: s3.create_temporary_upload_links(names, folder="bucket"), args.links),
+        "s3 download links (bulk)": (lambda: s3.create_temporary_download_links(s3_urls), args.links),
+        "s3 generate_presigned_url (single)": (lambda: [
+            boto_client.generate_presigned_url("put_object", Params={"Bucket": "bucket", "Key": name}, ExpiresIn=1200)
+            for name in single_names
+        ], len(single_names)),
+        "azure upload links (bulk)": (lambda: azure.create_temporary_upload_links(names, container="bucket"), args.links),
+        "azure download links (bulk)": (lambda: azure.create_temporary_download_links(azure_urls), args.links),
+        "azure create_temporary_upload_link (single)": (lambda: [
+            azure.create_temporary_upload_link(container="bucket", blob_name=name) for name in single_names
+        ], len(single_names)),
+    }
+
+    results = {name: links_per_second(func, links, args.repeat) for name, (func, links) in cases.items()}
+    if args.json:
+        print(json.dumps({"links_per_second": results}, indent=2))
+    else:
+        print(f"{'case':<46}{'links/s':>12}")
+        for name, value in results.items():
+            print(f"{name:<46}{value:>12}")
+
+
+if __name__ == "__main__":
+    main()
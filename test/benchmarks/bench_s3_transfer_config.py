@@ -0,0 +1,93 @@
+"""
+Compares the previous fixed S3 TransferConfig (25 KB threshold and part size) with the size-adaptive
+S3TransferPolicy. Reports wall time, number of HTTP requests and throughput per object size.
+
+Runs against any S3-compatible endpoint, e.g. a local moto server:
+    pip install "moto[server]" && moto_server -p 5055
+    python test/benchmarks/bench_s3_transfer_config.py --endpoint http://127.0.0.1:5055 --sizes 1 16 64
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import time
+
+from boto3.s3.transfer import TransferConfig
+
+from fastCloud import S3Storage, S3TransferPolicy
+
+MB = 1024 * 1024
+
+LEGACY_CONFIG = TransferConfig(
+    multipart_threshold=1024 * 25,
+    max_concurrency=multiprocessing.cpu_count(),
+    multipart_chunksize=1024 * 25,
+    use_threads=True
+)
+
+
+def count_requests(storage: S3Storage) -> dict:
+    """Attach a botocore event hook which counts the requests sent by the storage's client."""
+    counter = {"requests": 0}
+
+    def _before_send(**kwargs):
+        counter["requests"] += 1
+
+    storage._get_boto_client().meta.events.register("before-send.s3", _before_send)
+    return counter
+
+
+def run(endpoint: str, bucket: str, sizes_mb: list, repeat: int) -> list:
+    storage = S3Storage(
+        endpoint_url=endpoint,
+        access_key_id=os.environ.get("S3_ACCESS_KEY_ID", "testing"),
+        access_key_secret=os.environ.get("S3_ACCESS_KEY_SECRET", "testing"),
+    )
+    client = storage._get_boto_client()
+    try:
+        client.create_bucket(Bucket=bucket)
+    except client.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    counter = count_requests(storage)
+
+    configs = {"legacy_25kb": LEGACY_CONFIG, "adaptive_policy": S3TransferPolicy()}
+    results = []
+    for size_mb in sizes_mb:
+        payload = os.urandom(size_mb * MB)
+        for name, config in configs.items():
+            timings = []
+            counter["requests"] = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                url = storage.upload(io.BytesIO(payload), folder=bucket, transfer_config=config)
+                timings.append(time.perf_counter() - start)
+                storage.delete(url)
+            best = min(timings)
+            results.append({
+                "config": name,
+                "size_mb": size_mb,
+                "best_s": round(best, 4),
+                "mb_per_s": round(size_mb / best, 2),
+                # includes one DeleteObject per run
+                "requests_per_upload": counter["requests"] / repeat - 1,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=os.environ.get("S3_ENDPOINT_URL", "http://127.0.0.1:5055"))
+    parser.add_argument("--bucket", default="fastcloud-bench")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 16, 64], help="object sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    rows = run(args.endpoint, args.bucket, args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'config':<16} {'size':>6} {'best[s]':>9} {'MB/s':>8} {'requests':>9}")
+        for r in rows:
+            print(f"{r['config']:<16} {r['size_mb']:>5}M {r['best_s']:>9} {r['mb_per_s']:>8} {r['requests_per_upload']:>9}")
@@ -0,0 +1,456 @@
+"""
+Offline benchmark suite for all providers. Runs against local stand-ins, no cloud credentials needed:
+
+    s3        an in-process moto server (or any S3-compatible endpoint, e.g. MinIO, with --s3-endpoint)
+    azure     Azurite (npx azurite-blob --loose), skipped if it is not reachable
+    socaity   SocaityUploadAPI / ReplicateUploadAPI over an httpx mock transport (uploads only)
+    replicate
+
+Every (target, mode, size, batch) case runs in a fresh process, so peak memory is measured per case. The modes are
+sync (one file at a time), threaded (max_workers threads) and async (upload_async / download_many_async).
+Reported per operation: throughput, latency percentiles of the calls, mean prepare / network / parse time and
+peak RSS.
+
+    pip install "moto[server]"
+    python test/benchmarks/bench_suite.py --sizes 1KB 1MB 16MB --batches 1 16 --output results.json
+    python test/benchmarks/bench_suite.py --sizes 1GB --batches 1 --targets s3 --modes async
+    # exits with 1 if throughput or p95 latency regressed by more than --tolerance against a previous run
+    python test/benchmarks/bench_suite.py --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from urllib.parse import urlparse
+
+import httpx
+
+from fastCloud import S3Storage, AzureBlobStorage, SocaityUploadAPI, ReplicateUploadAPI, Instrumentation
+from fastCloud.core.api_providers import HTTPClientManager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+TARGETS = ("s3", "azure", "socaity", "replicate")
+MODES = ("sync", "threaded", "async")
+BUCKET = "fastcloud-bench"
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFp1/qdrOxiDTu3dyXQ==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+# metrics compared by --compare: (name, True if higher is better)
+COMPARED_METRICS = (("mb_per_s", True), ("latency_p95_ms", False))
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process. On Linux the high-water mark of /proc, which reset_peak_rss() can reset."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss survives exec, so it includes the parent's peak. Kilobytes on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def reset_peak_rss():
+    """Reset the RSS high-water mark to the current RSS (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# ---------------------------------------------------------------------- #
+# Local stand-ins                                                         #
+# ---------------------------------------------------------------------- #
+
+class MockUploadTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Answers the upload API endpoints locally: multipart uploads (Socaity / Replicate), Socaity's temporary upload
+    URL requests and the PUTs to those URLs. Request bodies are read completely, like a server would.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(request)
+
+    @staticmethod
+    def _respond(request: httpx.Request) -> httpx.Response:
+        file_url = f"https://files.mock/{uuid.uuid4().hex}"
+        if request.method == "PUT":
+            return httpx.Response(201)
+        if request.headers.get("content-type", "").startswith("application/json"):
+            # Socaity's temporary upload URL request
+            n_files = json.loads(request.content).get("n_files", 1)
+            return httpx.Response(200, json=[f"https://blob.mock/{uuid.uuid4().hex}?sig=x" for _ in range(n_files)])
+        if "replicate" in request.url.host:
+            return httpx.Response(201, json={"urls": {"get": file_url}})
+        return httpx.Response(200, json=file_url)
+
+
+def start_moto_server() -> tuple:
+    """Start moto in this process on a free port. :return: (server, endpoint_url)"""
+    from moto.server import ThreadedMotoServer
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # request log of the in-process server
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def is_reachable(url: str) -> bool:
+    parsed = urlparse(url)
+    try:
+        with socket.create_connection((parsed.hostname, parsed.port or 80), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+def create_provider(target: str, config: dict, max_workers: int):
+    if target == "s3":
+        return S3Storage(
+            endpoint_url=config["s3_endpoint"],
+            access_key_id=os.environ.get("S3_ACCESS_KEY_ID", "testing"),
+            access_key_secret=os.environ.get("S3_ACCESS_KEY_SECRET", "testing"),
+            max_workers=max_workers
+        )
+    if target == "azure":
+        return AzureBlobStorage(connection_string=config["azure_connection_string"], max_workers=max_workers)
+
+    http_client = HTTPClientManager(transport=MockUploadTransport(config["api_latency"]))
+    if target == "socaity":
+        return SocaityUploadAPI(
+            api_key="bench", upload_endpoint="https://api.socaity.mock/v1/files", http_client=http_client,
+            max_workers=max_workers
+        )
+    return ReplicateUploadAPI(
+        api_key="bench", upload_endpoint="https://api.replicate.mock/v1/files", http_client=http_client,
+        max_workers=max_workers
+    )
+
+
+def prepare_target(target: str, config: dict) -> bool:
+    """Create the bucket / container. :return: False if the stand-in is not available."""
+    if target == "s3":
+        client = create_provider(target, config, None)._get_boto_client()
+        try:
+            client.create_bucket(Bucket=BUCKET)
+        except (client.exceptions.BucketAlreadyOwnedByYou, client.exceptions.BucketAlreadyExists):
+            pass
+        return True
+    if target == "azure":
+        if not is_reachable("http://127.0.0.1:10000") and "127.0.0.1:10000" in config["azure_connection_string"]:
+            print("azure: Azurite is not running on 127.0.0.1:10000, skipped", file=sys.stderr)
+            return False
+        from azure.core.exceptions import ResourceExistsError
+        from azure.storage.blob import BlobServiceClient
+        service = BlobServiceClient.from_connection_string(config["azure_connection_string"])
+        try:
+            service.create_container(BUCKET)
+        except ResourceExistsError:
+            pass
+        return True
+    return True
+
+
+# ---------------------------------------------------------------------- #
+# One case                                                                #
+# ---------------------------------------------------------------------- #
+
+class EventCollector(Instrumentation):
+    """Keeps the OperationEvents of the provider for the phase split."""
+
+    def __init__(self):
+        self.events = []
+
+    def on_operation(self, event):
+        self.events.append(event)
+
+
+def make_files(directory: str, size: int, batch: int) -> list:
+    """batch files of size random bytes. The copies are hard links of one file, so 1 GB batches fit on disk."""
+    first = os.path.join(directory, f"bench-{uuid.uuid4().hex}.bin")
+    with open(first, "wb") as f:
+        remaining = size
+        while remaining:
+            chunk = os.urandom(min(remaining, 8 * 1024 ** 2))
+            f.write(chunk)
+            remaining -= len(chunk)
+    paths = [first]
+    for _ in range(batch - 1):
+        path = os.path.join(directory, f"bench-{uuid.uuid4().hex}.bin")
+        try:
+            os.link(first, path)
+        except OSError:
+            shutil.copyfile(first, path)
+        paths.append(path)
+    return paths
+
+
+def run_case(case: dict) -> list:
+    """Run upload (+ download and delete for storages) repeat times. :return: one result row per operation."""
+    target, mode, size, batch, repeat = case["target"], case["mode"], case["size"], case["batch"], case["repeat"]
+    storage_target = target in ("s3", "azure")
+    provider = create_provider(target, case["config"], case["threads"] if mode == "threaded" else 1)
+    collector = EventCollector()
+    provider.instrumentation = collector
+    upload_kwargs = {"folder": BUCKET} if storage_target else {}
+
+    timings = {"upload": [], "download": [], "delete": []}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_files(directory, size, batch)
+
+        def save_paths():
+            return [os.path.join(directory, f"download-{i}.bin") for i in range(batch)]
+
+        def timed(op, func, *args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings[op].append(time.perf_counter() - start)
+            return result
+
+        if mode == "async":
+            async def cycle_async():
+                urls = await provider.upload_async(paths, **upload_kwargs)
+                if storage_target:
+                    urls = [urls] if isinstance(urls, str) else urls
+                    await provider.download_many_async(urls, save_paths())
+                    await provider.delete_async(urls)
+
+            async def run_async():
+                # untimed warmup: clients, connection pools and credentials are created on first use
+                for _ in range(case["warmup"]):
+                    await cycle_async()
+                collector.events.clear()
+                reset_peak_rss()
+                rss_before = peak_rss_mb()
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    urls = await provider.upload_async(paths, **upload_kwargs)
+                    timings["upload"].append(time.perf_counter() - start)
+                    if storage_target:
+                        urls = [urls] if isinstance(urls, str) else urls
+                        start = time.perf_counter()
+                        await provider.download_many_async(urls, save_paths())
+                        timings["download"].append(time.perf_counter() - start)
+                        start = time.perf_counter()
+                        await provider.delete_async(urls)
+                        timings["delete"].append(time.perf_counter() - start)
+                await provider.aclose()
+                return rss_before
+            rss_before = asyncio.run(run_async())
+        else:
+            for _ in range(case["warmup"]):
+                urls = provider.upload(paths, **upload_kwargs)
+                if storage_target:
+                    urls = [urls] if isinstance(urls, str) else urls
+                    provider.download_many(urls, save_paths())
+                    provider.delete(urls)
+            collector.events.clear()
+            reset_peak_rss()
+            rss_before = peak_rss_mb()
+            for _ in range(repeat):
+                urls = timed("upload", provider.upload, paths, **upload_kwargs)
+                if storage_target:
+                    urls = [urls] if isinstance(urls, str) else urls
+                    timed("download", provider.download_many, urls, save_paths())
+                    timed("delete", provider.delete, urls)
+            provider.close()
+
+    peak = peak_rss_mb()
+    rows = []
+    for op, values in timings.items():
+        if not values:
+            continue
+        events = [e for e in collector.events if e.operation == {"download": "download_many"}.get(op, op)]
+        total = sum(values)
+        row = {
+            "target": target,
+            "mode": mode,
+            "op": op,
+            "size": case["size_label"],
+            "size_bytes": size,
+            "batch": batch,
+            "repeat": repeat,
+            "total_s": round(total, 4),
+            "objects_per_s": round(batch * len(values) / total, 2),
+            "mb_per_s": round(size * batch * len(values) / total / UNITS["MB"], 2) if op != "delete" else None,
+            "latency_p50_ms": round(percentile(values, 50) * 1000, 2),
+            "latency_p95_ms": round(percentile(values, 95) * 1000, 2),
+            "latency_p99_ms": round(percentile(values, 99) * 1000, 2),
+            "peak_rss_mb": peak,
+            "rss_growth_mb": round(peak - rss_before, 1) if peak is not None else None,
+        }
+        for phase in ("prepare", "network", "parse"):
+            row[f"{phase}_ms"] = round(sum(e.phases[phase] for e in events) / len(events) * 1000, 2) if events else None
+        rows.append(row)
+    return rows
+
+
+def run_isolated(case: dict) -> list:
+    """Run a case in a fresh process, so its peak RSS is not inflated by earlier cases."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_case, (case,))
+
+
+# ---------------------------------------------------------------------- #
+# Regression check                                                        #
+# ---------------------------------------------------------------------- #
+
+def row_key(row: dict) -> tuple:
+    return row["target"], row["mode"], row["op"], row["size"], row["batch"]
+
+
+def compare(rows: list, baseline: list, tolerance: float) -> list:
+    """:return: Descriptions of all metrics that got worse than the baseline by more than tolerance."""
+    previous = {row_key(row): row for row in baseline}
+    regressions = []
+    for row in rows:
+        old = previous.get(row_key(row))
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            new_value, old_value = row.get(metric), old.get(metric)
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{'/'.join(map(str, row_key(row)))} {metric}: {old_value} -> {new_value}")
+    return regressions
+
+
+def print_table(rows: list):
+    header = f"{'target':<10}{'mode':<10}{'op':<10}{'size':>7}{'batch':>6}{'MB/s':>10}{'obj/s':>10}" \
+             f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MB':>9}"
+    print(header)
+    for r in rows:
+        print(
+            f"{r['target']:<10}{r['mode']:<10}{r['op']:<10}{r['size']:>7}{r['batch']:>6}{str(r['mb_per_s']):>10}"
+            f"{r['objects_per_s']:>10}{r['latency_p50_ms']:>10}{r['latency_p95_ms']:>10}{r['latency_p99_ms']:>10}"
+            f"{str(r['peak_rss_mb']):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--sizes", nargs="+", default=["1KB", "1MB", "16MB"], help="object sizes, e.g. 1KB 16MB 1GB")
+    parser.add_argument("--batches", nargs="+", type=int, default=[1, 16], help="files per call")
+    parser.add_argument("--repeat", type=int, default=5, help="calls per case (latency percentiles are over these)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed calls per case before measuring")
+    parser.add_argument("--threads", type=int, default=8, help="max_workers of the threaded mode")
+    parser.add_argument("--s3-endpoint", default=os.environ.get("S3_ENDPOINT_URL"),
+                        help="S3-compatible endpoint. Default: an in-process moto server")
+    parser.add_argument("--azure-connection-string", default=os.environ.get("AZURE_CONNECTION_STRING", AZURITE_CONNECTION_STRING))
+    parser.add_argument("--api-latency-ms", type=float, default=0, help="simulated latency of the mock upload APIs")
+    parser.add_argument("--in-process", action="store_true", help="run all cases in this process (no peak RSS per case)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="results JSON of a previous run; exit with 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression for --compare")
+    args = parser.parse_args()
+
+    server = None
+    if "s3" in args.targets and not args.s3_endpoint:
+        server, args.s3_endpoint = start_moto_server()
+    config = {
+        "s3_endpoint": args.s3_endpoint,
+        "azure_connection_string": args.azure_connection_string,
+        "api_latency": args.api_latency_ms / 1000,
+    }
+
+    rows = []
+    try:
+        for target in args.targets:
+            if not prepare_target(target, config):
+                continue
+            for size_label in args.sizes:
+                for batch in args.batches:
+                    for mode in args.modes:
+                        case = {
+                            "target": target, "mode": mode, "size": parse_size(size_label), "size_label": size_label,
+                            "batch": batch, "repeat": args.repeat, "warmup": args.warmup, "threads": args.threads,
+                            "config": config,
+                        }
+                        rows.extend(run_case(case) if args.in_process else run_isolated(case))
+    finally:
+        if server is not None:
+            server.stop()
+
+    print_table(rows)
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "threads": args.threads,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+        },
+        "results": rows,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(rows, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import socket
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint():
+    """In-process moto S3 server. Sync (boto3) and async (aioboto3) clients both talk to it over HTTP."""
+    server_module = pytest.importorskip("moto.server")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3(s3_endpoint):
+    """S3Storage on a fresh bucket of the moto server."""
+    pytest.importorskip("boto3")
+    from fastCloud import S3Storage
+
+    storage = S3Storage(endpoint_url=s3_endpoint, access_key_id="testing", access_key_secret="testing")
+    bucket = f"bucket-{id(storage)}"
+    storage._get_boto_client().create_bucket(Bucket=bucket)
+    storage.test_bucket = bucket
+    yield storage
+    storage.close()
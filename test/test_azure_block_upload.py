@@ -0,0 +1,170 @@
+import asyncio
+import base64
+import io
+import re
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+requests = pytest.importorskip("requests")
+pytest.importorskip("azure.storage.blob")
+from azure.core.pipeline.transport import RequestsTransport, AsyncioRequestsTransport
+from azure.storage.blob.aio import BlobServiceClient as AioBlobServiceClient
+from media_toolkit import MediaFile
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from fastCloud import AzureBlobStorage
+from fastCloud.core.retry import RetryPolicy
+
+CONNECTION_STRING = "DefaultEndpointsProtocol=https;AccountName=acct;AccountKey=a2V5;EndpointSuffix=core.windows.net"
+DATA = bytes(range(256)) * 4
+
+
+class _HandlerAdapter(BaseAdapter):
+    """Answers the requests of a requests.Session with a httpx.MockTransport style handler."""
+
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+
+    def send(self, request, **kwargs):
+        body = request.body
+        if hasattr(body, "read"):
+            body = body.read()
+        elif body is not None and not isinstance(body, (bytes, str)):
+            body = b"".join(body)
+        if isinstance(body, str):
+            body = body.encode()
+        reply = self.handler(httpx.Request(request.method, request.url, headers=dict(request.headers), content=body or b""))
+
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.reason = reply.reason_phrase
+        response.headers = CaseInsensitiveDict(reply.headers)
+        response.raw = io.BytesIO(reply.content)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class _BlobService:
+    """Azure stand-in: stores staged blocks and fails the first attempts of the given block indices."""
+
+    def __init__(self, failures: dict = None):
+        self.failures = dict(failures or {})
+        self.blocks = {}
+        self.committed = None
+        self.attempts = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        query = parse_qs(urlsplit(str(request.url)).query)
+        if query["comp"] == ["blocklist"]:
+            self.committed = re.findall(r"<Latest>(.*?)</Latest>", request.content.decode())
+            return httpx.Response(201)
+
+        # the SDK base64-encodes the block id it is given once more
+        block_id = base64.b64decode(query["blockid"][0]).decode()
+        index = int(base64.b64decode(block_id)[-10:])
+        with self.lock:
+            self.attempts[index] = self.attempts.get(index, 0) + 1
+            if self.failures.get(index, 0) > 0:
+                self.failures[index] -= 1
+                return httpx.Response(503)
+            self.blocks[block_id] = request.content
+        return httpx.Response(201)
+
+    def blob(self) -> bytes:
+        return b"".join(self.blocks[base64.b64decode(block_id).decode()] for block_id in self.committed)
+
+
+def _storage(service: _BlobService, block_retries: int = 3) -> AzureBlobStorage:
+    storage = AzureBlobStorage(
+        connection_string=CONNECTION_STRING, block_size=100, max_block_concurrency=3, block_retries=block_retries,
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0.001)
+    )
+    session = requests.Session()
+    session.mount("https://", _HandlerAdapter(service))
+    create = storage._create_blob_service_client
+
+    def create_with_transport(client_class):
+        client = create(client_class)
+        transport = AsyncioRequestsTransport if client_class is AioBlobServiceClient else RequestsTransport
+        # same client settings, requests answered by the handler
+        return client_class(
+            account_url=client.url, credential=client.credential, transport=transport(session=session),
+            retry_policy=client._config.retry_policy, max_single_put_size=storage.single_upload_threshold,
+            max_block_size=storage.block_size
+        )
+
+    storage._create_blob_service_client = create_with_transport
+    return storage
+
+
+def _upload(storage: AzureBlobStorage, use_async: bool) -> str:
+    file = MediaFile(file_name="big.bin").from_bytes(DATA)
+    if not use_async:
+        return storage.upload(file, folder="c", large_object=True)
+
+    async def upload():
+        try:
+            return await storage.upload_async(file, folder="c", large_object=True)
+        finally:
+            await storage.aclose()
+
+    return asyncio.run(upload())
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_blocks_are_staged_and_committed_in_order(use_async):
+    service = _BlobService()
+    storage = _storage(service)
+    try:
+        url = _upload(storage, use_async)
+    finally:
+        storage.close()
+
+    assert url == "https://acct.blob.core.windows.net/c/big.bin"
+    assert len(service.committed) == 11
+    assert service.blob() == DATA
+
+    block_ids = [base64.b64decode(block_id).decode() for block_id in service.committed]
+    # base64 ids of equal length: the upload id followed by the zero-padded block index
+    assert len({len(block_id) for block_id in block_ids}) == 1
+    decoded = [base64.b64decode(block_id).decode() for block_id in block_ids]
+    assert len({block_id[:-10] for block_id in decoded}) == 1
+    assert [block_id[-10:] for block_id in decoded] == [f"{i:010d}" for i in range(11)]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_failed_blocks_are_retried_individually(use_async):
+    service = _BlobService(failures={2: 2, 7: 1})
+    storage = _storage(service, block_retries=2)
+    try:
+        _upload(storage, use_async)
+    finally:
+        storage.close()
+
+    assert service.blob() == DATA
+    # one SDK attempt per call: only the failed blocks are sent again, block_retries times at most
+    assert service.attempts == {i: {2: 3, 7: 2}.get(i, 1) for i in range(11)}
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_block_failing_more_than_block_retries_fails_the_upload(use_async):
+    service = _BlobService(failures={4: 3})
+    storage = _storage(service, block_retries=2)
+    try:
+        with pytest.raises(Exception):
+            _upload(storage, use_async)
+    finally:
+        storage.close()
+
+    assert service.attempts[4] == 3
+    assert service.committed is None
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from fastCloud.core.storage_providers.batch_delete import plan_delete_batches, delete_results
+
+
+def _parse(url: str):
+    if "/" not in url:
+        raise ValueError(url)
+    return tuple(url.split("/", 1))
+
+
+def test_plan_groups_by_folder_dedups_and_splits():
+    urls = ["a/1", "b/1", "a/2", "bad", "a/1", "a/3"]
+    batches, targets = plan_delete_batches(urls, _parse, batch_size=2)
+    assert batches == [("a", ["1", "2"]), ("a", ["3"]), ("b", ["1"])]
+    assert targets == [("a", "1"), ("b", "1"), ("a", "2"), None, ("a", "1"), ("a", "3")]
+    assert delete_results(targets, {("a", "1"), ("a", "3")}) == [True, False, False, False, True, True]
+
+
+def _upload(s3, names):
+    client = s3._get_boto_client()
+    for name in names:
+        client.put_object(Bucket=s3.test_bucket, Key=name, Body=b"x")
+    return [f"{s3.endpoint_url}/{s3.test_bucket}/{name}" for name in names]
+
+
+def _remaining(s3):
+    return {o["Key"] for o in s3._get_boto_client().list_objects_v2(Bucket=s3.test_bucket).get("Contents", [])}
+
+
+def test_s3_delete_results_in_input_order(s3):
+    s3.MAX_DELETE_BATCH_SIZE = 3
+    names = [f"file-{i}" for i in range(7)]
+    urls = _upload(s3, names)
+    mixed = [urls[6], f"{s3.endpoint_url}/", urls[0], urls[6]] + urls[1:6]
+    assert s3.delete(mixed) == [True, False, True, True] + [True] * 5
+    assert _remaining(s3) == set()
+
+
+def test_s3_delete_reports_partial_errors(s3):
+    urls = _upload(s3, ["keep", "gone-1", "gone-2"])
+
+    def fail_keep(parsed, **kwargs):
+        parsed["Errors"] = [{"Key": "keep", "Code": "AccessDenied", "Message": "Access Denied"}]
+
+    s3._get_boto_client().meta.events.register("after-call.s3.DeleteObjects", fail_keep)
+    assert s3.delete(urls) == [False, True, True]
+
+
+def test_s3_failed_batch_does_not_abort_others(s3):
+    from botocore.exceptions import EndpointConnectionError
+
+    s3.MAX_DELETE_BATCH_SIZE = 2
+    urls = _upload(s3, ["a", "b", "c", "d"])
+
+    def drop_first_batch(params, **kwargs):
+        if params["Delete"]["Objects"][0]["Key"] == "a":
+            raise EndpointConnectionError(endpoint_url=s3.endpoint_url)
+
+    s3._get_boto_client().meta.events.register("before-parameter-build.s3.DeleteObjects", drop_first_batch)
+    assert s3.delete(urls) == [False, False, True, True]
+    assert _remaining(s3) == {"a", "b"}
+
+
+class _Events(list):
+    """Instrumentation which records the events."""
+
+    def emit(self, event):
+        self.append(event)
+
+
+def test_s3_failed_deletes_are_logged_and_reported(s3, caplog):
+    from botocore.exceptions import EndpointConnectionError
+
+    s3.MAX_DELETE_BATCH_SIZE = 2
+    s3.instrumentation = events = _Events()
+    urls = _upload(s3, ["a", "b", "c", "d"])
+    error = EndpointConnectionError(endpoint_url=s3.endpoint_url)
+
+    def drop_first_batch(params, **kwargs):
+        if params["Delete"]["Objects"][0]["Key"] == "a":
+            raise error
+
+    def fail_d(parsed, **kwargs):
+        parsed["Errors"] = [{"Key": "d", "Code": "AccessDenied", "Message": "Access Denied"}]
+
+    s3._get_boto_client().meta.events.register("before-parameter-build.s3.DeleteObjects", drop_first_batch)
+    s3._get_boto_client().meta.events.register("after-call.s3.DeleteObjects", fail_d)
+    assert s3.delete(urls + ["not a url"]) == [False, False, True, False, False]
+
+    event, = events
+    assert event.status == "error" and event.error is not None
+    assert event.failed_objects == 4
+    assert event.to_dict()["failed_objects"] == 4
+    assert any("Deleting 2 objects" in record.getMessage() for record in caplog.records)
+
+    # a batch without failures stays ok
+    s3._get_boto_client().meta.events.unregister("after-call.s3.DeleteObjects", fail_d)
+    events.clear()
+    assert s3.delete([urls[2]]) == [True]  # S3 reports no error for keys which are already gone
+    assert events[0].status == "ok" and events[0].failed_objects == 0
+
+
+def test_s3_delete_async(s3):
+    s3.MAX_DELETE_BATCH_SIZE = 2
+    urls = _upload(s3, ["a", "b", "c"])
+
+    async def delete():
+        try:
+            return await s3.delete_async([urls[2], "not a url", urls[0], urls[1]])
+        finally:
+            await s3.aclose()
+
+    assert asyncio.run(delete()) == [True, False, True, True]
+    assert _remaining(s3) == set()
+
+
+def test_s3_delete_single(s3):
+    url = _upload(s3, ["single"])[0]
+    assert s3.delete(url) is True
+    assert s3.delete("") is False
+    with pytest.raises(ValueError):
+        s3._parse_s3_url(f"{s3.endpoint_url}/{s3.test_bucket}")
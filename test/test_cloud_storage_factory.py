@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from fastCloud import create_fast_cloud, evict_fast_cloud, close_fast_clouds
+from fastCloud.core import cloud_storage_factory
+from fastCloud.core.cloud_storage_factory import _config_key
+
+S3 = dict(s3_endpoint_url="https://S3.eu-west-1.amazonaws.com/", s3_access_key_id="id", s3_access_key_secret="secret")
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    close_fast_clouds()
+    yield
+    close_fast_clouds()
+
+
+def _key(**config):
+    config = {
+        "azure_sas_access_token": None, "azure_connection_string": None, "s3_endpoint_url": None,
+        "s3_access_key_id": None, "s3_access_key_secret": None, "api_upload_endpoint": None, "api_upload_api_key": None,
+        **config
+    }
+    return _config_key(**config)
+
+
+def test_config_key_normalisation():
+    assert _key(**S3) == _key(
+        s3_endpoint_url=" https://s3.eu-west-1.amazonaws.com", s3_access_key_id="id ", s3_access_key_secret="secret"
+    ) == ("s3", "https://s3.eu-west-1.amazonaws.com", "id", "secret")
+    assert _key(**S3) != _key(**{**S3, "s3_access_key_secret": "other"})
+
+    assert _key(azure_connection_string="AccountName=a;AccountKey=k;") == _key(
+        azure_connection_string=" AccountKey=k; AccountName=a"
+    )
+    assert _key(azure_sas_access_token="?sv=1&sig=x") == _key(azure_sas_access_token="sv=1&sig=x")
+    # azure is selected before s3, like create_fast_cloud always did
+    assert _key(azure_sas_access_token="sv=1", **S3)[0] == "azure"
+
+    assert _key(api_upload_endpoint="https://api.socaity.ai/v1/files/", api_upload_api_key="k") == (
+        "socaity", "https://api.socaity.ai/v1/files", "k"
+    )
+    assert _key(api_upload_endpoint="https://unknown.example") is None
+    assert _key(s3_endpoint_url="  ") is None
+
+
+def test_instances_are_private_unless_shared():
+    pytest.importorskip("boto3")
+    first, second = create_fast_cloud(**S3), create_fast_cloud(**S3)
+    assert first is not second
+    assert not cloud_storage_factory._instances
+
+    shared = create_fast_cloud(**S3, shared=True)
+    assert create_fast_cloud(**{**S3, "s3_endpoint_url": "https://s3.eu-west-1.amazonaws.com"}, shared=True) is shared
+    assert create_fast_cloud(**{**S3, "s3_access_key_id": "other"}, shared=True) is not shared
+    assert create_fast_cloud(**S3) is not shared
+    assert create_fast_cloud() is None
+
+
+def test_evict_and_close():
+    pytest.importorskip("boto3")
+    shared = create_fast_cloud(**S3, shared=True)
+    closed = []
+    shared.close = lambda: closed.append(shared)
+
+    assert evict_fast_cloud(shared, close=False) and not closed
+    assert not evict_fast_cloud(shared)
+    replacement = create_fast_cloud(**S3, shared=True)
+    assert replacement is not shared
+
+    replacement.close = lambda: closed.append(replacement)
+    assert evict_fast_cloud(replacement) and closed == [replacement]
+
+    create_fast_cloud(**S3, shared=True)
+    close_fast_clouds()
+    assert not cloud_storage_factory._instances
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_starts_with_an_empty_registry():
+    pytest.importorskip("boto3")
+    shared = create_fast_cloud(**S3, shared=True)
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # child: report whether the parent's instance is gone, then exit without running pytest's teardown
+        try:
+            ok = not cloud_storage_factory._instances and create_fast_cloud(**S3, shared=True) is not shared
+            os.write(write_end, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    result = os.read(read_end, 1)
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    assert result == b"1"
+    # the parent keeps its instance
+    assert create_fast_cloud(**S3, shared=True) is shared
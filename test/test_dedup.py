@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import io
+
+from media_toolkit import MediaFile, MediaList
+
+from fastCloud.core.streaming import UploadSource
+from fastCloud.core.storage_providers.content_dedup import (
+    DIGEST_METADATA_KEY, hash_source, hash_sources_async, digest_key, is_duplicate, check_existing, plan_dedup_uploads
+)
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_hash_source_keeps_seekable_position_and_spools_streams():
+    fileobj = io.BytesIO(b"0123456789")
+    fileobj.seek(2)
+    source, digest = hash_source(UploadSource(fileobj, file_name="f.bin"), chunk_size=3)
+    assert digest == _sha(b"23456789") and fileobj.tell() == 2
+
+    stream = UploadSource(iter([b"ab", b"cd"]), file_name="s.bin")
+    spooled, digest = hash_source(stream)
+    assert digest == _sha(b"abcd")
+    assert b"".join(spooled.iter_chunks(1024)) == b"abcd" and spooled.size == 4
+
+
+def test_hash_sources_async_bounds_concurrent_hashing():
+    reading = 0
+    peak = 0
+
+    async def chunks(i: int):
+        nonlocal reading, peak
+        reading += 1
+        peak = max(peak, reading)
+        await asyncio.sleep(0.001)
+        yield str(i).encode()
+        reading -= 1
+
+    files = [UploadSource(chunks(i), file_name=f"{i}.bin") for i in range(20)]
+    hashed = asyncio.run(hash_sources_async(files, concurrency=3))
+    assert [digest for _, digest in hashed] == [_sha(str(i).encode()) for i in range(20)]
+    assert [source.file_name for source, _ in hashed] == [f"{i}.bin" for i in range(20)]
+    assert peak == 3
+
+
+def test_keys_and_duplicate_detection():
+    digest = _sha(b"x")
+    assert digest_key(UploadSource(b"x", file_name="a.png"), digest) == f"{digest}.png"
+    assert is_duplicate(f"{digest}.png", digest, None)
+    assert is_duplicate("named.png", digest, {DIGEST_METADATA_KEY: digest})
+    assert not is_duplicate("named.png", digest, {DIGEST_METADATA_KEY: _sha(b"y")})
+    assert not is_duplicate("named.png", digest, None)
+
+
+def test_plan_uploads_only_first_new_occurrence():
+    existing = check_existing({"a": "1", "b": "2", "c": "3"}, lambda key, digest: key == "b", concurrency=2)
+    assert existing == {"a": False, "b": True, "c": False}
+    assert plan_dedup_uploads(["a", "b", "a", "c", "c"], ["1", "2", "1", "3", "4"], existing) == [
+        True, False, False, True, True
+    ]
+
+
+def _count_puts(s3):
+    puts = []
+    s3._get_boto_client().meta.events.register("before-call.s3.PutObject", lambda **kwargs: puts.append(1))
+    return puts
+
+
+def test_s3_dedup_upload(s3):
+    puts = _count_puts(s3)
+    files = MediaList([MediaFile().from_bytes(data) for data in (b"same", b"same", b"other")])
+    urls = s3.upload(files, folder=s3.test_bucket, dedup=True)
+    assert urls[0] == urls[1] != urls[2]
+    assert urls[0].rsplit("/", 1)[1].split(".")[0] == _sha(b"same")
+    assert len(puts) == 2
+
+    # content already in the bucket is not uploaded again
+    assert s3.upload(MediaFile().from_bytes(b"same"), folder=s3.test_bucket, dedup=True) == urls[0]
+    assert len(puts) == 2
+
+    # named files keep their key; the digest in the metadata detects unchanged content
+    named = MediaFile(file_name="named.bin").from_bytes(b"v1")
+    url = s3.upload(named, folder=s3.test_bucket, dedup=True)
+    assert url.endswith("/named.bin") and len(puts) == 3
+    s3.upload(MediaFile(file_name="named.bin").from_bytes(b"v1"), folder=s3.test_bucket, dedup=True)
+    assert len(puts) == 3
+    s3.upload(MediaFile(file_name="named.bin").from_bytes(b"v2"), folder=s3.test_bucket, dedup=True)
+    assert len(puts) == 4
+    body = s3._get_boto_client().get_object(Bucket=s3.test_bucket, Key="named.bin")["Body"].read()
+    assert body == b"v2"
+
+
+def test_s3_dedup_upload_async(s3):
+    async def upload():
+        try:
+            files = MediaList([MediaFile().from_bytes(b"async"), MediaFile().from_bytes(b"async")])
+            first = await s3.upload_async(files, folder=s3.test_bucket, dedup=True)
+            again = await s3.upload_async(MediaFile().from_bytes(b"async"), folder=s3.test_bucket, dedup=True)
+            return first, again
+        finally:
+            await s3.aclose()
+
+    first, again = asyncio.run(upload())
+    assert first[0] == first[1] == again
+    keys = [o["Key"] for o in s3._get_boto_client().list_objects_v2(Bucket=s3.test_bucket)["Contents"]]
+    assert keys == [first[0].rsplit("/", 1)[1]]
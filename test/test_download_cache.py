@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from fastCloud.core.download_cache import DownloadCache, CachedCloud
+
+
+def _put(s3, key: str, body: bytes) -> str:
+    s3._get_boto_client().put_object(Bucket=s3.test_bucket, Key=key, Body=body, ContentType="application/octet-stream")
+    return f"{s3.endpoint_url}/{s3.test_bucket}/{key}"
+
+
+def _count_gets(s3):
+    gets = []
+    s3._get_boto_client().meta.events.register(
+        "before-parameter-build.s3.GetObject", lambda params, **kwargs: gets.append(params.get("IfNoneMatch"))
+    )
+    return gets
+
+
+def test_revalidates_with_etag_and_refetches_changed_objects(s3, tmp_path):
+    url = _put(s3, "model.bin", b"v1" * 100)
+    gets = _count_gets(s3)
+    cache = DownloadCache(str(tmp_path))
+
+    path, content_type = cache.fetch(s3, url)
+    assert open(path, "rb").read() == b"v1" * 100 and content_type == "application/octet-stream"
+    assert gets == [None]
+
+    # unchanged: a conditional GET answered with 304, the cached file is reused
+    assert cache.fetch(s3, url)[0] == path
+    assert len(gets) == 2 and gets[1] is not None
+    assert cache.stats()["revalidations"] == 1 and cache.stats()["bytes_saved"] == 200
+
+    # changed: the new content replaces the old object
+    _put(s3, "model.bin", b"v2" * 100)
+    new_path, _ = cache.fetch(s3, url)
+    assert new_path != path and not os.path.exists(path)
+    assert open(new_path, "rb").read() == b"v2" * 100
+    assert cache.stats()["misses"] == 2
+
+
+def test_max_age_skips_revalidation(s3, tmp_path):
+    url = _put(s3, "fresh.bin", b"data")
+    gets = _count_gets(s3)
+    cache = DownloadCache(str(tmp_path), max_age=60)
+    first = cache.fetch(s3, url)
+    assert cache.fetch(s3, url) == first
+    assert len(gets) == 1 and cache.stats()["hits"] == 1
+
+
+def test_evicts_least_recently_used(s3, tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=250)
+    urls = [_put(s3, f"obj-{i}", bytes([i]) * 100) for i in range(3)]
+
+    paths = [cache.fetch(s3, urls[0])[0], cache.fetch(s3, urls[1])[0]]
+    # make obj-0 the most recently used one
+    old = time.time() - 100
+    os.utime(paths[1], (old, old))
+    cache.fetch(s3, urls[0])
+
+    newest, _ = cache.fetch(s3, urls[2])
+    assert os.path.exists(newest) and os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+
+    # an evicted object is downloaded again
+    assert open(cache.fetch(s3, urls[1])[0], "rb").read() == bytes([1]) * 100
+
+
+def test_just_downloaded_object_is_kept_even_if_too_large(s3, tmp_path):
+    cache = DownloadCache(str(tmp_path), max_bytes=10)
+    path, _ = cache.fetch(s3, _put(s3, "big.bin", b"x" * 100))
+    assert os.path.exists(path)
+
+
+def test_cached_cloud_download_and_delete(s3, tmp_path):
+    url = _put(s3, "cached.bin", b"cached content")
+    cloud = CachedCloud(s3, cache_dir=str(tmp_path))
+
+    assert cloud.download(url).to_bytes() == b"cached content"
+    save_path = str(tmp_path / "copy.bin")
+    assert cloud.download(url, save_path) == save_path
+    assert open(save_path, "rb").read() == b"cached content"
+    assert cloud.cache.stats()["misses"] == 1 and cloud.cache.stats()["revalidations"] == 1
+
+    assert cloud.delete(url) is True
+    with pytest.raises(ClientError):
+        cloud.download(url)
+
+
+@pytest.mark.parametrize("max_age", [None, 60])
+def test_object_evicted_after_lookup_is_downloaded_again(s3, tmp_path, max_age):
+    url = _put(s3, "evicted.bin", b"content")
+    cache = DownloadCache(str(tmp_path), max_age=max_age)
+    path, _ = cache.fetch(s3, url)
+
+    read_entry = cache._read_entry
+
+    def read_then_evict(url_key):
+        # another process evicts the object between the index lookup and the hit
+        entry = read_entry(url_key)
+        os.remove(path)
+        return entry
+
+    cache._read_entry = read_then_evict
+    new_path, _ = cache.fetch(s3, url)
+    assert open(new_path, "rb").read() == b"content"
+    assert cache.stats()["misses"] == 2 and cache.stats()["hits"] == 0
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import sys
+import threading
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from fastCloud.core.api_providers.HTTPClientManager import HTTPClientManager
+
+# the package re-exports the class under the module's name
+http_client_module = sys.modules[HTTPClientManager.__module__]
+
+
+def _manager() -> HTTPClientManager:
+    return HTTPClientManager(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+
+
+def test_sync_client_is_reused_and_reopened_after_close():
+    manager = _manager()
+    client = manager.client
+    with manager.get_client() as same:
+        assert same is client
+    assert client.get("https://example.com").status_code == 200
+
+    manager.close()
+    assert client.is_closed
+    assert manager.client is not client and not manager.client.is_closed
+    manager.close()
+
+
+def test_async_clients_are_bound_to_their_event_loop():
+    manager = _manager()
+
+    async def clients():
+        async with manager.get_async_client() as client:
+            assert manager.async_client is client
+            assert (await client.get("https://example.com")).status_code == 200
+        return client
+
+    first = asyncio.run(clients())
+    second = asyncio.run(clients())
+    assert first is not second
+    # the client of the first, closed loop is forgotten when the next one is created
+    assert len(manager._async_clients) == 1
+    manager.close()
+    assert not manager._async_clients
+
+
+def test_aclose_releases_the_clients_of_all_loops():
+    manager = _manager()
+    sync_client = manager.client
+
+    async def create():
+        return manager.async_client
+
+    # a client of a loop which asyncio.run in a worker thread already closed
+    thread = threading.Thread(target=lambda: asyncio.run(create()))
+    thread.start()
+    thread.join()
+
+    # a client of a loop which keeps running in another thread
+    other_loop = asyncio.new_event_loop()
+    threading.Thread(target=other_loop.run_forever, daemon=True).start()
+    other_client = asyncio.run_coroutine_threadsafe(create(), other_loop).result(5)
+
+    async def main():
+        client = manager.async_client
+        await manager.aclose()
+        return client
+
+    try:
+        own_client = asyncio.run(main())
+        assert own_client.is_closed and sync_client.is_closed
+        assert not manager._async_clients
+
+        async def is_closed():
+            return other_client.is_closed
+
+        for _ in range(100):
+            if asyncio.run_coroutine_threadsafe(is_closed(), other_loop).result(5):
+                break
+        assert other_client.is_closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+
+
+def test_close_from_a_running_loop():
+    manager = _manager()
+
+    async def main():
+        client = manager.async_client
+        manager.close()
+        # the close is scheduled on the running loop
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert client.is_closed
+        assert manager.async_client is not client
+
+    asyncio.run(main())
+    manager.close()
+
+
+def test_http2_falls_back_without_h2(monkeypatch, caplog):
+    monkeypatch.setattr(http_client_module, "find_spec", lambda name: None)
+    with caplog.at_level(logging.WARNING):
+        manager = HTTPClientManager(http2=True)
+    assert manager.http2 is False
+    assert "Falling back to HTTP/1.1" in caplog.text
+    assert manager._build_client_kwargs()["http2"] is False
@@ -0,0 +1,80 @@
+import gc
+import io
+import os
+
+import pytest
+
+from fastCloud.core.mmap_file import MmapContentBuffer, media_file_from_mmap, media_file_from_buffer
+
+PNG = open(os.path.join(os.path.dirname(__file__), "test_img.png"), "rb").read()
+
+
+def _put(s3, key: str, body: bytes) -> str:
+    s3._get_boto_client().put_object(Bucket=s3.test_bucket, Key=key, Body=body, ContentType="image/png")
+    return f"{s3.endpoint_url}/{s3.test_bucket}/{key}"
+
+
+def test_media_file_from_mmap(tmp_path):
+    path = str(tmp_path / "image.png")
+    with open(path, "wb") as f:
+        f.write(PNG)
+
+    file = media_file_from_mmap(path)
+    assert isinstance(file._content_buffer, MmapContentBuffer)
+    assert file.content_type == "image/png" and file.file_name.startswith("image")
+    assert file.to_bytes() == PNG
+    with pytest.raises(TypeError):
+        # the mapping is read-only
+        file._content_buffer.getbuffer()[0] = 0
+
+    empty = str(tmp_path / "empty.bin")
+    open(empty, "wb").close()
+    assert media_file_from_mmap(empty).to_bytes() == b""
+
+
+def test_media_file_from_buffer_adopts_the_buffer():
+    buffer = io.BytesIO(PNG)
+    file = media_file_from_buffer(buffer, None, "image.png", typed=True)
+    assert type(file).__name__ == "ImageFile" and file.content_type == "image/png"
+    assert file.to_bytes() == PNG
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_s3_mmap_download_removes_temp_file_with_the_media_file(s3, tmp_path, use_async):
+    url = _put(s3, "mapped.png", PNG)
+    if use_async:
+        import asyncio
+
+        async def download():
+            try:
+                return await s3.download_async(url, mmap=True, temp_dir=str(tmp_path), part_size=16 * 1024)
+            finally:
+                await s3.aclose()
+
+        file = asyncio.run(download())
+    else:
+        file = s3.download(url, mmap=True, temp_dir=str(tmp_path), part_size=16 * 1024)
+
+    path = file._content_buffer.name
+    assert os.path.dirname(path) == str(tmp_path)
+    assert file.to_bytes() == PNG and file.content_type == "image/png"
+
+    del file
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_s3_mmap_download_keeps_save_path(s3, tmp_path):
+    url = _put(s3, "kept.png", PNG)
+    save_path = str(tmp_path / "kept.png")
+
+    file = s3.download(url, save_path, mmap=True)
+    assert file._content_buffer.name == save_path
+    assert file.to_bytes() == PNG
+    with pytest.raises(TypeError):
+        file._content_buffer.getbuffer()[0] = 0
+
+    del file
+    gc.collect()
+    assert open(save_path, "rb").read() == PNG
+    assert os.listdir(tmp_path) == ["kept.png"]
@@ -0,0 +1,107 @@
+import base64
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs, quote
+
+import pytest
+
+from fastCloud.core.storage_providers.presign import SigV4Presigner
+
+NOW = datetime(2024, 5, 17, 12, 30, 45, tzinfo=timezone.utc)
+
+
+def _split(url: str):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{parts.path}", parse_qs(parts.query)
+
+
+def _botocore_presign(monkeypatch, s3, method: str, bucket: str, key: str, expires: int) -> str:
+    import botocore.auth
+    monkeypatch.setattr(botocore.auth, "get_current_datetime", lambda: NOW.replace(tzinfo=None))
+    operation = {"GET": "get_object", "PUT": "put_object"}[method]
+    return s3._get_boto_client().generate_presigned_url(
+        operation, Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires
+    )
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT"])
+@pytest.mark.parametrize("key", ["plain.txt", "folder/sub/file.png", "with space & plus+.bin", "umlaut-ä~.txt"])
+def test_presigner_matches_botocore(monkeypatch, s3, method, key):
+    presigner = SigV4Presigner(s3.endpoint_url, "testing", "testing", s3._extract_region_from_url(s3.endpoint_url))
+    url = presigner.presign(method, [("bucket1", key)], 900, now=NOW)[0]
+    assert _split(url) == _split(_botocore_presign(monkeypatch, s3, method, "bucket1", key, 900))
+
+
+def test_presigner_batch_keeps_order_and_rejects_invalid_expiry():
+    presigner = SigV4Presigner("https://s3.eu-west-1.amazonaws.com", "AKID", "secret", "eu-west-1")
+    keys = [f"file-{i}" for i in range(5)]
+    urls = presigner.presign("GET", [("bucket", key) for key in keys], 60, now=NOW)
+    assert [urlsplit(url).path for url in urls] == [f"/bucket/{key}" for key in keys]
+    # the default port is not part of the signed host
+    assert SigV4Presigner("https://s3.eu-west-1.amazonaws.com:443", "AKID", "secret", "eu-west-1").presign(
+        "GET", [("bucket", "file-0")], 60, now=NOW
+    ) == urls[:1]
+
+    with pytest.raises(ValueError):
+        presigner.presign("GET", [("bucket", "a")], 0)
+    with pytest.raises(ValueError):
+        presigner.presign("GET", [("bucket", "a")], SigV4Presigner.MAX_EXPIRES + 1)
+
+
+def test_s3_temporary_links_are_valid(s3):
+    httpx = pytest.importorskip("httpx")
+    upload_url = s3.create_temporary_upload_links(["linked.txt"], folder=s3.test_bucket, time_limit=5)[0]
+    assert httpx.put(upload_url, content=b"payload").status_code == 200
+
+    download_url = s3.create_temporary_download_links([f"{s3.endpoint_url}/{s3.test_bucket}/linked.txt"])[0]
+    response = httpx.get(download_url)
+    assert response.status_code == 200 and response.content == b"payload"
+
+
+@pytest.mark.parametrize("key", ["with space.txt", "100% done.txt", "folder/a+b #1.txt"])
+def test_s3_links_decode_object_keys(s3, key):
+    httpx = pytest.importorskip("httpx")
+    from media_toolkit import MediaFile
+
+    # the returned URL carries the encoded key, the stored object has the plain one
+    url = s3.upload(MediaFile(file_name=key).from_bytes(key.encode()), folder=s3.test_bucket)
+    assert url == f"{s3.endpoint_url}/{s3.test_bucket}/{quote(key, safe='~/')}"
+    assert s3._parse_s3_url(url) == (s3.test_bucket, key)
+    assert s3._get_boto_client().get_object(Bucket=s3.test_bucket, Key=key)["Body"].read() == key.encode()
+
+    download_url = s3.create_temporary_download_links([url], 5)[0]
+    assert httpx.get(download_url).content == key.encode()
+    assert s3.download(url).to_bytes() == key.encode()
+    assert s3.delete(url)
+
+
+@pytest.fixture
+def azure():
+    pytest.importorskip("azure.storage.blob")
+    from fastCloud import AzureBlobStorage
+
+    key = base64.b64encode(b"0" * 64).decode()
+    return AzureBlobStorage(connection_string=(
+        f"DefaultEndpointsProtocol=https;AccountName=account;AccountKey={key};EndpointSuffix=core.windows.net"
+    ))
+
+
+@pytest.mark.parametrize("blob_name", ["plain.txt", "folder/file.png", "with space%.bin"])
+def test_azure_sas_signature(azure, blob_name):
+    from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+
+    blob_url = f"https://account.blob.core.windows.net/container/{quote(blob_name, safe='/')}"
+    sas_url = azure.create_temporary_download_links([blob_url], time_limit=5)[0]
+    url, query = _split(sas_url)
+    assert url == blob_url
+    assert query["sp"] == ["r"]
+
+    # re-sign the decoded blob name with the expiry of the link: the signatures must match
+    expiry = datetime.strptime(query["se"][0], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    expected = generate_blob_sas(
+        "account", "container", blob_name, account_key=azure._get_blob_service_client(async_mode=False).credential.account_key,
+        permission=BlobSasPermissions(read=True), expiry=expiry
+    )
+    assert query["sig"] == parse_qs(expected)["sig"]
+
+    upload_query = _split(azure.create_temporary_upload_links([blob_name], container="container")[0])[1]
+    assert upload_query["sp"] == ["rcw"]
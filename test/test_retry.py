@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+import pytest
+
+from fastCloud.core.retry import RetryPolicy, DeadlineExceeded
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _Flaky:
+    """Fails with the given errors / responses first, then returns "ok"."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.outcomes:
+            outcome = self.outcomes.pop(0)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        return "ok"
+
+    async def acall(self):
+        return self()
+
+
+def _client_error(status: int, code: str = "Error"):
+    from botocore.exceptions import ClientError
+    return ClientError({"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, "GetObject")
+
+
+def test_classification():
+    policy = RetryPolicy()
+    assert policy.is_retryable(ConnectionResetError())
+    assert policy.is_retryable(TimeoutError())
+    assert not policy.is_retryable(DeadlineExceeded())
+    assert not policy.is_retryable(ValueError())
+
+    assert policy.is_retryable(_client_error(503))
+    assert policy.is_retryable(_client_error(400, "RequestTimeout"))
+    assert policy.is_retryable(_client_error(403, "SlowDown"))
+    assert not policy.is_retryable(_client_error(404, "NoSuchKey"))
+
+    from botocore.exceptions import EndpointConnectionError, ReadTimeoutError
+    assert policy.is_retryable(EndpointConnectionError(endpoint_url="http://x"))
+    assert policy.is_retryable(ReadTimeoutError(endpoint_url="http://x"))
+
+    httpx = pytest.importorskip("httpx")
+    request = httpx.Request("GET", "http://x")
+    assert policy.is_retryable(httpx.ConnectTimeout("timeout", request=request))
+    assert policy.is_retryable(httpx.HTTPStatusError("", request=request, response=httpx.Response(429)))
+    assert not policy.is_retryable(httpx.HTTPStatusError("", request=request, response=httpx.Response(401)))
+
+    assert policy.is_retryable_response(_Response(502)) and not policy.is_retryable_response(_Response(200))
+    assert not RetryPolicy(retryable_statuses={500}).is_retryable(_client_error(503))
+
+
+def test_azure_classification():
+    pytest.importorskip("azure.core")
+    from azure.core.exceptions import HttpResponseError, ServiceRequestError, ResourceNotFoundError
+
+    policy = RetryPolicy()
+    assert policy.is_retryable(ServiceRequestError("connection dropped"))
+    error = HttpResponseError("busy")
+    error.status_code = 503
+    assert policy.is_retryable(error)
+    missing = ResourceNotFoundError("missing")
+    missing.status_code = 404
+    assert not policy.is_retryable(missing)
+
+
+def test_call_retries_errors_and_responses():
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001)
+    func = _Flaky(ConnectionError(), _Response(503), TimeoutError())
+    assert policy.call(func) == "ok"
+    assert func.calls == 4 and policy.retries == 3
+
+    # the last retryable response is returned as is, earlier ones are closed
+    first, last = _Response(503), _Response(503)
+    assert policy.call(_Flaky(first, last), attempts=2) is last
+    assert first.closed and not last.closed
+
+    func = _Flaky(ConnectionError(), ConnectionError())
+    with pytest.raises(ConnectionError):
+        policy.call(func, attempts=2)
+    assert func.calls == 2
+
+
+def test_call_does_not_retry_other_errors():
+    func = _Flaky(ValueError())
+    with pytest.raises(ValueError):
+        RetryPolicy(base_delay=0.001).call(func)
+    assert func.calls == 1
+
+
+def test_backoff_bounds_and_retry_after():
+    policy = RetryPolicy(base_delay=1, max_delay=3)
+    assert all(0 <= policy.backoff(1) <= 1 for _ in range(50))
+    assert all(0 <= policy.backoff(10) <= 3 for _ in range(50))
+    assert policy.backoff(1, _Response(429, {"retry-after": "2"})) >= 2
+    assert policy.backoff(1, _Response(429, {"retry-after": "60"})) <= 3
+
+
+def test_sync_deadline_stops_retrying():
+    policy = RetryPolicy(max_attempts=100, base_delay=0.05, max_delay=0.05, deadline=0.2)
+    func = _Flaky(*[ConnectionError()] * 100)
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        policy.call(func)
+    # no backoff is started which would end after the deadline
+    assert time.monotonic() - started < 0.3
+    assert 1 < func.calls < 100
+
+
+def test_async_deadline_bounds_every_attempt():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, deadline=0.1)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def main():
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            await policy.acall(slow)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.5
+
+
+def test_acall_retries():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    func = _Flaky(_client_error(500), _Response(502))
+    assert asyncio.run(policy.acall(func.acall)) == "ok"
+    assert func.calls == 3
+
+
+def test_hedging_races_a_duplicate():
+    policy = RetryPolicy(hedge=True, hedge_delay=0.02)
+    calls = []
+
+    async def request():
+        calls.append(1)
+        # the first request hangs, the hedged duplicate answers right away
+        await asyncio.sleep(1 if len(calls) == 1 else 0)
+        return len(calls)
+
+    async def main():
+        started = time.monotonic()
+        result = await policy.acall(request, hedge_key="s3.get")
+        return result, time.monotonic() - started
+
+    result, elapsed = asyncio.run(main())
+    assert result == 2 and elapsed < 0.5 and policy.hedges == 1
+
+    # without a hedge_key no duplicate is sent
+    calls.clear()
+    asyncio.run(policy.acall(lambda: asyncio.sleep(0.05)))
+    assert policy.hedges == 1
+
+
+def test_hedge_delay_from_observed_latencies():
+    policy = RetryPolicy(hedge=True, hedge_percentile=90, hedge_min_samples=10, hedge_max_bytes=100)
+    for i in range(9):
+        policy.record_latency("get", i / 100)
+    assert policy.hedge_delay_for("get") is None
+    policy.record_latency("get", 0.09)
+    assert policy.hedge_delay_for("get") == 0.09
+    assert policy.should_hedge(100) and not policy.should_hedge(101) and not policy.should_hedge(None)
+    assert not RetryPolicy().should_hedge(1)
+
+
+def test_sdk_retry_settings():
+    policy = RetryPolicy(max_attempts=5)
+    assert policy.botocore_retries() == {"total_max_attempts": 5, "mode": "standard"}
+    assert policy.botocore_retries(sdk_retries=False)["total_max_attempts"] == 1
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
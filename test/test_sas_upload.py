@@ -0,0 +1,160 @@
+import asyncio
+import base64
+import re
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from fastCloud.core.retry import RetryPolicy
+from fastCloud.core.sas_upload import SasUploader
+from fastCloud.core.streaming import UploadSource
+
+SAS_URL = "https://acct.blob.core.windows.net/c/file.bin?se=2999-01-01T00%3A00%3A00Z&sig=x"
+DATA = bytes(range(256)) * 4
+POLICY = RetryPolicy(max_attempts=3, base_delay=0.001)
+
+
+class _SasBlob:
+    """Blob behind a SAS URL. Answers with the given statuses first: per block index, "put" or "commit"."""
+
+    def __init__(self, statuses: dict = None):
+        self.statuses = {key: list(value) for key, value in (statuses or {}).items()}
+        self.blocks = {}
+        self.committed = None
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def _status(self, key):
+        statuses = self.statuses.get(key)
+        return statuses.pop(0) if statuses else None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        query = parse_qs(urlsplit(str(request.url)).query)
+        assert query["sig"] == ["x"]
+        with self.lock:
+            self.requests.append(request)
+            if query.get("comp") == ["blocklist"]:
+                status = self._status("commit")
+                if status is None:
+                    self.committed = re.findall(r"<Latest>(.*?)</Latest>", request.content.decode())
+                return httpx.Response(status or 201)
+            if query.get("comp") == ["block"]:
+                block_id = query["blockid"][0]
+                status = self._status(int(base64.b64decode(block_id)[-10:]))
+                if status is None:
+                    self.blocks[block_id] = request.content
+                return httpx.Response(status or 201)
+            status = self._status("put")
+            if status is None:
+                self.blocks, self.committed = {"blob": request.content}, ["blob"]
+            return httpx.Response(status or 201)
+
+    def blob(self) -> bytes:
+        return b"".join(self.blocks[block_id] for block_id in self.committed)
+
+    def block_requests(self, index: int) -> int:
+        return sum(
+            1 for request in self.requests
+            if "comp=block&" in str(request.url)
+            and int(base64.b64decode(parse_qs(urlsplit(str(request.url)).query)["blockid"][0])[-10:]) == index
+        )
+
+
+def _upload(blob: _SasBlob, uploader: SasUploader, source: UploadSource, use_async: bool):
+    if not use_async:
+        with httpx.Client(transport=httpx.MockTransport(blob)) as client:
+            return uploader.upload(client, SAS_URL, source, POLICY)
+
+    async def upload():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(blob)) as client:
+            return await uploader.upload_async(client, SAS_URL, source, POLICY)
+
+    return asyncio.run(upload())
+
+
+def _blocks(**kwargs) -> SasUploader:
+    return SasUploader(block_size=100, max_block_concurrency=3, single_put_threshold=0, **kwargs)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_small_source_is_a_single_put(use_async):
+    blob = _SasBlob()
+    _upload(blob, SasUploader(), UploadSource(DATA, file_name="file.bin"), use_async)
+
+    assert blob.blob() == DATA
+    assert len(blob.requests) == 1
+    headers = blob.requests[0].headers
+    assert headers["x-ms-blob-type"] == "BlockBlob" and headers["content-length"] == str(len(DATA))
+    assert headers["x-ms-blob-content-type"] == "application/octet-stream"
+    assert "x-ms-if-none-match" not in headers
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_blocks_are_put_and_committed_in_order(use_async):
+    blob = _SasBlob()
+    # an iterator of unknown size is always uploaded in blocks
+    source = UploadSource(iter([DATA[:300], DATA[300:]]), file_name="file.bin")
+    _upload(blob, SasUploader(block_size=100, max_block_concurrency=3), source, use_async)
+
+    assert blob.blob() == DATA
+    assert len(blob.committed) == 11
+    # base64 ids of equal length: the upload id followed by the zero-padded block index
+    decoded = [base64.b64decode(block_id).decode() for block_id in blob.committed]
+    assert len({len(block_id) for block_id in blob.committed}) == 1
+    assert len({block_id[:-10] for block_id in decoded}) == 1
+    assert [block_id[-10:] for block_id in decoded] == [f"{i:010d}" for i in range(11)]
+
+    commit = blob.requests[-1]
+    assert "comp=blocklist" in str(commit.url)
+    assert commit.headers["content-type"] == "application/xml"
+
+
+def test_block_id_is_escaped_in_the_url():
+    block_id = "a+b/c=="
+    url = SasUploader()._block_url(SAS_URL, block_id)
+    assert url == f"{SAS_URL}&comp=block&blockid=a%2Bb%2Fc%3D%3D"
+    assert parse_qs(urlsplit(url).query)["blockid"] == [block_id]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_failed_blocks_are_retried_individually(use_async):
+    blob = _SasBlob({3: [503, 500], 8: [429]})
+    _upload(blob, _blocks(), UploadSource(DATA), use_async)
+
+    assert blob.blob() == DATA
+    assert [blob.block_requests(i) for i in range(11)] == [{3: 3, 8: 2}.get(i, 1) for i in range(11)]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_block_failing_all_attempts_fails_without_commit(use_async):
+    blob = _SasBlob({5: [503, 503, 503]})
+    with pytest.raises(Exception, match="Failed to upload"):
+        _upload(blob, _blocks(), UploadSource(DATA), use_async)
+    assert blob.block_requests(5) == 3
+    assert blob.committed is None
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+@pytest.mark.parametrize("step", ["put", "commit"])
+def test_conflict_after_a_retry_counts_as_success(use_async, step):
+    uploader = SasUploader(if_none_match=True) if step == "put" else _blocks(if_none_match=True)
+
+    # the response of the first attempt was lost, but it created the blob
+    blob = _SasBlob({step: [503, 409]})
+    _upload(blob, uploader, UploadSource(DATA), use_async)
+    puts = [request for request in blob.requests if "comp=block&" not in str(request.url)]
+    assert all(request.headers["x-ms-if-none-match"] == "*" for request in puts)
+
+    # a conflict on the first attempt is an existing blob
+    blob = _SasBlob({step: [409]})
+    with pytest.raises(Exception, match="Failed to upload"):
+        _upload(blob, uploader, UploadSource(DATA), use_async)
+
+    # without if_none_match a conflict is never a success
+    blob = _SasBlob({step: [503, 409]})
+    uploader.if_none_match = False
+    with pytest.raises(Exception, match="Failed to upload"):
+        _upload(blob, uploader, UploadSource(DATA), use_async)
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import pytest
+
+from fastCloud.core.scheduler import ConcurrencyScheduler
+
+
+class _Tracker:
+    """Records the peak number of concurrently running operations, in total and per host."""
+
+    def __init__(self):
+        self.running = {}
+        self.peak = {}
+
+    async def op(self, host, result=None, delay=0.01):
+        for key in (host, "total"):
+            self.running[key] = self.running.get(key, 0) + 1
+            self.peak[key] = max(self.peak.get(key, 0), self.running[key])
+        await asyncio.sleep(delay)
+        for key in (host, "total"):
+            self.running[key] -= 1
+        return result
+
+
+def test_per_host_and_global_limits():
+    scheduler = ConcurrencyScheduler(max_concurrency=5, max_concurrency_per_host=2)
+    tracker = _Tracker()
+
+    async def main():
+        return await asyncio.gather(
+            scheduler.gather([tracker.op("a", i) for i in range(10)], host="a"),
+            scheduler.gather([tracker.op("b", i) for i in range(10)], host="b"),
+            scheduler.gather([tracker.op(None, i) for i in range(10)]),
+        )
+
+    results = asyncio.run(main())
+    assert results == [list(range(10))] * 3
+    assert tracker.peak["a"] == 2 and tracker.peak["b"] == 2
+    assert tracker.peak["total"] == 5
+
+
+def test_unbounded_scheduler():
+    tracker = _Tracker()
+    asyncio.run(ConcurrencyScheduler(max_concurrency=None).gather([tracker.op("a") for _ in range(20)], host="a"))
+    assert tracker.peak["total"] == 20
+
+
+def test_host_of_and_validation():
+    assert ConcurrencyScheduler.host_of("https://bucket.s3.amazonaws.com:443/key?x=1") == "bucket.s3.amazonaws.com:443"
+    assert ConcurrencyScheduler.host_of(None) is None
+    with pytest.raises(ValueError):
+        ConcurrencyScheduler(max_concurrency=0)
+    with pytest.raises(ValueError):
+        ConcurrencyScheduler(max_concurrency_per_host=0)
+
+
+def test_exceptions_and_return_exceptions():
+    scheduler = ConcurrencyScheduler(max_concurrency=2)
+
+    async def fail():
+        raise KeyError("boom")
+
+    async def main():
+        results = await scheduler.gather([fail(), asyncio.sleep(0, "ok")], return_exceptions=True)
+        assert isinstance(results[0], KeyError) and results[1] == "ok"
+        with pytest.raises(KeyError):
+            await scheduler.gather([fail()])
+        # all slots were released
+        assert await scheduler.gather([asyncio.sleep(0, i) for i in range(4)]) == [0, 1, 2, 3]
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiters_close_their_coroutine():
+    scheduler = ConcurrencyScheduler(max_concurrency=1)
+    started = []
+
+    async def op(i):
+        started.append(i)
+        await asyncio.sleep(10)
+
+    async def main():
+        coroutines = [op(i) for i in range(3)]
+        task = asyncio.ensure_future(scheduler.gather(coroutines))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return coroutines
+
+    coroutines = asyncio.run(main())
+    assert started == [0]
+    # waiting coroutines were closed instead of being left un-awaited
+    assert all(coroutine.cr_frame is None for coroutine in coroutines)
+
+
+def test_one_scheduler_on_several_loops():
+    scheduler = ConcurrencyScheduler(max_concurrency=2, max_concurrency_per_host=1)
+    trackers = [_Tracker() for _ in range(2)]
+    errors = []
+
+    def run(tracker):
+        try:
+            asyncio.run(scheduler.gather([tracker.op("a") for _ in range(5)], host="a"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(tracker,)) for tracker in trackers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    # semaphores are per event loop
+    assert [tracker.peak["a"] for tracker in trackers] == [1, 1]
@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+from media_toolkit import MediaFile, MediaList
+
+from fastCloud import SocaityUploadAPI
+from fastCloud.core.api_providers.HTTPClientManager import HTTPClientManager
+from fastCloud.core.api_providers.upload_url_pool import UploadUrlPool
+from fastCloud.core.retry import RetryPolicy
+
+
+def _files(n: int, extension: str = "txt"):
+    return MediaList([MediaFile(file_name=f"file-{i}.{extension}").from_bytes(f"content {i}".encode()) for i in range(n)])
+
+
+class _Server:
+    """Socaity stand-in: numbered temporary URLs for POSTs, records the PUT bodies per URL."""
+
+    def __init__(self):
+        self.url_requests = []
+        self.puts = {}
+        self.issued = itertools.count()
+        self.lock = threading.Lock()
+
+    def urls(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        with self.lock:
+            self.url_requests.append(body["n_files"])
+            urls = [f"https://blob.example/c/{next(self.issued)}?sig=x" for _ in range(body["n_files"])]
+        return httpx.Response(200, json=urls)
+
+    def put(self, request: httpx.Request) -> httpx.Response:
+        with self.lock:
+            self.puts[str(request.url)] = request.content
+        return httpx.Response(201)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        return self.urls(request) if request.method == "POST" else self.put(request)
+
+
+def _api(handler, **kwargs) -> SocaityUploadAPI:
+    return SocaityUploadAPI(
+        api_key="key", http_client=HTTPClientManager(transport=httpx.MockTransport(handler)),
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0.001), **kwargs
+    )
+
+
+def _check_uploads(server: _Server, files, urls):
+    assert len(urls) == len(files) == len(set(urls))
+    for file, url in zip(files, urls):
+        assert server.puts[url] == file.to_bytes()
+
+
+def test_merge_urls_keeps_the_file_order():
+    assert SocaityUploadAPI._merge_urls(["p0", None, "p1", None, None], ["r0", "r1", "r2"]) == [
+        "p0", "r0", "p1", "r1", "r2"
+    ]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_urls_are_requested_in_chunks(use_async):
+    server = _Server()
+    api = _api(server, urls_per_request=3)
+    files = _files(7)
+
+    async def upload_async():
+        try:
+            return await api.upload_async(files)
+        finally:
+            await api.aclose()
+
+    try:
+        urls = asyncio.run(upload_async()) if use_async else api.upload(files)
+        assert server.url_requests == [3, 3, 1]
+        # the URLs of the chunks are used in order
+        assert urls == [f"https://blob.example/c/{i}?sig=x" for i in range(7)]
+        _check_uploads(server, files, urls)
+    finally:
+        api.close()
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_pooled_and_requested_urls_are_merged_in_file_order(use_async):
+    server = _Server()
+    pool = UploadUrlPool(size=8, refill_watermark=0)
+    api = _api(server, urls_per_request=2, url_pool=pool)
+    pool.add("png", [f"https://blob.example/pooled/{i}?sig=x" for i in range(2)])
+    files = MediaList([_files(1, "png")[0], _files(1, "txt")[0], _files(1, "png")[0], *_files(3, "txt")])
+
+    async def upload_async():
+        try:
+            return await api.upload_async(files)
+        finally:
+            await api.aclose()
+
+    try:
+        urls = asyncio.run(upload_async()) if use_async else api.upload(files)
+        assert server.url_requests == [2, 2]
+        assert urls == [
+            "https://blob.example/pooled/0?sig=x", "https://blob.example/c/0?sig=x",
+            "https://blob.example/pooled/1?sig=x", "https://blob.example/c/1?sig=x",
+            "https://blob.example/c/2?sig=x", "https://blob.example/c/3?sig=x",
+        ]
+        _check_uploads(server, files, urls)
+    finally:
+        api.close()
+
+
+def test_sync_url_request_overlaps_the_uploads():
+    server = _Server()
+    second_request = threading.Event()
+    overlapped = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        request.read()
+        if request.method == "POST":
+            response = server.urls(request)
+            if len(server.url_requests) == 2:
+                second_request.set()
+            return response
+        if "/c/0?" in str(request.url):
+            # the URLs of the next chunk are requested while the first chunk is still uploading
+            overlapped.append(second_request.wait(5))
+        return server.put(request)
+
+    api = _api(handler, urls_per_request=2)
+    try:
+        files = _files(4)
+        _check_uploads(server, files, api.upload(files))
+        assert overlapped == [True]
+    finally:
+        api.close()
+
+
+def test_async_url_request_overlaps_the_uploads():
+    server = _Server()
+
+    async def main():
+        second_request = asyncio.Event()
+        overlapped = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await request.aread()
+            if request.method == "POST":
+                response = server.urls(request)
+                if len(server.url_requests) == 2:
+                    second_request.set()
+                return response
+            if "/c/0?" in str(request.url):
+                await asyncio.wait_for(second_request.wait(), 5)
+                overlapped.append(True)
+            return server.put(request)
+
+        api = _api(handler, urls_per_request=2)
+        try:
+            files = _files(4)
+            _check_uploads(server, files, await api.upload_async(files))
+        finally:
+            await api.aclose()
+            api.close()
+        return overlapped
+
+    assert asyncio.run(main()) == [True]
+
+
+def test_async_failure_cancels_pending_uploads():
+    server = _Server()
+    cancelled = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        if request.method == "POST":
+            return server.urls(request)
+        if "/c/1?" in str(request.url):
+            return httpx.Response(403)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(str(request.url))
+            raise
+        return server.put(request)
+
+    async def main():
+        api = _api(handler, urls_per_request=10)
+        try:
+            started = time.monotonic()
+            with pytest.raises(Exception):
+                await api.upload_async(_files(4))
+            return time.monotonic() - started
+        finally:
+            await api.aclose()
+            api.close()
+
+    assert asyncio.run(main()) < 5
+    assert len(cancelled) == 3
+    assert not server.puts
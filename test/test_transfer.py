@@ -0,0 +1,163 @@
+import asyncio
+import os
+
+import pytest
+
+from fastCloud.core.scheduler import ConcurrencyScheduler
+from fastCloud.core.transfer import run_bounded, split_ranges, parse_content_range, RangeSink
+
+
+class _Parts:
+    """Part function which records the peak number of parts in flight."""
+
+    def __init__(self, delay: float = 0.005):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, item):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return item
+
+
+def test_ranges_and_sink(tmp_path):
+    assert split_ranges(10, 4) == [(0, 3), (4, 7), (8, 9)]
+    assert split_ranges(10, 4, offset=6) == [(6, 9)]
+    assert split_ranges(0, 4) == []
+    assert parse_content_range("bytes 0-99/1000") == (0, 99, 1000)
+    assert parse_content_range(None) is None
+
+    with RangeSink(6) as sink:
+        sink.write_at(3, b"def")
+        sink.write_at(0, b"abc")
+    assert sink.buffer.getvalue() == b"abcdef"
+    path = str(tmp_path / "out.bin")
+    with RangeSink(4, path) as sink:
+        sink.write_at(2, b"cd")
+        sink.write_at(0, b"ab")
+    assert open(path, "rb").read() == b"abcd"
+
+
+def test_run_bounded_order_limit_and_errors():
+    parts = _Parts()
+    assert asyncio.run(run_bounded(range(20), parts, 3)) == list(range(20))
+    assert parts.peak == 3
+
+    started = []
+
+    async def fail_third(item):
+        started.append(item)
+        if item == 2:
+            raise ValueError(item)
+        await asyncio.sleep(1)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_bounded(iter(range(100)), fail_third, 4))
+    assert len(started) <= 5
+
+
+def test_parts_take_scheduler_slots():
+    scheduler = ConcurrencyScheduler(max_concurrency=10, max_concurrency_per_host=2)
+    parts = _Parts()
+    assert asyncio.run(run_bounded(range(10), parts, 8, scheduler, "h")) == list(range(10))
+    assert parts.peak == 2
+
+
+def test_files_lend_their_slot_to_their_parts():
+    """Many files with many parts each: the per-host limit bounds all part requests and nothing deadlocks."""
+    scheduler = ConcurrencyScheduler(max_concurrency=100, max_concurrency_per_host=3)
+    parts = _Parts()
+
+    async def upload_file(index):
+        return await run_bounded(range(6), parts, 4, scheduler, "h")
+
+    async def main():
+        return await asyncio.wait_for(scheduler.gather([upload_file(i) for i in range(8)], host="h"), 10)
+
+    assert asyncio.run(main()) == [list(range(6))] * 8
+    assert parts.peak == 3
+
+
+def test_global_limit_with_slots_held_for_another_host():
+    scheduler = ConcurrencyScheduler(max_concurrency=2)
+    parts = _Parts()
+
+    async def main():
+        files = [run_bounded(range(5), parts, 5, scheduler, "h") for _ in range(4)]
+        return await asyncio.wait_for(scheduler.gather(files), 10)
+
+    assert len(asyncio.run(main())) == 4
+    assert parts.peak == 2
+
+
+def test_s3_multipart_and_ranged_download_within_host_limit(s3_endpoint):
+    pytest.importorskip("aioboto3")
+    from boto3.s3.transfer import TransferConfig
+    from media_toolkit import MediaList, MediaFile
+    from fastCloud import S3Storage
+
+    mb = 1024 * 1024
+    config = TransferConfig(multipart_threshold=5 * mb, multipart_chunksize=5 * mb, max_concurrency=4)
+    s3 = S3Storage(
+        endpoint_url=s3_endpoint, access_key_id="testing", access_key_secret="testing", transfer_config=config,
+        max_concurrency_per_host=2
+    )
+    s3._get_boto_client().create_bucket(Bucket="multipart")
+    payloads = [os.urandom(11 * mb) for _ in range(3)]
+
+    async def main():
+        try:
+            files = MediaList([MediaFile(file_name=f"part-{i}.bin").from_bytes(data) for i, data in enumerate(payloads)])
+            urls = await asyncio.wait_for(s3.upload_async(files, folder="multipart"), 60)
+            downloads = await asyncio.wait_for(s3.download_many_async(urls), 60)
+            return [download.to_bytes() for download in downloads]
+        finally:
+            await s3.aclose()
+
+    assert asyncio.run(main()) == payloads
+    s3.close()
+
+
+def test_download_target_replaces_save_path_only_on_success(tmp_path):
+    from fastCloud.core.mmap_file import download_target
+
+    save_path = str(tmp_path / "model.bin")
+    with open(save_path, "wb") as f:
+        f.write(b"old")
+    with pytest.raises(ValueError):
+        with download_target(save_path) as path:
+            with RangeSink(10, path) as sink:
+                sink.write_at(0, b"new")
+            raise ValueError("range failed")
+    assert open(save_path, "rb").read() == b"old"
+    assert os.listdir(tmp_path) == ["model.bin"]
+
+    with download_target(save_path) as path:
+        with RangeSink(3, path) as sink:
+            sink.write_at(0, b"new")
+    assert open(save_path, "rb").read() == b"new"
+    assert os.listdir(tmp_path) == ["model.bin"]
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_failed_range_leaves_save_path_untouched(s3, tmp_path, mmap):
+    url = f"{s3.endpoint_url}/{s3.test_bucket}/ranged.bin"
+    s3._get_boto_client().put_object(Bucket=s3.test_bucket, Key="ranged.bin", Body=os.urandom(4096))
+    save_path = str(tmp_path / "ranged.bin")
+    with open(save_path, "wb") as f:
+        f.write(b"previous version")
+
+    def fail_later_ranges(params, **kwargs):
+        if not params.get("Range", "").startswith("bytes=0-"):
+            raise ValueError("range failed")
+
+    s3._get_boto_client(sdk_retries=False).meta.events.register(
+        "before-parameter-build.s3.GetObject", fail_later_ranges
+    )
+    with pytest.raises(ValueError):
+        s3.download(url, save_path, part_size=1024, part_concurrency=2, mmap=mmap)
+    assert open(save_path, "rb").read() == b"previous version"
+    assert os.listdir(tmp_path) == ["ranged.bin"]
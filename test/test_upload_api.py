@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from fastCloud import SocaityUploadAPI
+from fastCloud.core.api_providers.HTTPClientManager import HTTPClientManager
+from fastCloud.core.retry import RetryPolicy
+
+PNG = open(os.path.join(os.path.dirname(__file__), "test_img.png"), "rb").read()
+
+
+def _api(handler) -> SocaityUploadAPI:
+    return SocaityUploadAPI(
+        api_key="key", http_client=HTTPClientManager(transport=httpx.MockTransport(handler)),
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0.001)
+    )
+
+
+class _Flaky:
+    """Answers with the given statuses first, then with the PNG."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.statuses:
+            return httpx.Response(self.statuses.pop(0))
+        return httpx.Response(200, content=PNG, headers={"content-type": "image/png"})
+
+
+def test_download_retries_over_the_pooled_client():
+    handler = _Flaky(503, 502)
+    api = _api(handler)
+    try:
+        file = api.download("https://files.example/images/test_img.png")
+        assert file.to_bytes() == PNG
+        assert type(file).__name__ == "ImageFile" and file.content_type == "image/png"
+        assert file.file_name.startswith("test_img")
+        assert len(handler.requests) == 3
+        assert all(request.headers["authorization"] == "Bearer key" for request in handler.requests)
+    finally:
+        api.close()
+
+
+def test_download_to_save_path(tmp_path):
+    save_path = str(tmp_path / "image.png")
+    with open(save_path, "wb") as f:
+        f.write(b"old")
+
+    api = _api(_Flaky(404))
+    try:
+        with pytest.raises(httpx.HTTPStatusError):
+            api.download("https://files.example/image.png", save_path)
+        assert open(save_path, "rb").read() == b"old"
+
+        assert api.download("https://files.example/image.png", save_path) == save_path
+        assert open(save_path, "rb").read() == PNG
+        assert os.listdir(tmp_path) == ["image.png"]
+    finally:
+        api.close()
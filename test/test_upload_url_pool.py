@@ -0,0 +1,187 @@
+import itertools
+import json
+import threading
+import time
+
+import pytest
+from media_toolkit import MediaFile
+
+from fastCloud.core.api_providers.upload_url_pool import UploadUrlPool
+
+FUTURE = "2999-01-01T00:00:00Z"
+
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+class _Fetch:
+    """Issues numbered URLs with the given SAS expiry."""
+
+    def __init__(self, expiry: str = FUTURE):
+        self.expiry = expiry
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self, extension, n):
+        with self.lock:
+            start = sum(count for _, count in self.requests)
+            self.requests.append((extension, n))
+        return [f"https://blob/{extension}/{start + i}?se={self.expiry}&sig=x" for i in range(n)]
+
+
+def test_expiry_from_sas_and_lifetime():
+    pool = UploadUrlPool(expiry_margin=120, url_lifetime=600)
+    now = time.time()
+    assert pool._expires_at("https://blob/a?se=2030-01-01T00:00:00Z", now) == 1893456000
+    assert pool._expires_at("https://blob/a?se=2030-01-01T00%3A00%3A00Z", now) == 1893456000
+    assert pool._expires_at("https://blob/a", now) == now + 600
+    assert pool._expires_at("https://blob/a?se=not-a-date", now) == now + 600
+
+
+def test_expired_urls_are_never_handed_out():
+    pool = UploadUrlPool(size=4, refill_watermark=0, expiry_margin=120, url_lifetime=600)
+    pool.add("png", [
+        "https://blob/expired?se=2000-01-01T00:00:00Z",
+        "https://blob/too-old",
+        f"https://blob/valid?se={FUTURE}",
+    ], issued_at=time.time() - 500)  # only 100s left for the URL without se, less than expiry_margin
+    pool.add("png", ["https://blob/fresh"])
+
+    assert pool.take("png") == f"https://blob/valid?se={FUTURE}"
+    assert pool.take("png") == "https://blob/fresh"
+    assert pool.take("png") is None
+    assert pool.stats()["expired"] == 2
+    assert pool.stats()["hits"] == 2 and pool.stats()["misses"] == 1
+
+
+def test_take_refills_below_watermark_and_hands_out_each_url_once():
+    fetch = _Fetch()
+    pool = UploadUrlPool(size=4, refill_watermark=2, fetch=fetch)
+    try:
+        assert pool.take("png") is None
+        _wait_for(lambda: pool.available("png") == 4)
+        assert fetch.requests == [("png", 4)]
+
+        taken = [pool.take("png") for _ in range(3)]
+        assert len(set(taken)) == 3
+        # the pool dropped below the watermark and is topped up to size again
+        _wait_for(lambda: pool.available("png") == 4)
+        assert fetch.requests[1] == ("png", 3)
+        assert not set(taken) & set(url for _, url in pool._urls["png"])
+
+        # other extensions have their own pools
+        assert pool.take("mp4") is None
+        _wait_for(lambda: pool.available("mp4") == 4)
+    finally:
+        pool.close()
+
+
+def test_refill_drops_urls_which_expire_right_away():
+    fetch = _Fetch(expiry="2000-01-01T00:00:00Z")
+    pool = UploadUrlPool(size=2, refill_watermark=1, fetch=fetch)
+    try:
+        pool.prefetch(["png"])
+        _wait_for(lambda: fetch.requests and not pool._refilling)
+        assert pool.take("png") is None
+        assert pool.stats()["expired"] == 2
+    finally:
+        pool.close()
+
+
+def test_failed_refill_is_counted_and_retried():
+    calls = []
+
+    def fetch(extension, n):
+        calls.append(n)
+        if len(calls) == 1:
+            raise ConnectionError("down")
+        return [f"https://blob/{i}" for i in range(n)]
+
+    pool = UploadUrlPool(size=2, refill_watermark=1, fetch=fetch)
+    try:
+        pool.take(None)
+        _wait_for(lambda: pool.stats()["refill_errors"] == 1 and not pool._refilling)
+        pool.take(None)
+        _wait_for(lambda: pool.available(None) == 2)
+    finally:
+        pool.close()
+
+
+def test_close_cancels_refills_and_pool_reopens():
+    release = threading.Event()
+    fetched = []
+
+    def fetch(extension, n):
+        if extension == "slow":
+            release.wait(5)
+        fetched.append(extension)
+        return [f"https://blob/{extension}/{len(fetched)}-{i}" for i in range(n)]
+
+    pool = UploadUrlPool(size=2, refill_watermark=1, fetch=fetch)
+    try:
+        pool.take("slow")  # blocks the single refill thread
+        pool.take("png")   # queued behind it, cancelled by close
+        pool.close()
+        assert not pool._refilling
+
+        # the cancelled extension is refilled again after reopening
+        assert pool.take("png") is None
+        _wait_for(lambda: pool.available("png") == 2)
+
+        # the refill which was running during close doesn't add its URLs to the reopened pool
+        release.set()
+        _wait_for(lambda: "slow" in fetched)
+        time.sleep(0.05)
+        assert pool.available("slow") == 0
+        assert pool.take("slow") is None
+        _wait_for(lambda: pool.available("slow") == 2)
+    finally:
+        release.set()
+        pool.close()
+
+
+def test_invalid_watermark():
+    with pytest.raises(ValueError):
+        UploadUrlPool(size=2, refill_watermark=3)
+
+
+def test_socaity_upload_uses_pooled_urls():
+    httpx = pytest.importorskip("httpx")
+    from fastCloud import SocaityUploadAPI
+    from fastCloud.core.api_providers.HTTPClientManager import HTTPClientManager
+
+    url_requests = []
+    puts = []
+    issued = itertools.count()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            body = json.loads(request.content)
+            url_requests.append(body["n_files"])
+            return httpx.Response(200, json=[
+                f"https://blob.example/c/{next(issued)}.txt?se={FUTURE}&sig=x" for _ in range(body["n_files"])
+            ])
+        puts.append(str(request.url))
+        return httpx.Response(201)
+
+    api = SocaityUploadAPI(
+        api_key="key", http_client=HTTPClientManager(transport=httpx.MockTransport(handler)),
+        url_pool=UploadUrlPool(size=3, refill_watermark=1)
+    )
+    try:
+        # the first upload requests its URL directly and fills the pool in the background
+        first = api.upload(MediaFile(file_name="a.txt").from_bytes(b"first"))
+        _wait_for(lambda: api.url_pool.available("txt") == 3)
+        second = api.upload(MediaFile(file_name="b.txt").from_bytes(b"second"))
+        assert second.startswith("https://blob.example/c/") and second != first
+        assert puts == [first, second]
+        assert api.url_pool.stats()["hits"] == 1
+        # the refill runs next to the direct request of the first upload
+        assert sorted(url_requests) == [1, 3]
+    finally:
+        api.close()